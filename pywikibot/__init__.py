@@ -22,10 +22,12 @@ from decimal import Decimal
 
 if sys.version_info[0] > 2:
     from queue import Queue
+    import urllib.parse as urlparse
     long = int
     basestring = str
 else:
     from Queue import Queue
+    import urlparse
 
 from warnings import warn
 
@@ -1161,9 +1163,13 @@ def Site(code=None, fam=None, user=None, sysop=None, interface=None, url=None):
     if url:
         if url not in _url_cache:
             matched_sites = []
-            # Iterate through all families and look, which does apply to
-            # the given URL
-            for fam in config.family_files:
+            # Only load the families which serve the URL's hostname
+            families = []
+            netloc = urlparse.urlparse(url).netloc
+            for fam, _ in Family.domain_index().get(netloc, []):
+                if fam not in families:
+                    families.append(fam)
+            for fam in families:
                 family = Family.load(fam)
                 code = family.from_url(url)
                 if code is not None:
@@ -1259,14 +1265,20 @@ def setAction(s):
     config.default_edit_summary = s
 
 
-def showDiff(oldtext, newtext, context=0):
+def showDiff(oldtext, newtext, context=0, summary=None):
     """
     Output a string showing the differences between oldtext and newtext.
 
     The differences are highlighted (only on compatible systems) to show which
     changes were made.
+
+    @param summary: only output the changed line ranges and the number of
+        removed and added lines. Defaults to config.diff_summary.
+    @type summary: bool or None
     """
-    PatchManager(oldtext, newtext, context=context).print_hunks()
+    if summary is None:
+        summary = config.diff_summary
+    PatchManager(oldtext, newtext, context=context).print_hunks(summary=summary)
 
 
 # Throttle and thread handling
@@ -62,6 +62,7 @@ __version__ = '$Id$'
 
 # Note: all output goes thru python std library "logging" module
 
+import atexit
 import codecs
 import datetime
 import json
@@ -70,6 +71,7 @@ import logging.handlers
 import os
 import re
 import sys
+import threading
 import time
 import warnings
 import webbrowser
@@ -84,6 +86,7 @@ from pywikibot import backports
 from pywikibot import config
 from pywikibot import daemonize
 from pywikibot import i18n
+from pywikibot import metrics
 from pywikibot import version
 from pywikibot.bot_choice import (
     Option, StandardOption, NestedOption, IntegerOption, ContextOption,
@@ -104,6 +107,7 @@ from pywikibot.tools import (
 )
 from pywikibot.tools._logging import (
     LoggingFormatter as _LoggingFormatter,
+    QueueHandler as _QueueHandler,
     RotatingFileHandler,
 )
 from pywikibot.tools.formatter import color_format
@@ -132,7 +136,11 @@ __all__ = (
 )
 
 if not PY2:
+    from queue import Queue
+
     unicode = str
+else:
+    from Queue import Queue
 
 # User interface initialization
 # search for user interface module in the 'userinterfaces' subdirectory
@@ -194,6 +202,26 @@ class LoggingFormatter(_LoggingFormatter):
 # userinterfaces/terminal_interface.py
 
 _handlers_initialized = False
+_log_listener = None  # thread writing the log file
+
+
+def _stop_log_listener():
+    """Write the queued records and stop the thread writing the log file."""
+    global _log_listener
+
+    if _log_listener:
+        _log_listener.stop()
+        for handler in _log_listener.handlers:
+            handler.close()
+        for logger in [logging.getLogger()] + list(
+                logging.Logger.manager.loggerDict.values()):
+            for handler in getattr(logger, 'handlers', [])[:]:
+                if isinstance(handler, _QueueHandler):
+                    logger.removeHandler(handler)
+        _log_listener = None
+
+
+atexit.register(_stop_log_listener)
 
 
 def init_handlers(strm=None):
@@ -229,7 +257,7 @@ def init_handlers(strm=None):
         was defined, otherwise uses sys.stderr
 
     """
-    global _handlers_initialized
+    global _handlers_initialized, _log_listener
 
     moduleName = calledModuleName()
     if not moduleName:
@@ -263,6 +291,7 @@ def init_handlers(strm=None):
         elif config.verbose_output:
             warnings.filterwarnings("module")
 
+    _stop_log_listener()
     root_logger.handlers = []  # remove any old handlers
 
     # configure handler(s) for display to user interface
@@ -285,6 +314,17 @@ def init_handlers(strm=None):
             datefmt="%Y-%m-%d %H:%M:%S"
         )
         file_handler.setFormatter(form)
+        if _QueueHandler:
+            # Write the log file in a separate thread, so logging a record
+            # only puts it into a queue. The queue handler has the level of
+            # the file handler, as respect_handler_level of the listener
+            # needs Python 3.5.
+            log_queue = Queue()
+            _log_listener = logging.handlers.QueueListener(log_queue,
+                                                           file_handler)
+            _log_listener.start()
+            file_handler = _QueueHandler(log_queue)
+            file_handler.setLevel(DEBUG)
         root_logger.addHandler(file_handler)
         # Turn on debugging for each component requested by user
         # or for all components if nothing was specified
@@ -890,6 +930,10 @@ def handle_args(args=None, do_help=True):
                 config.logfilename = value
         elif option == '-nolog':
             config.log = []
+        elif option == '-metrics':
+            config.metrics = True
+            if value:
+                config.metrics_file = value
         elif option in ('-cosmeticchanges', '-cc'):
             config.cosmetic_changes = not config.cosmetic_changes
             output(u'NOTE: option cosmetic_changes is %s\n'
@@ -951,6 +995,7 @@ def handle_args(args=None, do_help=True):
         config.usernames[config.family][config.mylang] = username
 
     init_handlers()
+    metrics.configure()
     writeToCommandLogFile()
 
     if config.verbose_output:
@@ -1024,6 +1069,12 @@ Global arguments available for all bots:
 
 -nolog            Disable the log file (if it is enabled by default).
 
+-metrics          Record metrics of the requests, e.g. the latency per API
+                  module.
+
+-metrics:xyz      Record metrics and write them to the file 'xyz' in the logs
+                  subdirectory, see config.metrics_format.
+
 -maxlag           Sets a new maxlag parameter to a number of seconds. Defer bot
                   edits during periods of database server lag. Default is set
                   by config.py
@@ -1215,6 +1266,16 @@ class BaseBot(OptionHandler):
 
     _current_page = None
 
+    # Whether treat may be called for several pages at the same time. The
+    # current page is then kept per thread and saves on the same site are
+    # done one after another. It is only used when the 'always' option is
+    # set, see config.concurrent_bot_workers. treat should use the page's
+    # site, as the site of the bot may already belong to the next page.
+    # Such a bot must save its pages with userPut or put_current, as calls
+    # of Page.save or Page.put are not serialized.
+    concurrent = False
+    _local = None
+
     def __init__(self, **kwargs):
         """
         Only accept options defined in availableOptions.
@@ -1229,10 +1290,14 @@ class BaseBot(OptionHandler):
 
         self._treat_counter = 0
         self._save_counter = 0
+        self._lock = threading.Lock()
+        self._site_locks = {}
 
     @property
     def current_page(self):
         """Return the current working page as a property."""
+        if self._local:
+            return getattr(self._local, 'current_page', None)
         return self._current_page
 
     @current_page.setter
@@ -1248,8 +1313,11 @@ class BaseBot(OptionHandler):
         @param page: the working page
         @type page: pywikibot.Page
         """
-        if page != self._current_page:
-            self._current_page = page
+        if page != self.current_page:
+            if self._local:
+                self._local.current_page = page
+            else:
+                self._current_page = page
             msg = u'Working on %r' % page.title()
             if config.colorized_output:
                 log(msg)
@@ -1353,8 +1421,17 @@ class BaseBot(OptionHandler):
         ignore_server_errors = kwargs.pop('ignore_server_errors', False)
 
         try:
-            func(*args, **kwargs)
-            self._save_counter += 1
+            if self._local:
+                # save only one page of a site at the same time
+                with self._lock:
+                    site_lock = self._site_locks.setdefault(
+                        page.site, threading.Lock())
+                with site_lock:
+                    func(*args, **kwargs)
+            else:
+                func(*args, **kwargs)
+            with self._lock:
+                self._save_counter += 1
         except pywikibot.PageSaveRelatedError as e:
             if not ignore_save_related_errors:
                 raise
@@ -1390,8 +1467,8 @@ class BaseBot(OptionHandler):
         Cleanup and exit processing.
 
         Invoked when Bot.run() is finished.
-        Prints treat and save counters and informs whether the script
-        terminated gracefully or was halted by exception.
+        Prints treat and save counters and the throttle waits and informs
+        whether the script terminated gracefully or was halted by exception.
         May be overridden by subclasses.
         """
         pywikibot.output("\n%i pages read"
@@ -1415,6 +1492,18 @@ class BaseBot(OptionHandler):
                 pywikibot.output("Write operation time: %d seconds"
                                  % (seconds / self._save_counter))
 
+            # the throttles are shared by all bots of this process
+            slept = 0
+            for site in pywikibot._sites.values():
+                throttle = getattr(site, '_throttle', None)
+                report = throttle.report() if throttle else None
+                if report:
+                    pywikibot.output(report)
+                    slept += sum(throttle.slept.values())
+            if slept and seconds:
+                pywikibot.output('Throttle wait time: {0:.0%} of the '
+                                 'execution time'.format(slept / seconds))
+
         # exc_info contains exception from self.run() while terminating
         exc_info = sys.exc_info()
         if exc_info[0] is None or exc_info[0] is KeyboardInterrupt:
@@ -1447,7 +1536,14 @@ class BaseBot(OptionHandler):
             # relies on sys.exc_info returning exceptions occurring in `run`.
             sys.exc_clear()
 
+        workers = 1
+        if self.concurrent and self.getOption('always'):
+            workers = config.concurrent_bot_workers
+
         try:
+            if workers > 1:
+                self._run_concurrently(workers)
+                return
             for page in self.generator:
                 try:
                     self.init_page(page)
@@ -1482,6 +1578,75 @@ class BaseBot(OptionHandler):
         finally:
             self.exit()
 
+    def _run_concurrently(self, workers):
+        """
+        Process all pages in generator with several threads calling treat.
+
+        The generator and init_page are used by the calling thread, which
+        continues with the next pages while the workers treat the previous
+        ones. When treat raises an exception, the pages which are not
+        treated yet are skipped and the first exception is raised again
+        with the traceback of the worker. Pages are only saved one after
+        another per site when treat uses userPut or put_current.
+
+        @param workers: the number of threads calling treat
+        @type workers: int
+        """
+        pages = Queue(maxsize=2 * workers)
+        stop = threading.Event()
+        errors = []
+
+        def worker():
+            while True:
+                page = pages.get()
+                if page is None:
+                    break
+                if stop.is_set():
+                    continue
+                try:
+                    self.treat(page)
+                except BaseException:
+                    errors.append(sys.exc_info())
+                    stop.set()
+                else:
+                    with self._lock:
+                        self._treat_counter += 1
+
+        self._local = threading.local()
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            for page in self.generator:
+                if stop.is_set():
+                    break
+                try:
+                    self.init_page(page)
+                except SkipPageError as e:
+                    pywikibot.warning('Skipped "{0}" due to: {1}'.format(
+                                      page, e.reason))
+                    if PY2:
+                        sys.exc_clear()
+                    continue
+                pages.put(page)
+        except BaseException:
+            stop.set()
+            raise
+        finally:
+            for thread in threads:
+                pages.put(None)
+            for thread in threads:
+                thread.join()
+            self._local = None
+        if errors:
+            exc_info = errors[0]
+            if PY2:
+                # Python 2 would use the traceback of this thread
+                exec('raise exc_info[0], exc_info[1], exc_info[2]',
+                     {'exc_info': exc_info})
+            raise exc_info[1]
+
 
 # TODO: Deprecate Bot class as self.site may be the site of the page or may be
 # a site previously defined
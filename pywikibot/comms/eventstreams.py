@@ -15,8 +15,14 @@ This module requires sseclient to be installed:
 #
 from __future__ import absolute_import, unicode_literals
 
+import codecs
 import json
+import os
 import socket
+import threading
+import time
+
+from collections import namedtuple
 
 from requests.packages.urllib3.exceptions import ProtocolError
 from requests.packages.urllib3.response import httplib
@@ -27,10 +33,187 @@ except ImportError as e:
     EventSource = e
 
 from pywikibot import config, debug, Site, warning
-from pywikibot.tools import StringTypes
+from pywikibot.tools import Counter, Queue, StringTypes
 
 _logger = 'pywikibot.eventstreams'
 
+# event read from a recorded event log
+ReplayedEvent = namedtuple('ReplayedEvent', 'id event data')
+
+
+class FileCheckpoint(object):
+
+    """
+    Store the id of the last processed event in a local file.
+
+    Committed ids are written to the file when interval ids were committed
+    or delay seconds passed since the last write. The file is replaced
+    atomically and synced to disk on every write.
+
+    Any object with the methods load, commit and flush can be used as
+    checkpoint store of EventStreams.
+    """
+
+    def __init__(self, filename, interval=100, delay=5):
+        """
+        Constructor.
+
+        @param filename: the file to store the last event id in
+        @type filename: str
+        @param interval: the number of commits after which the id is written
+        @type interval: int
+        @param delay: the number of seconds after which a committed id is
+            written
+        @type delay: int or float
+        """
+        self.filename = filename
+        self.interval = interval
+        self.delay = delay
+        self._last_id = None
+        self._pending = 0
+        self._written = time.time()
+
+    def load(self):
+        """
+        Return the stored event id.
+
+        @return: the id or None if no id is stored
+        @rtype: str or None
+        """
+        try:
+            with codecs.open(self.filename, 'r', 'utf-8') as f:
+                return f.read() or None
+        except IOError:
+            return None
+
+    def commit(self, last_id):
+        """Commit the id of the last processed event."""
+        self._last_id = last_id
+        self._pending += 1
+        if self._pending >= self.interval \
+           or time.time() - self._written >= self.delay:
+            self.flush()
+
+    def flush(self):
+        """Write the last committed id to the file."""
+        if not self._pending:
+            return
+        tmp = self.filename + '.tmp'
+        with codecs.open(tmp, 'w', 'utf-8') as f:
+            f.write(self._last_id)
+            f.flush()
+            os.fsync(f.fileno())
+        if hasattr(os, 'replace'):
+            os.replace(tmp, self.filename)
+        else:
+            if os.name == 'nt' and os.path.exists(self.filename):
+                os.remove(self.filename)
+            os.rename(tmp, self.filename)
+        self._pending = 0
+        self._written = time.time()
+
+
+def _value_filter(key, value):
+    """
+    Return a filter function matching data[key] against value.
+
+    The key and the values to be matched are stored as attributes of the
+    function to be able to combine several filters when compiling them.
+
+    @param key: a key of the event data dict
+    @type key: str
+    @param value: the value or an iterable of values data[key] may match
+    @return: the filter function
+    @rtype: function
+    """
+    # singletons are compared by identity
+    if isinstance(value, (bool, type(None))):
+        def func(data):
+            return key in data and data[key] is value
+        func.values = None
+    # a single value
+    elif isinstance(value, (StringTypes, int)):
+        def func(data):
+            return key in data and data[key] == value
+        func.values = frozenset((value, ))
+    # an iterable as value
+    else:
+        def func(data):
+            return key in data and data[key] in value
+        try:
+            func.values = frozenset(value)
+        except TypeError:  # unhashable values
+            func.values = None
+    func.key = key
+    return func
+
+
+def _contains(values, data, key):
+    """Return whether data has key and its value is one of values."""
+    try:
+        return key in data and data[key] in values
+    except TypeError:  # unhashable data value
+        return False
+
+
+def _compile_filters(filters):
+    """
+    Compile filters as registered by EventStreams.register_filter.
+
+    Value filters of the same key are combined into a single set lookup
+    for 'none' and 'any' filters. All other filters are called in the
+    order they were registered.
+
+    @param filters: the 'all', 'any' and 'none' filter functions
+    @type filters: dict
+    @return: the predicate implementing EventStreams.streamfilter
+    @rtype: function
+    """
+    def index(functions):
+        """Merge value filters per key, return key index and functions."""
+        keys = {}
+        others = []
+        for func in functions:
+            if getattr(func, 'values', None) is not None:
+                keys.setdefault(func.key, set()).update(func.values)
+            else:
+                others.append(func)
+        return [(key, frozenset(values)) for key, values in keys.items()], \
+            others
+
+    none_keys, none_funcs = index(filters['none'])
+    any_keys, any_funcs = index(filters['any'])
+    all_keys = [(func.key, func.values) for func in filters['all']
+                if getattr(func, 'values', None) is not None]
+    all_funcs = [func for func in filters['all']
+                 if getattr(func, 'values', None) is None]
+    check_any = bool(filters['any'])
+
+    def predicate(data):
+        for key, values in none_keys:
+            if _contains(values, data, key):
+                return False
+        for func in none_funcs:
+            if func(data):
+                return False
+        for key, values in all_keys:
+            if not _contains(values, data, key):
+                return False
+        for func in all_funcs:
+            if not func(data):
+                return False
+        if not check_any:
+            return True
+        for key, values in any_keys:
+            if _contains(values, data, key):
+                return True
+        for func in any_funcs:
+            if func(data):
+                return True
+        return False
+
+    return predicate
+
 
 class EventStreams(object):
 
@@ -75,20 +258,52 @@ class EventStreams(object):
         @keyword url: an url retrieving events from. Will be set up to a
             default url using _site.family settings and streamtype
         @type url: str
+        @keyword buffer_size: if given, events are read, decoded and
+            filtered in a background thread and up to buffer_size events
+            are buffered for the consumer. Further events are dropped
+            while the buffer is full, unless a checkpoint is given; then
+            reading waits for the consumer, so no event is skipped.
+        @type buffer_size: int
+        @keyword checkpoint: a checkpoint store like L{FileCheckpoint}. The
+            stream resumes after the event id loaded from it and commits
+            the id of every event after it was processed.
+        @keyword record: a file name to append all received events to
+        @type record: str
+        @keyword replay: a file name of events recorded before to be read
+            instead of the stream. The file may also be given as url
+            'file://<file name>'.
+        @type replay: str
         @param kwargs: keyword arguments passed to SSEClient and requests lib
         @type kwargs: dict
         @raises ImportError: sseclient is not installed
         """
-        if isinstance(EventSource, Exception):
+        self._replay = kwargs.pop('replay', None)
+        if (kwargs.get('url') or '').startswith('file://'):
+            self._replay = kwargs['url'][len('file://'):]
+        if isinstance(EventSource, Exception) and not self._replay:
             raise ImportError('sseclient is required for EventStreams;\n'
                               'install it with "pip install sseclient"\n')
         self.filter = {'all': [], 'any': [], 'none': []}
+        self._compiled = None
         self._total = None
+        self._buffer_size = kwargs.pop('buffer_size', None)
+        self._checkpoint = kwargs.pop('checkpoint', None)
+        self._record = kwargs.pop('record', None)
+        self.counter = Counter()
+        # the counters are updated by the reader and the consumer thread
+        self._counter_lock = threading.Lock()
+        self._started = None
         self._site = kwargs.pop('site', Site())
         self._stream = kwargs.pop('stream', None)
+        if self._replay and not kwargs.get('url') and self._stream is None:
+            self._url = 'file://' + self._replay
         self._url = kwargs.get('url') or self.url
         kwargs.setdefault('url', self._url)
         kwargs.setdefault('timeout', config.socket_timeout)
+        if self._checkpoint is not None and 'last_id' not in kwargs:
+            last_id = self._checkpoint.load()
+            if last_id is not None:
+                kwargs['last_id'] = last_id
         self.sse_kwargs = kwargs
 
     @property
@@ -195,72 +410,261 @@ class EventStreams(object):
 
         # register pairs of keys and items as a filter function
         for key, value in kwargs.items():
-            # append function for singletons
-            if isinstance(value, (bool, type(None))):
-                self.filter[ftype].append(lambda e: key in e and
-                                          e[key] is value)
-            # append function for a single value
-            elif isinstance(value, (StringTypes, int)):
-                self.filter[ftype].append(lambda e: key in e and
-                                          e[key] == value)
-            # append function for an iterable as value
-            else:
-                self.filter[ftype].append(lambda e: key in e and
-                                          e[key] in value)
+            self.filter[ftype].append(_value_filter(key, value))
 
     def streamfilter(self, data):
         """Filter function for eventstreams.
 
-        See the description of register_filter() how it works.
+        See the description of register_filter() how it works. The
+        registered filters are compiled into a single predicate, which is
+        compiled again when filters are added.
 
         @param data: event data dict used by filter functions
         @type data: dict
         """
-        if any(function(data) for function in self.filter['none']):
-            return False
-        if not all(function(data) for function in self.filter['all']):
-            return False
-        if not self.filter['any']:
-            return True
-        return any(function(data) for function in self.filter['any'])
+        key = (id(self.filter), len(self.filter['all']),
+               len(self.filter['any']), len(self.filter['none']))
+        if self._compiled is None or self._compiled[0] != key:
+            self._compiled = key, _compile_filters(self.filter)
+        return self._compiled[1](data)
 
-    def __iter__(self):
-        """Iterator."""
-        n = 0
+    def statistics(self):
+        """
+        Return the counters of the stream.
+
+        The counters are 'received' messages, 'matched' events passing the
+        filters, 'delivered' events, events 'dropped' because the buffer
+        was full, 'errors' and 'reconnects'. 'rate' is the number of
+        received messages per second since the stream was started.
+
+        @rtype: dict
+        """
+        with self._counter_lock:
+            stats = dict(self.counter)
+        if self._started is not None:
+            elapsed = time.time() - self._started
+            stats['rate'] = stats.get('received', 0) / elapsed if elapsed \
+                else 0.0
+        return stats
+
+    def _count(self, key, n=1):
+        """Increase a counter of the stream."""
+        with self._counter_lock:
+            self.counter[key] += n
+
+    def _replayed_events(self):
+        """
+        Yield the events recorded in the replay file.
+
+        If the last_id keyword is given, events up to this id are skipped.
+        """
+        last_id = self.sse_kwargs.get('last_id')
+        with codecs.open(self._replay, 'r', 'utf-8') as f:
+            for line in f:
+                event = ReplayedEvent(**json.loads(line))
+                if last_id is not None:
+                    if event.id == last_id:
+                        last_id = None
+                    continue
+                yield event
+
+    def _events(self, stop=None):
+        """
+        Read, decode and filter events until stop is set.
+
+        @param stop: an event telling to stop reading
+        @type stop: threading.Event
+        @return: pairs of event id and event data
+        @rtype: generator
+        """
         event = None
-        while self._total is None or n < self._total:
-            if not hasattr(self, 'source'):
-                self.source = EventSource(**self.sse_kwargs)
-            try:
-                event = next(self.source)
-            except (ProtocolError, socket.error, httplib.IncompleteRead) as e:
-                warning('Connection error: {0}.\n'
-                        'Try to re-establish connection.'.format(e))
-                del self.source
-                if event is not None:
-                    self.sse_kwargs['last_id'] = event.id
-                continue
-            if event.event == 'message' and event.data:
+        if self._started is None:
+            self._started = time.time()
+        record = codecs.open(self._record, 'a', 'utf-8') \
+            if self._record else None
+        try:
+            while stop is None or not stop.is_set():
+                if not hasattr(self, 'source'):
+                    if self._replay:
+                        self.source = self._replayed_events()
+                    else:
+                        self.source = EventSource(**self.sse_kwargs)
                 try:
-                    element = json.loads(event.data)
-                except ValueError as e:
-                    warning('Could not load json data from\n{0}\n{1}'
-                            .format(event, e))
+                    event = next(self.source)
+                except StopIteration:  # end of the replayed events
+                    break
+                except (ProtocolError, socket.error,
+                        httplib.IncompleteRead) as e:
+                    warning('Connection error: {0}.\n'
+                            'Try to re-establish connection.'.format(e))
+                    self._count('reconnects')
+                    del self.source
+                    if event is not None:
+                        self.sse_kwargs['last_id'] = event.id
+                    continue
+                self._count('received')
+                if record:
+                    record.write(json.dumps({'id': event.id,
+                                             'event': event.event,
+                                             'data': event.data}) + '\n')
+                if event.event == 'message' and event.data:
+                    try:
+                        element = json.loads(event.data)
+                    except ValueError as e:
+                        self._count('errors')
+                        warning('Could not load json data from\n{0}\n{1}'
+                                .format(event, e))
+                    else:
+                        if self.streamfilter(element):
+                            self._count('matched')
+                            yield event.id, element
+                elif event.event == 'message' and not event.data:
+                    warning('Empty message found.')
+                elif event.event == 'error':
+                    self._count('errors')
+                    warning('Encountered error: {0}'.format(event.data))
                 else:
-                    if self.streamfilter(element):
-                        n += 1
-                        yield element
-            elif event.event == 'message' and not event.data:
-                warning('Empty message found.')
-            elif event.event == 'error':
-                warning('Encountered error: {0}'.format(event.data))
-            else:
-                warning('Unknown event {0} occured.'.format(event.event))
+                    warning('Unknown event {0} occured.'.format(event.event))
+        finally:
+            if record:
+                record.close()
+
+    def _read(self, buffer, stop):
+        """
+        Read events into the buffer until stop is set.
+
+        Events are dropped while the buffer is full, unless there is a
+        checkpoint: a dropped event would be skipped when the stream is
+        resumed after a later event, so reading waits for the consumer
+        then. The end of reading is signalled by putting None, or the
+        exception raised, into it.
+        """
+        try:
+            for item in self._events(stop):
+                if self._checkpoint is not None:
+                    while not stop.is_set():
+                        try:
+                            buffer.put(item, True, 0.25)
+                        except Queue.Full:
+                            continue
+                        break
+                    continue
+                try:
+                    buffer.put_nowait(item)
+                except Queue.Full:
+                    self._count('dropped')
+        except Exception as e:
+            if not stop.is_set():
+                buffer.put(e)
         else:
+            if not stop.is_set():
+                buffer.put(None)
+        finally:
+            if hasattr(self, 'source'):
+                del self.source
+
+    def _buffered(self, buffer_size):
+        """
+        Start reading events in a background thread.
+
+        @return: the buffer filled by the thread and the event to stop it
+        @rtype: tuple
+        """
+        buffer = Queue.Queue(buffer_size)
+        stop = threading.Event()
+        thread = threading.Thread(target=self._read, args=(buffer, stop),
+                                  name='EventStreams reader')
+        # thread dies when program terminates
+        thread.setDaemon(True)
+        thread.start()
+        return buffer, stop
+
+    def _limit_reached(self, n):
+        """Return whether the maximum number of items is reached."""
+        if self._total is not None and n >= self._total:
             debug('{0}: Stopped iterating due to '
                   'exceeding item limit.'
                   .format(self.__class__.__name__), _logger)
-        del self.source
+            return True
+        return False
+
+    def _commit(self, last_id):
+        """Commit the id of the last processed event to the checkpoint."""
+        if self._checkpoint is not None and last_id is not None:
+            self._checkpoint.commit(last_id)
+
+    def __iter__(self):
+        """Iterator."""
+        if self._buffer_size:
+            for batch in self.batches(1):
+                yield batch[0]
+            return
+
+        n = 0
+        try:
+            if not self._limit_reached(n):
+                for event_id, element in self._events():
+                    n += 1
+                    self._count('delivered')
+                    yield element
+                    self._commit(event_id)
+                    if self._limit_reached(n):
+                        break
+        finally:
+            if self._checkpoint is not None:
+                self._checkpoint.flush()
+        if hasattr(self, 'source'):
+            del self.source
+
+    def batches(self, size=100, timeout=1.0):
+        """
+        Yield lists of events.
+
+        Events are read in a background thread with a buffer of
+        buffer_size events, 1000 by default. A list is yielded when it
+        has size events or timeout seconds passed since its first event
+        was read from the buffer.
+
+        @param size: the maximum number of events in a list
+        @type size: int
+        @param timeout: the maximum number of seconds to wait for further
+            events when a list is not full
+        @type timeout: int or float
+        @rtype: generator of lists
+        """
+        n = 0
+        if self._limit_reached(n):
+            return
+        buffer, stop = self._buffered(self._buffer_size or 1000)
+        try:
+            while True:
+                item = buffer.get()
+                batch = []
+                last_id = None
+                deadline = time.time() + timeout
+                while item is not None and not isinstance(item, Exception):
+                    last_id, element = item
+                    batch.append(element)
+                    n += 1
+                    if len(batch) >= size or self._limit_reached(n):
+                        break
+                    remaining = deadline - time.time()
+                    try:
+                        item = buffer.get(timeout=max(remaining, 0))
+                    except Queue.Empty:
+                        break
+                if batch:
+                    self._count('delivered', len(batch))
+                    yield batch
+                    self._commit(last_id)
+                if isinstance(item, Exception):
+                    raise item
+                if item is None or self._limit_reached(n):
+                    break
+        finally:
+            stop.set()
+            if self._checkpoint is not None:
+                self._checkpoint.flush()
 
 
 def site_rc_listener(site, total=None):
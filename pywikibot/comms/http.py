@@ -24,6 +24,7 @@ __docformat__ = 'epytext'
 
 import atexit
 import sys
+import time
 
 from string import Formatter
 from warnings import warn
@@ -43,7 +44,7 @@ else:
     from urllib2 import quote
     from urlparse import urlparse
 
-from pywikibot import config
+from pywikibot import config, metrics
 
 from pywikibot import __release__
 from pywikibot.bot import calledModuleName
@@ -372,13 +373,28 @@ def _http_process(session, http_request):
         # Note that the connections are pooled which mean that a future
         # HTTPS request can succeed even if the certificate is invalid and
         # verify=True, when a request with verify=False happened before
+        started = time.time()
         response = session.request(method, uri, params=params, data=body,
                                    headers=headers, auth=auth, timeout=timeout,
                                    verify=not ignore_validation)
     except Exception as e:
         http_request.data = e
+        if metrics.registry:
+            metrics.increment('http_errors', 1,
+                              {'host': http_request.hostname,
+                               'error': e.__class__.__name__})
     else:
         http_request.data = response
+        if metrics.registry:
+            labels = {'host': http_request.hostname}
+            metrics.observe('http_latency_seconds', time.time() - started,
+                            labels)
+            metrics.increment('http_requests', 1,
+                              dict(labels, status=response.status_code))
+            if isinstance(body, (bytes, ) + StringTypes):
+                metrics.increment('http_bytes_sent', len(body), labels)
+            metrics.increment('http_bytes_received', len(response.content),
+                              labels)
 
 
 def error_handling_callback(request):
@@ -477,6 +477,11 @@ try:
 except:
     colorized_output = False
 
+# Should pywikibot.showDiff only output the changed line ranges and the
+# number of removed and added lines instead of the full colored diff?
+# This avoids formatting large diffs in unattended runs, e.g. with -always.
+diff_summary = False
+
 # An indication of the size of your screen, or rather the size of the screen
 # to be shown, for flickrripper
 tkhorsize = 1600
@@ -529,6 +534,16 @@ log_pywiki_repo_version = False
 # if True, include a lot of debugging info in logfile
 # (overrides log setting above)
 debug_log = []
+# Record metrics of the API and HTTP requests and of the throttle, e.g. the
+# latency, the transferred bytes and the retries per site and API module.
+# This setting can be overridden by the -metrics command-line argument.
+metrics = False
+# The metrics are written to this file in the 'logs' subdirectory when the
+# bot exits. Use None to keep them in memory only.
+metrics_file = None
+# Format of the metrics file: 'jsonl' appends a JSON object per metric and
+# line, 'prometheus' writes the Prometheus text format.
+metrics_format = 'jsonl'
 
 # ############# EXTERNAL SCRIPT PATH SETTING ##############
 # set your own script path to lookup for your script files.
@@ -613,6 +628,13 @@ sort_ignore_case = False
 # Commons by default.
 upload_to_commons = False
 
+# Keep a journal of chunked uploads in the uploads subdirectory, so that an
+# interrupted upload of the same file continues with the chunks already
+# stashed on the wiki. Only local files are resumed; files downloaded from
+# a URL, e.g. by data_ingestion, are uploaded from a new temporary file each
+# time and start from the beginning.
+upload_journal = True
+
 # ############# SETTINGS TO AVOID SERVER OVERLOAD ##############
 
 # Slow down the robot such that it never requests a second page within
@@ -633,6 +655,11 @@ put_throttle = 10
 # than 'noisysleep' seconds, it is logged on the screen.
 noisysleep = 3.0
 
+# Append each throttled request as a JSON line to this file in the 'logs'
+# subdirectory. The recorded timeline can be replayed against other throttle
+# settings with the throttle_simulator.py maintenance script.
+throttle_timeline = None
+
 # Defer bot edits during periods of database server lag. For details, see
 # https://www.mediawiki.org/wiki/Maxlag_parameter
 # You can set this variable to a number of seconds, or to None (or 0) to
@@ -673,6 +700,12 @@ deIndentTables = True
 # that slow servers won't slow you down.
 max_external_links = 50
 
+# How many of these links may be checked on the same host at the same time
+# and how many seconds should be waited between starting two checks of links
+# on the same host?
+max_external_links_per_host = 2
+weblink_host_delay = 1
+
 report_dead_links_on_talk = False
 
 # Don't alert on links days_dead old or younger
@@ -693,6 +726,10 @@ db_connect_file = user_home_path('.my.cnf')
 # local port for mysql server
 # ssh -L 4711:enwiki.labsdb:3306 user@tools-login.wmflabs.org
 db_port = 3306
+# number of rows fetched at once from the server by mysql queries
+db_fetch_size = 1000
+# number of idle connections per database kept for later mysql queries
+db_pool_size = 4
 
 # ############# SEARCH ENGINE SETTINGS ##############
 
@@ -858,6 +895,22 @@ simulate = False
 # processing. As higher this value this effect will decrease.
 max_queue_size = 64
 
+# How many pages are treated in parallel by bots which support it (their
+# class sets concurrent = True) when they run without asking the user, e.g.
+# with the -always option. Set it to 1 to treat one page after another.
+concurrent_bot_workers = 4
+
+# How many categories are queried in parallel when the subcategories or
+# articles of a category tree are iterated recursively. Set it to 1 to query
+# one category after another.
+concurrent_category_workers = 4
+
+# Whether the pages iterated by several generators, e.g. with -intersect or
+# to skip duplicates, are told apart by their hashes instead of being kept
+# until the end. This saves memory when iterating millions of pages; two
+# different pages with the same 64-bit hash are very unlikely.
+compact_dedup = False
+
 # Define the line separator. Pages retrieved via API have "\n" whereas
 # pages fetched from screen (mostly) have "\r\n". Interwiki and category
 # separator settings in family files should use multiplied of this.
@@ -30,7 +30,7 @@ except ImportError:
 
 import pywikibot
 
-from pywikibot import config, login
+from pywikibot import config, login, metrics
 
 from pywikibot.comms import http
 from pywikibot.exceptions import (
@@ -1919,6 +1919,7 @@ class Request(MutableMapping):
                 use_get = True
         else:
             use_get = self.use_get
+        labels = self._metrics_labels() if metrics.registry else None
         while True:
             paramstring = self._http_param_string()
             simulate = self._simulate(self.action)
@@ -1946,12 +1947,13 @@ class Request(MutableMapping):
                     else:
                         body = paramstring
 
-                pywikibot.debug('API request to {0} (uses get: {1}):\n'
+                pywikibot.debug(lambda: 'API request to {0} (uses get: {1}):\n'
                                 'Headers: {2!r}\nURI: {3!r}\n'
                                 'Body: {4!r}'.format(self.site, use_get,
                                                      headers, uri, body),
                                 _logger)
 
+                started = time.time()
                 rawdata = http.request(
                     site=self.site, uri=uri, method='GET' if use_get else 'POST',
                     body=body, headers=headers)
@@ -1980,10 +1982,16 @@ class Request(MutableMapping):
                 pywikibot.log(u"%s, %s" % (uri, paramstring))
                 self.wait()
                 continue
+            if labels:
+                metrics.observe('api_latency_seconds', time.time() - started,
+                                labels)
+                metrics.increment('api_requests', 1, labels)
+                metrics.increment('api_bytes_sent', len(body or uri), labels)
+                metrics.increment('api_bytes_received', len(rawdata), labels)
             if not isinstance(rawdata, unicode):
                 rawdata = rawdata.decode(self.site.encoding())
-            pywikibot.debug((u"API response received from %s:\n" % self.site) +
-                            rawdata, _logger)
+            pywikibot.debug(lambda: (u"API response received from %s:\n"
+                                     % self.site) + rawdata, _logger)
             if rawdata.startswith(u"unknown_action"):
                 raise APIError(rawdata[:14], rawdata[16:])
             try:
@@ -2081,6 +2089,8 @@ class Request(MutableMapping):
                 if lag:
                     pywikibot.log(
                         u"Pausing due to database lag: " + info)
+                    if labels:
+                        metrics.increment('api_maxlag_waits', 1, labels)
                     self.site.throttle.lag(int(lag.group("lag")))
                     continue
             elif code == 'help' and self.action == 'help':
@@ -2203,11 +2213,24 @@ class Request(MutableMapping):
             except TypeError:
                 raise RuntimeError(result)
 
+    def _metrics_labels(self):
+        """Return the site and the API module as labels of metrics."""
+        module = self.action
+        if module == 'query':
+            submodules = set()
+            for mod_type_name in ('list', 'prop', 'generator', 'meta'):
+                submodules.update(self._params.get(mod_type_name, []))
+            if submodules:
+                module += '+' + '|'.join(sorted(submodules))
+        return {'site': str(self.site), 'module': module}
+
     def wait(self):
         """Determine how long to wait after a failed request."""
         self.max_retries -= 1
         if self.max_retries < 0:
             raise TimeoutError("Maximum retries attempted without success.")
+        if metrics.registry:
+            metrics.increment('api_retries', 1, self._metrics_labels())
         pywikibot.warning(u"Waiting %s seconds before retrying."
                           % self.retry_wait)
         time.sleep(self.retry_wait)
@@ -2355,6 +2378,9 @@ class CachedRequest(Request):
             self._data = super(CachedRequest, self).submit()
             self._write_cache(self._data)
         else:
+            if metrics.registry:
+                metrics.increment('api_cache_hits', 1,
+                                  self._metrics_labels())
             self._handle_warnings(self._data)
         return self._data
 
@@ -2465,8 +2491,8 @@ class APIGenerator(_RequestWrapper):
         n = 0
         while True:
             self.request[self.continue_name] = offset
-            pywikibot.debug(u"%s: Request: %s" % (self.__class__.__name__,
-                                                  self.request), _logger)
+            pywikibot.debug(lambda: u"%s: Request: %s" % (
+                self.__class__.__name__, self.request), _logger)
             data = self.request.submit()
 
             n_items = len(data[self.data_name])
@@ -2773,7 +2799,7 @@ class QueryGenerator(_RequestWrapper):
             if 'query' in self.data and self.resultkey in self.data["query"]:
                 resultdata = self.data["query"][self.resultkey]
                 if isinstance(resultdata, dict):
-                    pywikibot.debug(u"%s received %s; limit=%s"
+                    pywikibot.debug(lambda: u"%s received %s; limit=%s"
                                     % (self.__class__.__name__,
                                        list(resultdata.keys()),
                                        self.limit),
@@ -2789,7 +2815,7 @@ class QueryGenerator(_RequestWrapper):
                         resultdata = [resultdata[k]
                                       for k in sorted(resultdata.keys())]
                 else:
-                    pywikibot.debug(u"%s received %s; limit=%s"
+                    pywikibot.debug(lambda: u"%s received %s; limit=%s"
                                     % (self.__class__.__name__,
                                        resultdata,
                                        self.limit),
@@ -0,0 +1,533 @@
+# -*- coding: utf-8 -*-
+"""Local store of the category graph of a wiki."""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+import sqlite3
+
+import pywikibot
+
+from pywikibot import config
+from pywikibot.data import api
+from pywikibot.logging import debug
+from pywikibot.tools import MediaWikiVersion
+
+_logger = 'data.categorygraph'
+
+# Number of pages whose properties are queried in one request
+BATCH_SIZE = 50
+
+# Number of IDs in one SQL statement, below the default limit of 999
+# sqlite variables
+SQL_BATCH_SIZE = 500
+
+# Default age of the oldest recent changes ($wgRCMaxAge). The changes of a
+# graph updated before are not known anymore, so all of it is outdated.
+RC_MAX_AGE = datetime.timedelta(days=30)
+
+
+def _batches(items, size):
+    """Yield lists of up to size items."""
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class CategoryGraph(object):
+
+    """
+    Category graph of a wiki, stored in a sqlite database.
+
+    Pages are keyed by their page ID, which is kept when a page is moved.
+    Categories without a description page get negative IDs. Each edge links
+    a category with one of its members, so the edges are the adjacency
+    lists of the members of a category and of the categories of a page.
+
+    The members of a category and the categories of a page are fetched
+    when they are first needed and kept afterwards. L{update} marks those
+    which changed since the last update as outdated, so that only they are
+    fetched again. L{walk} fetches a category tree level by level.
+    """
+
+    def __init__(self, site, filename=None):
+        """
+        Constructor.
+
+        @param site: the site of the categories
+        @type site: pywikibot.site.APISite
+        @param filename: the database file, by default categories/
+            <family>-<code>.sqlite3 in the base directory
+        @type filename: str
+        """
+        self.site = site
+        if filename is None:
+            filename = config.datafilepath(
+                'categories', '%s-%s.sqlite3' % (site.family.name, site.code))
+        self.db = sqlite3.connect(filename, timeout=60)
+        with self.db:
+            # members and parents are 1 if the members of the category and
+            # the categories of the page are loaded
+            self.db.execute('CREATE TABLE IF NOT EXISTS pages '
+                            '(pageid INTEGER PRIMARY KEY, ns INTEGER, '
+                            'title TEXT UNIQUE, members INTEGER DEFAULT 0, '
+                            'parents INTEGER DEFAULT 0, pages INTEGER, '
+                            'files INTEGER, subcats INTEGER)')
+            self.db.execute('CREATE TABLE IF NOT EXISTS edges '
+                            '(parent INTEGER, child INTEGER, '
+                            'PRIMARY KEY (parent, child))')
+            self.db.execute('CREATE INDEX IF NOT EXISTS edges_child '
+                            'ON edges (child)')
+            self.db.execute('CREATE TABLE IF NOT EXISTS state '
+                            '(key TEXT PRIMARY KEY, value TEXT)')
+
+    def _get_state(self, key):
+        """Return a value of the state table."""
+        row = self.db.execute('SELECT value FROM state WHERE key = ?',
+                              (key, )).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key, value):
+        """Store a value in the state table."""
+        self.db.execute('INSERT OR REPLACE INTO state VALUES (?, ?)',
+                        (key, value))
+
+    def _query(self, query, ids):
+        """
+        Execute a statement for many IDs and return the rows.
+
+        @param query: the statement with {0} in place of the list of IDs
+        @type query: str
+        @param ids: the IDs
+        @type ids: iterable of int
+        @rtype: list
+        """
+        rows = []
+        for batch in _batches(ids, SQL_BATCH_SIZE):
+            rows += self.db.execute(
+                query.format(', '.join('?' * len(batch))), batch).fetchall()
+        return rows
+
+    def _store_pages(self, pages):
+        """
+        Store pages and return their IDs.
+
+        A title stored with another ID belongs to a page which was created,
+        deleted or moved since. The edges of a missing page stored with a
+        negative ID are moved to the new ID; another page is removed.
+
+        @param pages: tuples of the page ID, None for missing pages, the
+            namespace and the title
+        @type pages: iterable of tuple
+        @return: the title of each page mapped to its ID
+        @rtype: dict
+        """
+        ids = {}
+        for pageid, ns, title in pages:
+            row = self.db.execute('SELECT pageid FROM pages WHERE title = ?',
+                                  (title, )).fetchone()
+            if pageid is None:
+                if row:
+                    ids[title] = row[0]
+                    continue
+                lowest = self.db.execute(
+                    'SELECT MIN(pageid) FROM pages').fetchone()[0]
+                pageid = min(lowest or 0, 0) - 1
+            elif row and row[0] != pageid:
+                if row[0] < 0:
+                    self._rekey(row[0], pageid)
+                else:
+                    self._remove(row[0])
+            self.db.execute('INSERT OR IGNORE INTO pages (pageid, ns, title) '
+                            'VALUES (?, ?, ?)', (pageid, ns, title))
+            self.db.execute('UPDATE pages SET ns = ?, title = ? '
+                            'WHERE pageid = ?', (ns, title, pageid))
+            ids[title] = pageid
+        return ids
+
+    def _rekey(self, old, new):
+        """Move a page and its edges from one ID to another."""
+        self.db.execute('UPDATE OR IGNORE edges SET parent = ? '
+                        'WHERE parent = ?', (new, old))
+        self.db.execute('UPDATE OR IGNORE edges SET child = ? '
+                        'WHERE child = ?', (new, old))
+        self.db.execute('DELETE FROM edges WHERE parent = ? OR child = ?',
+                        (old, old))
+        if self.db.execute('SELECT 1 FROM pages WHERE pageid = ?',
+                           (new, )).fetchone():
+            self.db.execute('DELETE FROM pages WHERE pageid = ?', (old, ))
+        else:
+            # the categories of the new page are not known yet
+            self.db.execute('UPDATE pages SET pageid = ?, parents = 0 '
+                            'WHERE pageid = ?', (new, old))
+
+    def _remove(self, pageid):
+        """Remove a page and its edges and outdate its neighbours."""
+        self.db.execute('UPDATE pages SET members = 0 WHERE pageid IN '
+                        '(SELECT parent FROM edges WHERE child = ?)',
+                        (pageid, ))
+        self.db.execute('UPDATE pages SET parents = 0 WHERE pageid IN '
+                        '(SELECT child FROM edges WHERE parent = ?)',
+                        (pageid, ))
+        self.db.execute('DELETE FROM edges WHERE parent = ? OR child = ?',
+                        (pageid, pageid))
+        self.db.execute('DELETE FROM pages WHERE pageid = ?', (pageid, ))
+
+    def _set_members(self, pageid, members):
+        """
+        Store the members of a category.
+
+        @param pageid: the ID of the category
+        @type pageid: int
+        @param members: tuples of page ID, namespace and title
+        @type members: list of tuple
+        """
+        ids = self._store_pages(members)
+        self.db.execute('DELETE FROM edges WHERE parent = ?', (pageid, ))
+        self.db.executemany('INSERT OR IGNORE INTO edges VALUES (?, ?)',
+                            ((pageid, child) for child in ids.values()))
+        files = sum(1 for member in members if member[1] == 6)
+        subcats = sum(1 for member in members if member[1] == 14)
+        self.db.execute('UPDATE pages SET members = 1, pages = ?, files = ?, '
+                        'subcats = ? WHERE pageid = ?',
+                        (len(members) - files - subcats, files, subcats,
+                         pageid))
+
+    def _set_parents(self, pageid, parents):
+        """
+        Store the categories of a page.
+
+        @param pageid: the ID of the page
+        @type pageid: int
+        @param parents: tuples of page ID, None for missing categories, and
+            title of the categories
+        @type parents: list of tuple
+        """
+        ids = self._store_pages((parent, 14, title)
+                                for parent, title in parents)
+        self.db.execute('DELETE FROM edges WHERE child = ?', (pageid, ))
+        self.db.executemany('INSERT OR IGNORE INTO edges VALUES (?, ?)',
+                            ((parent, pageid) for parent in ids.values()))
+        self.db.execute('UPDATE pages SET parents = 1 WHERE pageid = ?',
+                        (pageid, ))
+
+    def _set_info(self, pageid, info):
+        """Store the numbers of members of a category."""
+        self.db.execute('UPDATE pages SET pages = ?, files = ?, subcats = ? '
+                        'WHERE pageid = ?',
+                        (info.get('pages', 0), info.get('files', 0),
+                         info.get('subcats', 0), pageid))
+
+    def _resolve(self, titles):
+        """
+        Return the IDs of pages, querying those which are not stored.
+
+        @param titles: the titles including the namespace
+        @type titles: iterable of unicode
+        @return: the title of each page mapped to its ID
+        @rtype: dict
+        """
+        titles = set(titles)
+        ids = {}
+        for batch in _batches(titles, SQL_BATCH_SIZE):
+            ids.update(self.db.execute(
+                'SELECT title, pageid FROM pages WHERE title IN ({0})'
+                .format(', '.join('?' * len(batch))), batch))
+        unknown = [title for title in titles if title not in ids]
+        for batch in _batches(unknown, BATCH_SIZE):
+            gen = api.PropertyGenerator('info', site=self.site,
+                                        parameters={'titles': batch})
+            pages = [(pagedata.get('pageid'), pagedata['ns'],
+                      pagedata['title']) for pagedata in gen]
+            with self.db:
+                ids.update(self._store_pages(pages))
+        return ids
+
+    def _page_id(self, page):
+        """Return the ID of a page."""
+        title = page.title(withSection=False)
+        return self._resolve([title])[title]
+
+    def load_info(self, pageids):
+        """
+        Fetch the numbers of members of categories.
+
+        The members of empty categories are stored as loaded, so that they
+        do not need another request.
+
+        @param pageids: the IDs of the categories
+        @type pageids: iterable of int
+        """
+        rows = self._query('SELECT pageid, title FROM pages '
+                           'WHERE subcats IS NULL AND pageid IN ({0})',
+                           pageids)
+        for batch in _batches(rows, BATCH_SIZE):
+            ids = dict((title, pageid) for pageid, title in batch)
+            gen = api.PropertyGenerator('categoryinfo', site=self.site,
+                                        parameters={'titles': list(ids)})
+            infos = [(ids[pagedata['title']], pagedata.get('categoryinfo', {}))
+                     for pagedata in gen if pagedata['title'] in ids]
+            with self.db:
+                for pageid, info in infos:
+                    if info.get('size', 0):
+                        self._set_info(pageid, info)
+                    else:
+                        self._set_members(pageid, [])
+
+    def load_members(self, pageids):
+        """
+        Fetch the members of the categories which are not loaded.
+
+        The API lists the members of one category per request. The numbers
+        of members are queried for many categories at once before, so that
+        empty categories are skipped.
+
+        @param pageids: the IDs of the categories
+        @type pageids: iterable of int
+        """
+        pageids = list(pageids)
+        self.load_info(pageids)
+        for pageid, title in self._query(
+                'SELECT pageid, title FROM pages '
+                'WHERE members = 0 AND pageid IN ({0})', pageids):
+            parameters = {'cmprop': 'ids|title'}
+            if pageid > 0:
+                parameters['cmpageid'] = pageid
+            else:
+                parameters['cmtitle'] = title
+            gen = api.ListGenerator('categorymembers', site=self.site,
+                                    parameters=parameters)
+            members = [(item['pageid'], item['ns'], item['title'])
+                       for item in gen]
+            with self.db:
+                self._set_members(pageid, members)
+            debug('Loaded {0} members of {1}'.format(len(members), title),
+                  _logger)
+
+    def load_parents(self, pageids):
+        """
+        Fetch the categories of the pages which are not loaded.
+
+        The categories of up to 50 pages are queried at once.
+
+        @param pageids: the IDs of the pages
+        @type pageids: iterable of int
+        """
+        rows = self._query('SELECT pageid FROM pages '
+                           'WHERE parents = 0 AND pageid IN ({0})', pageids)
+        with self.db:
+            # missing pages are in no category
+            for pageid, in rows:
+                if pageid < 0:
+                    self._set_parents(pageid, [])
+        for batch in _batches((row[0] for row in rows if row[0] > 0),
+                              BATCH_SIZE):
+            gen = api.PropertyGenerator('categories', site=self.site,
+                                        parameters={'pageids': batch})
+            parents = dict((pageid, []) for pageid in batch)
+            for pagedata in gen:
+                parents[pagedata['pageid']] += [
+                    category['title']
+                    for category in pagedata.get('categories', [])]
+            ids = self._resolve(title for titles in parents.values()
+                                for title in titles)
+            with self.db:
+                for pageid, titles in parents.items():
+                    self._set_parents(pageid,
+                                      [(ids[title], title) for title in titles])
+
+    def _neighbours(self, query, pageid):
+        """Return the pages of a query for the neighbours of a page."""
+        return [pywikibot.Category(self.site, title) if ns == 14 else
+                pywikibot.Page(self.site, title)
+                for ns, title in self.db.execute(query, (pageid, ))]
+
+    def subcategories(self, category):
+        """
+        Return the subcategories of a category.
+
+        @type category: pywikibot.Category
+        @rtype: list of pywikibot.Category
+        """
+        pageid = self._page_id(category)
+        self.load_members([pageid])
+        return self._neighbours(
+            'SELECT ns, title FROM edges JOIN pages ON child = pageid '
+            'WHERE parent = ? AND ns = 14 ORDER BY title', pageid)
+
+    def articles(self, category):
+        """
+        Return the pages of a category which are no categories.
+
+        @type category: pywikibot.Category
+        @rtype: list of pywikibot.Page
+        """
+        pageid = self._page_id(category)
+        self.load_members([pageid])
+        return self._neighbours(
+            'SELECT ns, title FROM edges JOIN pages ON child = pageid '
+            'WHERE parent = ? AND ns != 14 ORDER BY title', pageid)
+
+    def supercategories(self, page):
+        """
+        Return the categories of a page.
+
+        @type page: pywikibot.Page
+        @rtype: list of pywikibot.Category
+        """
+        pageid = self._page_id(page)
+        self.load_parents([pageid])
+        return self._neighbours(
+            'SELECT ns, title FROM edges JOIN pages ON parent = pageid '
+            'WHERE child = ? ORDER BY title', pageid)
+
+    def categoryinfo(self, category):
+        """
+        Return the numbers of members of a category.
+
+        @type category: pywikibot.Category
+        @return: the numbers of 'pages', 'files' and 'subcats' and their
+            sum as 'size', like Category.categoryinfo
+        @rtype: dict
+        """
+        pageid = self._page_id(category)
+        self.load_info([pageid])
+        pages, files, subcats = (count or 0 for count in self.db.execute(
+            'SELECT pages, files, subcats FROM pages WHERE pageid = ?',
+            (pageid, )).fetchone())
+        return {'size': pages + files + subcats, 'pages': pages,
+                'files': files, 'subcats': subcats}
+
+    def walk(self, category, depth=None, parents=False):
+        """
+        Iterate a category and its subcategories breadth first.
+
+        The members of each level of the tree are loaded before it is
+        yielded, and the numbers of members of the last level.
+
+        @param category: the root of the tree
+        @type category: pywikibot.Category
+        @param depth: the depth of the deepest subcategories; None for all
+        @type depth: int
+        @param parents: load the categories of each level too
+        @type parents: bool
+        @return: each category with its depth, each only once
+        @rtype: generator of tuple
+        """
+        level = [self._page_id(category)]
+        seen = set(level)
+        current = 0
+        while level:
+            expand = depth is None or current < depth
+            if expand:
+                self.load_members(level)
+            else:
+                self.load_info(level)
+            if parents:
+                self.load_parents(level)
+            for title, in self._query('SELECT title FROM pages '
+                                      'WHERE pageid IN ({0}) ORDER BY title',
+                                      level):
+                yield pywikibot.Category(self.site, title), current
+            if not expand:
+                return
+            children = self._query(
+                'SELECT child FROM edges JOIN pages ON child = pageid '
+                'WHERE ns = 14 AND parent IN ({0})', level)
+            level = sorted(set(child for child, in children) - seen)
+            seen.update(level)
+            current += 1
+
+    def update(self):
+        """
+        Outdate the members and categories changed since the last update.
+
+        The categorization changes in the recent changes, which need
+        MediaWiki 1.27, and the deletions and moves since the last update
+        are used. Otherwise the whole graph is outdated.
+        """
+        start = self._get_state('updated')
+        now = self.site.server_time()
+        if (start is None or
+                now - pywikibot.Timestamp.fromISOformat(start) > RC_MAX_AGE or
+                MediaWikiVersion(self.site.version()) <
+                MediaWikiVersion('1.27')):
+            with self.db:
+                if start is not None:
+                    self.db.execute('UPDATE pages SET members = 0, '
+                                    'parents = 0, pages = NULL, '
+                                    'files = NULL, subcats = NULL')
+                self._set_state('updated', now.isoformat())
+            return
+
+        categories = set()
+        revids = set()
+        for change in self.site.recentchanges(start=start, reverse=True,
+                                              changetype='categorize'):
+            categories.add(change['title'])
+            # the revision of the page which was added or removed
+            revids.add(change['revid'])
+        changed = set()
+        for batch in _batches(sorted(revids), BATCH_SIZE):
+            gen = api.PropertyGenerator('info', site=self.site,
+                                        parameters={'revids': batch})
+            changed.update(pagedata['pageid'] for pagedata in gen
+                           if 'pageid' in pagedata)
+        deleted = set()
+        for entry in self.site.logevents(logtype='delete', start=start,
+                                         reverse=True):
+            if entry.action() == 'delete' and 'title' in entry.data:
+                deleted.add(entry.data['title'])
+        moved = []
+        for entry in self.site.logevents(logtype='move', start=start,
+                                         reverse=True):
+            if 'actionhidden' not in entry.data:
+                moved.append((entry.data['pageid'], entry.target_ns.id,
+                              entry.target_title))
+
+        with self.db:
+            outdated = [pageid for title, pageid in self._query(
+                'SELECT title, pageid FROM pages WHERE title IN ({0})',
+                categories)]
+            self._query('UPDATE pages SET members = 0, pages = NULL, '
+                        'files = NULL, subcats = NULL '
+                        'WHERE ns = 14 AND pageid IN ({0})', outdated)
+            self._query('UPDATE pages SET parents = 0 WHERE pageid IN ({0})',
+                        changed)
+            for title, pageid in self._query(
+                    'SELECT title, pageid FROM pages WHERE title IN ({0})',
+                    deleted):
+                self._remove(pageid)
+            for pageid, ns, title in moved:
+                if self.db.execute('SELECT 1 FROM pages WHERE pageid = ?',
+                                   (pageid, )).fetchone():
+                    self._remove_title(title, pageid)
+                    self.db.execute(
+                        'UPDATE pages SET ns = ?, title = ?, members = 0, '
+                        'parents = 0 WHERE pageid = ?', (ns, title, pageid))
+            self._set_state('updated', now.isoformat())
+        debug('Outdated {0} categories and {1} pages, removed {2} and moved '
+              '{3} pages'.format(len(categories), len(changed), len(deleted),
+                                 len(moved)), _logger)
+
+    def _remove_title(self, title, pageid):
+        """Remove another page stored with the title."""
+        row = self.db.execute('SELECT pageid FROM pages WHERE title = ?',
+                              (title, )).fetchone()
+        if row and row[0] != pageid:
+            self._remove(row[0])
+
+    def clear(self):
+        """Remove all pages and edges."""
+        with self.db:
+            self.db.execute('DELETE FROM edges')
+            self.db.execute('DELETE FROM pages')
+            self.db.execute('DELETE FROM state')
+
+    def close(self):
+        """Close the database."""
+        self.db.close()
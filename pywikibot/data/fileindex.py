@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""Local index of the SHA1 hashes of the files on a wiki."""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import sqlite3
+
+from pywikibot import config
+from pywikibot.data import api
+from pywikibot.logging import debug, output
+
+_logger = 'data.fileindex'
+
+
+class FileHashIndex(object):
+
+    """
+    SHA1 hashes of the files on a wiki, stored in a sqlite database.
+
+    The index is built once from the allimages list and can be continued
+    if the build was interrupted. Afterwards it is refreshed with the
+    upload, deletion and move log entries since the last update. It allows
+    to look up many hashes at once without a request per file, e.g. to skip
+    duplicates before uploading a batch of files.
+    """
+
+    def __init__(self, site):
+        """
+        Constructor.
+
+        @param site: the site of the files
+        @type site: pywikibot.site.APISite
+        """
+        self.site = site
+        self.db = sqlite3.connect(config.datafilepath(
+            'uploads', 'sha1-%s-%s.sqlite3' % (site.family.name, site.code)),
+            timeout=60)
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS files '
+                            '(title TEXT PRIMARY KEY, sha1 TEXT)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS files_sha1 '
+                            'ON files (sha1)')
+            self.db.execute('CREATE TABLE IF NOT EXISTS state '
+                            '(key TEXT PRIMARY KEY, value TEXT)')
+
+    def _get_state(self, key):
+        """Return a value of the state table."""
+        row = self.db.execute('SELECT value FROM state WHERE key = ?',
+                              (key, )).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key, value):
+        """Store a value in the state table."""
+        self.db.execute('INSERT OR REPLACE INTO state VALUES (?, ?)',
+                        (key, value))
+
+    @property
+    def complete(self):
+        """Return whether the index was built completely."""
+        return self._get_state('complete') is not None
+
+    def build(self, batch_size=500):
+        """
+        Add the files of the allimages list to the index.
+
+        The last file added is stored after each batch, so an interrupted
+        build continues with it.
+
+        @param batch_size: number of files stored at once
+        @type batch_size: int
+        """
+        if self.complete:
+            return
+        start = self._get_state('continue')
+        if start is None:
+            # log entries since now are added by refresh
+            with self.db:
+                self._set_state('refreshed',
+                                self.site.server_time().isoformat())
+        else:
+            output('Continuing the index of {0} at {1}'
+                   .format(self.site, start))
+        gen = api.ListGenerator('allimages', site=self.site,
+                                parameters={'aiprop': 'sha1'})
+        if start is not None:
+            gen.request['aifrom'] = start
+        batch = []
+        for item in gen:
+            batch.append((item['title'], item['sha1']))
+            if len(batch) == batch_size:
+                self._store(batch, item['name'])
+                batch = []
+        if batch:
+            self._store(batch, None)
+        with self.db:
+            self._set_state('complete', '1')
+
+    def _store(self, batch, name):
+        """Store files and the name to continue the build."""
+        with self.db:
+            self.db.executemany('INSERT OR REPLACE INTO files VALUES (?, ?)',
+                                batch)
+            if name is not None:
+                self._set_state('continue', name)
+        debug('Stored {0} files up to {1}'.format(len(batch), name), _logger)
+
+    def refresh(self):
+        """Update the files changed by log entries since the last update."""
+        start = self._get_state('refreshed')
+        now = self.site.server_time().isoformat()
+        titles = set()
+        for logtype in ('upload', 'delete', 'move'):
+            for entry in self.site.logevents(logtype=logtype, start=start,
+                                             namespace=6, reverse=True):
+                if 'title' in entry.data:
+                    titles.add(entry.data['title'])
+                if logtype == 'move' and 'actionhidden' not in entry.data:
+                    titles.add(entry.target_title)
+        self._update_titles(sorted(titles))
+        with self.db:
+            self._set_state('refreshed', now)
+
+    def _update_titles(self, titles, batch_size=50):
+        """Query the current hashes of the titles and store them."""
+        for i in range(0, len(titles), batch_size):
+            batch = titles[i:i + batch_size]
+            gen = api.PropertyGenerator(
+                'imageinfo', site=self.site,
+                parameters={'titles': batch, 'iiprop': 'sha1'})
+            found = {}
+            for pagedata in gen:
+                if (pagedata.get('imagerepository') == 'local' and
+                        pagedata.get('imageinfo')):
+                    found[pagedata['title']] = pagedata['imageinfo'][0]['sha1']
+            with self.db:
+                self.db.executemany(
+                    'DELETE FROM files WHERE title = ?',
+                    ((title, ) for title in batch if title not in found))
+                self.db.executemany(
+                    'INSERT OR REPLACE INTO files VALUES (?, ?)',
+                    found.items())
+
+    def update(self):
+        """Build the index or refresh it."""
+        if self.complete:
+            self.refresh()
+        else:
+            self.build()
+
+    def add(self, title, sha1):
+        """
+        Add a file, e.g. after it was uploaded.
+
+        @param title: the title of the file page including the namespace
+        @type title: unicode
+        @param sha1: the hexadecimal SHA1 of the file
+        @type sha1: str
+        """
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO files VALUES (?, ?)',
+                            (title, sha1.lower()))
+
+    def lookup(self, hashes):
+        """
+        Return the files with any of the hashes.
+
+        @param hashes: hexadecimal SHA1 hashes
+        @type hashes: iterable of str
+        @return: each hash with files mapped to the titles of the files
+        @rtype: dict
+        """
+        hashes = sorted(set(sha1.lower() for sha1 in hashes))
+        result = {}
+        # stay below the default limit of 999 sqlite variables
+        for i in range(0, len(hashes), 500):
+            batch = hashes[i:i + 500]
+            for title, sha1 in self.db.execute(
+                    'SELECT title, sha1 FROM files WHERE sha1 IN ({0})'
+                    .format(', '.join('?' * len(batch))), batch):
+                result.setdefault(sha1, []).append(title)
+        return result
+
+    def close(self):
+        """Close the database."""
+        self.db.close()
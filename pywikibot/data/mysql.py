@@ -8,6 +8,10 @@
 from __future__ import absolute_import, unicode_literals
 __version__ = '$Id$'
 
+import threading
+
+from collections import defaultdict
+
 # Requires oursql <https://pythonhosted.org/oursql/> or
 #  MySQLdb <https://sourceforge.net/projects/mysql-python/>
 try:
@@ -18,9 +22,93 @@ except ImportError:
 import pywikibot
 
 from pywikibot import config2 as config
+from pywikibot.tools import StringTypes
+
+# Idle connections which may be reused by mysql_query, keyed by db name
+_connections = defaultdict(list)
+_connections_lock = threading.Lock()
+
+
+def _connect(dbname):
+    """Open a new connection to the given database."""
+    if config.db_connect_file is None:
+        return mysqldb.connect(config.db_hostname,
+                               db=config.db_name_format.format(dbname),
+                               user=config.db_username,
+                               passwd=config.db_password,
+                               port=config.db_port)
+    else:
+        return mysqldb.connect(config.db_hostname,
+                               db=config.db_name_format.format(dbname),
+                               read_default_file=config.db_connect_file,
+                               port=config.db_port)
+
 
+def _get_connection(dbname):
+    """Return an idle connection to the given database or a new one."""
+    while True:
+        with _connections_lock:
+            if not _connections[dbname]:
+                break
+            conn = _connections[dbname].pop()
+        try:
+            conn.ping()
+        except mysqldb.Error:
+            _close(conn)
+        else:
+            return conn
+    return _connect(dbname)
 
-def mysql_query(query, params=(), dbname=None, encoding='utf-8', verbose=None):
+
+def _release_connection(dbname, conn):
+    """
+    Make a connection available for the next query.
+
+    The transaction of the query is ended, so that the next query does
+    not read its snapshot. Connections exceeding config.db_pool_size are
+    closed.
+    """
+    try:
+        conn.rollback()
+    except mysqldb.Error:
+        _close(conn)
+        return
+    with _connections_lock:
+        if len(_connections[dbname]) < config.db_pool_size:
+            _connections[dbname].append(conn)
+            return
+    _close(conn)
+
+
+def _close(conn):
+    """Close a connection ignoring errors of broken connections."""
+    try:
+        conn.close()
+    except mysqldb.Error:
+        pass
+
+
+def _cursor(conn):
+    """Return a cursor which leaves the result set on the server."""
+    if mysqldb.__name__ == 'oursql':
+        # oursql cursors do not buffer the results by default
+        return conn.cursor()
+    from MySQLdb.cursors import SSCursor
+    return conn.cursor(SSCursor)
+
+
+def close_connections():
+    """Close all idle connections kept by mysql_query."""
+    with _connections_lock:
+        connections = [conn for conns in _connections.values()
+                       for conn in conns]
+        _connections.clear()
+    for conn in connections:
+        _close(conn)
+
+
+def mysql_query(query, params=(), dbname=None, encoding='utf-8', verbose=None,
+                fetch_size=None):
     """
     Yield rows from a MySQL query.
 
@@ -32,6 +120,10 @@ def mysql_query(query, params=(), dbname=None, encoding='utf-8', verbose=None):
         FROM page
         WHERE page_namespace = 0;
 
+    The rows are streamed from the server in batches of fetch_size rows.
+    The connection is reused by later queries to the same database when
+    all rows have been read; it is closed if the generator is abandoned.
+
     @param query: MySQL query to execute
     @type query: str
     @param params: input parametes for the query, if needed
@@ -43,36 +135,43 @@ def mysql_query(query, params=(), dbname=None, encoding='utf-8', verbose=None):
     @param verbose: if True, print query to be executed;
         if None, config.verbose_output will be used.
     @type verbose: None or bool
+    @param fetch_size: number of rows fetched at once;
+        if None, config.db_fetch_size will be used.
+    @type fetch_size: None or int
     @return: generator which yield tuples
     """
     if verbose is None:
         verbose = config.verbose_output
+    if fetch_size is None:
+        fetch_size = config.db_fetch_size
 
-    if config.db_connect_file is None:
-        conn = mysqldb.connect(config.db_hostname,
-                               db=config.db_name_format.format(dbname),
-                               user=config.db_username,
-                               passwd=config.db_password,
-                               port=config.db_port)
-    else:
-        conn = mysqldb.connect(config.db_hostname,
-                               db=config.db_name_format.format(dbname),
-                               read_default_file=config.db_connect_file,
-                               port=config.db_port)
+    conn = _get_connection(dbname)
+    exhausted = False
+    try:
+        cursor = _cursor(conn)
+        if verbose:
+            pywikibot.output('Executing query:\n%s' % query)
+        query = query.encode(encoding)
+        params = tuple(p.encode(encoding) if isinstance(p, StringTypes) else p
+                       for p in params)
 
-    cursor = conn.cursor()
-    if verbose:
-        pywikibot.output('Executing query:\n%s' % query)
-    query = query.encode(encoding)
-    params = tuple(p.encode(encoding) for p in params)
-
-    if params:
-        cursor.execute(query, params)
-    else:
-        cursor.execute(query)
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
 
-    for row in cursor:
-        yield row
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row
 
-    cursor.close()
-    conn.close()
+        cursor.close()
+        exhausted = True
+    finally:
+        if exhausted:
+            _release_connection(dbname, conn)
+        else:
+            # unread rows of a server side cursor block the connection
+            _close(conn)
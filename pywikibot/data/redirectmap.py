@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""Local map of the redirects of a wiki to resolve many titles at once."""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+from collections import namedtuple
+
+import pywikibot
+
+from pywikibot.exceptions import Error
+from pywikibot.logging import debug, output
+from pywikibot.tools import filter_unique, itergroup
+
+_logger = 'data.redirectmap'
+
+# Number of titles whose redirects are queried in one request, 500 for
+# accounts with the apihighlimits right
+BATCH_SIZE = 50
+
+# Status of a redirect chain
+EXISTS = 'exists'
+MISSING = 'missing'
+LOOP = 'loop'
+INTERWIKI = 'interwiki'
+
+
+class RedirectChain(namedtuple('RedirectChain', 'chain fragment status')):
+
+    """
+    Redirect chain of a title.
+
+    chain is the list of titles starting with the resolved title and
+    followed by the target of each redirect. fragment is the section of
+    the last redirect which links to a section. status is one of:
+
+      - EXISTS: the last title is an existing page which is no redirect
+      - MISSING: the last title does not exist
+      - LOOP: the last title already occurs in the chain
+      - INTERWIKI: the last title is a page on another site
+    """
+
+    __slots__ = ()
+
+    @property
+    def title(self):
+        """Return the resolved title."""
+        return self.chain[0]
+
+    @property
+    def target(self):
+        """Return the last title of the chain."""
+        return self.chain[-1]
+
+    @property
+    def hops(self):
+        """Return the number of redirects of the chain."""
+        return len(self.chain) - 1
+
+
+class RedirectMap(object):
+
+    """
+    Redirects of a wiki and the existence of their targets, kept in memory.
+
+    The map is filled by queries of the redirects of many titles at once,
+    by a list of redirect pages like the allpages list or
+    Special:ListRedirects, or by an XML dump. L{resolve} follows the chains
+    of redirects locally and only queries the titles whose status is not
+    known yet. Once a whole dump was loaded, the map is complete and no
+    requests are made at all.
+
+    The map is not updated when pages are edited afterwards.
+    """
+
+    def __init__(self, site):
+        """
+        Constructor.
+
+        @param site: the site of the redirects
+        @type site: pywikibot.site.APISite
+        """
+        self.site = site
+        self.clear()
+
+    def clear(self):
+        """Forget all redirects and pages."""
+        # title of redirect -> (target, fragment)
+        self.redirects = {}
+        # titles of redirects to other sites
+        self.interwiki = set()
+        # title which is no redirect -> whether the page exists
+        self.pages = {}
+        # title -> normalized title as returned by the API
+        self.normalized = {}
+        # titles not in the map do not exist
+        self.complete = False
+
+    def __len__(self):
+        """Return the number of redirects in the map."""
+        return len(self.redirects)
+
+    def _title(self, title):
+        """Return the title of a page or the canonical form of a title."""
+        if isinstance(title, pywikibot.page.BasePage):
+            return title.title(withSection=False)
+        return pywikibot.Link(title, self.site).canonical_title()
+
+    def _known(self, title):
+        """Return whether the status of a title is known."""
+        return (self.complete or title in self.redirects or
+                title in self.pages or title in self.normalized)
+
+    def add(self, title, target, fragment=''):
+        """
+        Add a redirect.
+
+        @param title: the canonical title of the redirect
+        @type title: unicode
+        @param target: the canonical title of the target
+        @type target: unicode
+        @param fragment: the section of the target
+        @type fragment: unicode
+        """
+        self.redirects[title] = (target, fragment)
+        self.pages.pop(title, None)
+        self.interwiki.discard(title)
+
+    def _groupsize(self):
+        """Return the number of titles queried in one request."""
+        if self.site.logged_in() and self.site.has_right('apihighlimits'):
+            return 500
+        return BATCH_SIZE
+
+    def _store_query(self, query, titles):
+        """
+        Store the redirects and pages of a query result.
+
+        @param query: the query element of a query with redirects
+        @type query: dict
+        @param titles: the queried titles, which are stored as missing
+            if they are not in the result
+        @type titles: list of unicode
+        """
+        for item in query.get('normalized', []):
+            self.normalized[item['from']] = item['to']
+        for item in query.get('redirects', []):
+            if 'tointerwiki' in item:
+                self.add(item['from'],
+                         '{0}:{1}'.format(item['tointerwiki'], item['to']))
+                self.interwiki.add(item['from'])
+            else:
+                self.add(item['from'], item['to'],
+                         item.get('tofragment', ''))
+        for pagedata in query.get('pages', {}).values():
+            title = pagedata['title']
+            # the redirects of a loop or a too long chain are not resolved
+            if 'redirect' in pagedata or title in self.redirects:
+                continue
+            self.pages[title] = ('missing' not in pagedata and
+                                 'invalid' not in pagedata)
+        for title in titles:
+            if not self._known(title):
+                debug('{0} not in the redirects query result'.format(title),
+                      _logger)
+                self.pages[title] = False
+
+    def load(self, titles):
+        """
+        Query the redirects of titles whose status is not known.
+
+        The chains of redirects are resolved by the API, so they are
+        stored completely.
+
+        @param titles: the titles or pages
+        @type titles: iterable of unicode or pywikibot.page.BasePage
+        """
+        titles = [title for title in filter_unique(
+            self._title(title) for title in titles)
+            if not self._known(title)]
+        for batch in itergroup(titles, self._groupsize()):
+            request = self.site._simple_request(action='query', prop='info',
+                                                titles=batch, redirects=True)
+            data = request.submit()
+            if 'query' not in data:
+                raise Error('No query result for the redirects of {0}'
+                            .format(batch))
+            self._store_query(data['query'], batch)
+
+    def load_redirects(self, namespaces=None, total=None):
+        """
+        Load the redirects of namespaces of the wiki.
+
+        @param namespaces: the namespaces, by default the main namespace
+        @type namespaces: iterable of int
+        @param total: maximum number of redirects per namespace
+        @type total: int
+        """
+        for namespace in namespaces or [0]:
+            self.load(self.site.allpages(namespace=namespace,
+                                         filterredir=True, total=total))
+
+    def load_dump(self, filename, namespaces=None):
+        """
+        Load all redirects and pages of an XML dump.
+
+        The map is complete afterwards, so titles not in the dump are
+        missing and L{resolve} makes no requests.
+
+        @param filename: the file name of the dump
+        @type filename: str
+        @param namespaces: the namespaces whose redirects are loaded; the
+            pages of the other namespaces are stored as existing
+        @type namespaces: iterable of int
+        """
+        from pywikibot import xmlreader
+
+        namespaces = set(namespaces) if namespaces else None
+        regex = self.site.redirectRegex()
+        for count, entry in enumerate(
+                xmlreader.XmlDump(filename).parse(), 1):
+            if count % 10000 == 0:
+                output('{0} pages read...'.format(count))
+            match = regex.match(entry.text)
+            if not match or (namespaces is not None and
+                             int(entry.ns) not in namespaces):
+                self.pages[entry.title] = True
+                continue
+            target = match.group(1)
+            link = pywikibot.Link(target, self.site)
+            try:
+                link.parse()
+            except (pywikibot.InvalidTitle,
+                    pywikibot.SiteDefinitionError) as e:
+                debug('Invalid target of {0}: {1}'.format(entry.title, e),
+                      _logger)
+                self.add(entry.title, target)
+                continue
+            if link.site != self.site:
+                self.add(entry.title, target)
+                self.interwiki.add(entry.title)
+            else:
+                self.add(entry.title, link.canonical_title(),
+                         link.section or '')
+        self.complete = True
+
+    def _follow(self, title):
+        """Return the redirect chain of a title as far as it is known."""
+        chain = [title]
+        fragment = ''
+        title = self.normalized.get(title, title)
+        while title in self.redirects:
+            target, target_fragment = self.redirects[title]
+            fragment = target_fragment or fragment
+            if title in self.interwiki:
+                return RedirectChain(chain + [target], fragment, INTERWIKI)
+            if target in chain or target == title:
+                return RedirectChain(chain + [target], fragment, LOOP)
+            chain.append(target)
+            title = target
+        if title in self.pages:
+            status = EXISTS if self.pages[title] else MISSING
+        elif self.complete:
+            status = MISSING
+        else:
+            status = None
+        return RedirectChain(chain, fragment, status)
+
+    def resolve(self, titles):
+        """
+        Resolve the redirect chains of titles.
+
+        Only the titles whose status is not known are queried, many at
+        once.
+
+        @param titles: the titles or pages
+        @type titles: iterable of unicode or pywikibot.page.BasePage
+        @return: the redirect chain of each title in the given order
+        @rtype: list of RedirectChain
+        """
+        titles = [self._title(title) for title in titles]
+        queried = set()
+        while True:
+            chains = [self._follow(title) for title in titles]
+            unknown = set(chain.target for chain in chains
+                          if chain.status is None) - queried
+            if not unknown:
+                break
+            self.load(unknown)
+            queried |= unknown
+        return [chain if chain.status else chain._replace(status=MISSING)
+                for chain in chains]
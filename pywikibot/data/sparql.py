@@ -7,7 +7,11 @@
 #
 from __future__ import absolute_import, unicode_literals
 
+import datetime
+import hashlib
 import json
+import os
+import pickle
 import sys
 import time
 if sys.version_info[0] > 2:
@@ -17,7 +21,7 @@ else:
 
 from requests.exceptions import Timeout
 
-from pywikibot import config, warning, Site
+from pywikibot import config, debug, warning, Site
 from pywikibot.comms import http
 from pywikibot.tools import UnicodeMixin, py2_encode_utf_8
 from pywikibot.exceptions import Error, TimeoutError
@@ -34,7 +38,7 @@ class SparqlQuery(object):
     """
 
     def __init__(self, endpoint=None, entity_url=None, repo=None,
-                 max_retries=None, retry_wait=None):
+                 max_retries=None, retry_wait=None, expiry=None):
         """
         Create endpoint.
 
@@ -53,6 +57,9 @@ class SparqlQuery(object):
                error, defaults to config.retry_wait seconds (doubles each retry
                until max of 120 seconds is reached).
         @type retry_wait: float
+        @param expiry: (optional) Cache the query results on disk for this
+            number of days or datetime.timedelta. Not cached by default.
+        @type expiry: int, float or datetime.timedelta
         """
         # default to Wikidata
         if not repo and not endpoint:
@@ -88,12 +95,16 @@ class SparqlQuery(object):
             self.retry_wait = config.retry_wait
         else:
             self.retry_wait = retry_wait
+        if expiry is not None and not isinstance(expiry, datetime.timedelta):
+            expiry = datetime.timedelta(expiry)
+        self.expiry = expiry
 
     def get_last_response(self):
         """
         Return last received response.
 
-        @return: Response object from last request or None
+        @return: Response object from last request or None if the last
+            result was read from the cache
         """
         return self.last_response
 
@@ -112,27 +123,68 @@ class SparqlQuery(object):
         """
         data = self.query(query, headers=headers)
         if data and 'results' in data:
-            result = []
-            qvars = data['head']['vars']
-            for row in data['results']['bindings']:
-                values = {}
-                for var in qvars:
-                    if var in row:
-                        if full_data:
-                            if row[var]['type'] not in VALUE_TYPES:
-                                raise ValueError('Unknown type: %s' % row[var]['type'])
-                            valtype = VALUE_TYPES[row[var]['type']]
-                            values[var] = valtype(row[var], entity_url=self.entity_url)
-                        else:
-                            values[var] = row[var]['value']
-                    else:
-                        # var is not available (OPTIONAL is probably used)
-                        values[var] = None
-                result.append(values)
-            return result
+            return list(self._parse_rows(data, full_data))
         else:
             return None
 
+    def iter_select(self, query, full_data=False, headers=DEFAULT_HEADERS,
+                    page_size=None):
+        """
+        Run SPARQL query and yield the result rows.
+
+        If page_size is given, the query is run repeatedly with LIMIT and
+        OFFSET clauses appended, so only one page of results is held in
+        memory at a time. The query must then not contain a LIMIT or
+        OFFSET clause itself and should use ORDER BY to get stable pages.
+
+        @param query: Query text
+        @type query: string
+        @param full_data: Whether yield full data objects or only values
+        @type full_data: bool
+        @param page_size: Number of rows requested per query
+        @type page_size: int or None
+        @return: generator of dicts mapping the variables to their values
+        """
+        if page_size is None:
+            data = self.query(query, headers=headers)
+            if data and 'results' in data:
+                for row in self._parse_rows(data, full_data):
+                    yield row
+            return
+
+        offset = 0
+        while True:
+            data = self.query('{0}\nLIMIT {1} OFFSET {2}'.format(
+                query, page_size, offset), headers=headers)
+            if not data or 'results' not in data:
+                return
+            rows = 0
+            for row in self._parse_rows(data, full_data):
+                rows += 1
+                yield row
+            if rows < page_size:
+                return
+            offset += page_size
+
+    def _parse_rows(self, data, full_data):
+        """Yield the result rows of the parsed JSON result."""
+        qvars = data['head']['vars']
+        for row in data['results']['bindings']:
+            values = {}
+            for var in qvars:
+                if var in row:
+                    if full_data:
+                        if row[var]['type'] not in VALUE_TYPES:
+                            raise ValueError('Unknown type: %s' % row[var]['type'])
+                        valtype = VALUE_TYPES[row[var]['type']]
+                        values[var] = valtype(row[var], entity_url=self.entity_url)
+                    else:
+                        values[var] = row[var]['value']
+                else:
+                    # var is not available (OPTIONAL is probably used)
+                    values[var] = None
+            yield values
+
     def query(self, query, headers=DEFAULT_HEADERS):
         """
         Run SPARQL query and return parsed JSON result.
@@ -141,19 +193,57 @@ class SparqlQuery(object):
         @type query: string
         """
         url = '%s?query=%s' % (self.endpoint, quote(query))
+        if self.expiry is not None:
+            cached = self._load_cache(url, headers)
+            if cached is not None:
+                # no request was made for this query
+                self.last_response = None
+                return cached
         while True:
             try:
                 self.last_response = http.fetch(url, headers=headers)
                 if not self.last_response.content:
                     return None
                 try:
-                    return json.loads(self.last_response.content)
+                    data = json.loads(self.last_response.content)
                 except ValueError:
                     return None
+                if self.expiry is not None:
+                    self._write_cache(url, headers, data)
+                return data
             except Timeout:
                 self.wait()
                 continue
 
+    @staticmethod
+    def _cachefile_path(url, headers):
+        """Return the cache file path for a query URL and headers."""
+        path = os.path.join(config.base_dir, 'sparqlcache')
+        if not os.path.exists(path):
+            os.makedirs(path)
+        key = repr((url, sorted(headers.items())))
+        return os.path.join(
+            path, hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+    def _load_cache(self, url, headers):
+        """Return the cached result of a query or None if not available."""
+        filename = self._cachefile_path(url, headers)
+        try:
+            with open(filename, 'rb') as f:
+                cached_url, data, cachetime = pickle.load(f)
+        except (IOError, OSError, EOFError, ValueError, pickle.PickleError):
+            return None
+        if cached_url != url or cachetime + self.expiry < datetime.datetime.now():
+            return None
+        debug('SPARQL cache hit for {0}'.format(url), 'sparql')
+        return data
+
+    def _write_cache(self, url, headers, data):
+        """Write the result of a query to the cache."""
+        with open(self._cachefile_path(url, headers), 'wb') as f:
+            pickle.dump([url, data, datetime.datetime.now()], f,
+                        protocol=config.pickle_protocol)
+
     def wait(self):
         """Determine how long to wait after a failed request."""
         self.max_retries -= 1
@@ -189,10 +279,30 @@ class SparqlQuery(object):
         @return: item ids, e.g. Q1234
         @rtype: same as result_type
         """
-        res = self.select(query, full_data=True)
-        if res:
-            return result_type(r[item_name].getID() for r in res)
-        return result_type()
+        return result_type(self.iter_items(query, item_name))
+
+    def iter_items(self, query, item_name='item', page_size=None):
+        """
+        Yield items which satisfy given query.
+
+        Items are yielded as Wikibase IDs without creating node objects for
+        the other values of each row.
+
+        @param query: Query string. Must contain ?{item_name} as one of the
+            projected values.
+        @param item_name: Name of the value to extract
+        @param page_size: Number of rows requested per query, see
+            L{iter_select}
+        @type page_size: int or None
+        @return: item ids, e.g. Q1234
+        """
+        urllen = len(self.entity_url)
+        for row in self.iter_select(query, page_size=page_size):
+            value = row[item_name]
+            if value.startswith(self.entity_url):
+                yield value[urllen:]
+            else:
+                yield None
 
 
 class SparqlNode(UnicodeMixin):
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""Journal of chunked uploads to resume them after an interruption."""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import codecs
+import hashlib
+import json
+import os
+
+from pywikibot import config
+from pywikibot.logging import debug
+
+_logger = 'data.uploadjournal'
+
+
+class UploadJournal(object):
+
+    """
+    Journal entry of a chunked upload of a local file.
+
+    The entry stores the file key and offset of the chunks stashed on the
+    wiki. It belongs to the site, the target file name and the local file
+    with its size and modification time, so a changed local file is not
+    resumed. Entries are kept as small JSON files in the uploads
+    subdirectory of the base directory and replaced atomically.
+
+    As the path is part of the entry, uploads of temporary copies, like
+    the downloads of UploadRobot and data_ingestion, are not resumed.
+    """
+
+    def __init__(self, site, target, filename):
+        """
+        Constructor.
+
+        @param site: the site uploaded to
+        @type site: pywikibot.site.BaseSite
+        @param target: the file name on the wiki
+        @type target: unicode
+        @param filename: the path of the local file
+        @type filename: str
+        """
+        stat = os.stat(filename)
+        self.key = {
+            'site': '{0}:{1}'.format(site.family.name, site.code),
+            'target': target,
+            'filename': os.path.abspath(filename),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+        }
+        digest = hashlib.sha1(json.dumps(self.key, sort_keys=True)
+                              .encode('utf-8')).hexdigest()
+        self.path = config.datafilepath('uploads', digest + '.json')
+
+    def load(self):
+        """
+        Return the file key and offset of the interrupted upload.
+
+        @return: file key and offset or None if there is no entry
+        @rtype: tuple or None
+        """
+        try:
+            with codecs.open(self.path, 'r', 'utf-8') as f:
+                entry = json.load(f)
+        except (IOError, ValueError):
+            return None
+        if entry.get('key') != self.key:
+            return None
+        return entry['filekey'], entry['offset']
+
+    def update(self, file_key, offset):
+        """Store the file key and offset of the stashed chunks."""
+        tmp = self.path + '.tmp'
+        with codecs.open(tmp, 'w', 'utf-8') as f:
+            json.dump({'key': self.key, 'filekey': file_key,
+                       'offset': offset}, f)
+        if hasattr(os, 'replace'):
+            os.replace(tmp, self.path)
+        else:
+            if os.name == 'nt' and os.path.exists(self.path):
+                os.remove(self.path)
+            os.rename(tmp, self.path)
+        debug('Upload of {0} stashed up to byte {1}'
+              .format(self.key['filename'], offset), _logger)
+
+    def remove(self):
+        """Remove the entry, e.g. when the upload is finished."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
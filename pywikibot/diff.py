@@ -63,20 +63,37 @@ class Hunk(object):
             '-': 'lightred',
         }
 
-        self.diff = list(self.create_diff())
-        self.diff_plain_text = u''.join(self.diff)
-        self.diff_text = u''.join(self.format_diff())
+        # the diff lines and their formatting are only created when needed
+        self._diff = None
+        self._diff_text = None
 
         first, last = self.group[0], self.group[-1]
         self.a_rng = (first[1], last[2])
         self.b_rng = (first[3], last[4])
 
         self.header = self.get_header()
-        self.diff_plain_text = u'%s\n%s' % (self.header, self.diff_plain_text)
-        self.diff_text = u'%s' % self.diff_text
 
         self.reviewed = self.PENDING
 
+    @property
+    def diff(self):
+        """Return the diff lines of this hunk, without formatting."""
+        if self._diff is None:
+            self._diff = list(self.create_diff())
+        return self._diff
+
+    @property
+    def diff_plain_text(self):
+        """Return the header and the diff of this hunk as plain text."""
+        return u'%s\n%s' % (self.header, u''.join(self.diff))
+
+    @property
+    def diff_text(self):
+        """Return the colored diff of this hunk."""
+        if self._diff_text is None:
+            self._diff_text = u''.join(self.format_diff())
+        return self._diff_text
+
     def get_header(self):
         """Provide header of unified diff."""
         return self.get_header_text(self.a_rng, self.b_rng) + '\n'
@@ -284,8 +301,7 @@ class PatchManager(object):
                 self.b = text_b.splitlines(1)
 
         # groups and hunk have same order (one hunk correspond to one group).
-        s = difflib.SequenceMatcher(None, self.a, self.b)
-        self.groups = list(s.get_grouped_opcodes(0))
+        self.groups = self._get_groups(self.a, self.b)
         self.hunks = []
         previous_hunk = None
         for group in self.groups:
@@ -305,6 +321,29 @@ class PatchManager(object):
         self._super_hunks = self._generate_super_hunks()
         self._replace_invisible = replace_invisible
 
+    @staticmethod
+    def _get_groups(a, b):
+        """Return the grouped opcodes to turn a into b.
+
+        The common prefix and suffix of both sequences are skipped before
+        they are compared, as usually only a small part of a large page is
+        changed and the costs of SequenceMatcher grow with the length of
+        the compared sequences.
+        """
+        length = min(len(a), len(b))
+        start = 0
+        while start < length and a[start] == b[start]:
+            start += 1
+        end = 0
+        while end < length - start and a[-1 - end] == b[-1 - end]:
+            end += 1
+
+        s = difflib.SequenceMatcher(None, a[start:len(a) - end],
+                                    b[start:len(b) - end])
+        return [[(tag, i1 + start, i2 + start, j1 + start, j2 + start)
+                 for tag, i1, i2, j1, j2 in group]
+                for group in s.get_grouped_opcodes(0)]
+
     def get_blocks(self):
         """Return list with blocks of indexes which compose a and, where applicable, b.
 
@@ -336,9 +375,19 @@ class PatchManager(object):
 
         return blocks
 
-    def print_hunks(self):
-        """Print the headers and diff texts of all hunks to the output."""
-        if self.hunks:
+    def print_hunks(self, summary=False):
+        """Print the headers and diff texts of all hunks to the output.
+
+        @param summary: only print the header and the number of removed and
+            added lines of each hunk, without creating the colored diff.
+        @type summary: bool
+        """
+        if not self.hunks:
+            return
+        if summary:
+            pywikibot.output('\n'.join(self._generate_summary(super_hunk)
+                                       for super_hunk in self._super_hunks))
+        else:
             pywikibot.output('\n'.join(self._generate_diff(super_hunk)
                                        for super_hunk in self._super_hunks))
 
@@ -373,6 +422,13 @@ class PatchManager(object):
                 (super_hunk.b_rng[0] - min(super_hunk.pre_context, self.context),
                  super_hunk.b_rng[1] + min(super_hunk.post_context, self.context)))
 
+    def _generate_summary(self, hunks):
+        """Generate a summary line for the given hunks."""
+        removed = sum(hunk.a_rng[1] - hunk.a_rng[0] for hunk in hunks)
+        added = sum(hunk.b_rng[1] - hunk.b_rng[0] for hunk in hunks)
+        return '{0} ({1} removed, {2} added)'.format(
+            Hunk.get_header_text(hunks.a_rng, hunks.b_rng), removed, added)
+
     def _generate_diff(self, hunks):
         """Generate a diff text for the given hunks."""
         def extend_context(start, end):
@@ -11,7 +11,9 @@ __version__ = '$Id$'
 #
 
 import collections
+import json
 import logging
+import os
 import re
 import string
 import sys
@@ -968,6 +970,78 @@ class Family(object):
         Family._families[fam] = cls
         return cls
 
+    _domain_index = None
+
+    @staticmethod
+    def domain_index():
+        """Return a mapping of hostnames to the family codes served there.
+
+        The index is built once from all registered family files and
+        persisted in C{families-index.json} within the base directory.
+        It is rebuilt when a family file is registered, removed or
+        modified. It allows L{pywikibot.Site} to load only the families
+        which may match a given URL.
+
+        @return: hostname mapped to a list of (family name, code) tuples
+        @rtype: dict
+        """
+        key = sorted(config.family_files.items())
+        if Family._domain_index is not None and Family._domain_index[0] == key:
+            return Family._domain_index[1]
+
+        signature = [[name, path, Family._family_file_mtime(path)]
+                     for name, path in key]
+        filename = config.datafilepath('families-index.json')
+        index = None
+        try:
+            with open(filename, 'r') as f:
+                data = json.load(f)
+            if data.get('signature') == signature:
+                index = data['domains']
+        except (IOError, OSError, ValueError, KeyError):
+            pass
+
+        if index is None:
+            index = Family._build_domain_index()
+            try:
+                with open(filename, 'w') as f:
+                    json.dump({'signature': signature, 'domains': index}, f)
+            except (IOError, OSError) as e:
+                pywikibot.log('Unable to write family index {0}: {1!r}'
+                              .format(filename, e))
+
+        index = dict((host, [tuple(entry) for entry in entries])
+                     for host, entries in index.items())
+        Family._domain_index = (key, index)
+        return index
+
+    @staticmethod
+    def _family_file_mtime(path):
+        """Return the modification time of a family file or None."""
+        if path.startswith('http://') or path.startswith('https://'):
+            return None
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _build_domain_index():
+        """Load every registered family and map its hostnames to codes."""
+        index = collections.defaultdict(list)
+        for fam in config.family_files:
+            try:
+                family = Family.load(fam)
+            except UnknownFamily:
+                continue
+            if family._ignore_from_url is True:
+                continue
+            for code in family.codes:
+                if code in family._ignore_from_url:
+                    continue
+                index[family._hostname(code)[1]].append([fam, code])
+        return dict(index)
+
     @property
     @deprecated('Family.codes or APISite.validLanguageLinks')
     def iwkeys(self):
@@ -26,6 +26,7 @@ from __future__ import absolute_import, unicode_literals
 __version__ = '$Id$'
 #
 
+import codecs
 import json
 import os
 import pkgutil
@@ -44,6 +45,8 @@ from pywikibot.tools import (
     deprecated, deprecated_args, issue_deprecation_warning, StringTypes)
 
 PLURAL_PATTERN = r'{{PLURAL:(?:%\()?([^\)]*?)(?:\)d)?\|(.*?)}}'
+_PLURAL_RE = re.compile(PLURAL_PATTERN)
+_PLURAL_VARIANT_RE = re.compile(r'(?!$)(?: *(\d+) *= *)?(.*?)(?:\||$)')
 
 # Package name for the translation messages. The messages data must loaded
 # relative to that package name. In the top of this package should be
@@ -56,13 +59,29 @@ _messages_available = None
 # Cache of translated messages
 _cache = defaultdict(dict)
 
+# Name of the file in the top of the messages package which contains all
+# message bundles compiled by compile_messages
+_COMPILED_MESSAGES = 'messages.compiled.json'
+# Compiled messages index mapping twtitle to a dict of lang: message,
+# False if there is no usable compiled index and None if not loaded yet
+_compiled_messages = None
+
+# Cache of fallback language chains used by twtranslate, seeded from the
+# compiled messages index
+_fallback_chains = {}
+
+# Cache of parsed PLURAL variants, seeded from the compiled messages index
+_plural_variants = {}
+
 
 def set_messages_package(package_name):
     """Set the package name where i18n messages are located."""
     global _messages_package_name
     global _messages_available
+    global _compiled_messages
     _messages_package_name = package_name
     _messages_available = None
+    _compiled_messages = None
 
 
 def messages_available():
@@ -308,6 +327,129 @@ class TranslationError(Error, ImportError):
     pass
 
 
+def _message_files(path):
+    """
+    Return the JSON files of the message bundles of a package.
+
+    @param path: the directory of the messages package
+    @type path: str
+    @return: the bundle, file name and modification time of each file
+    @rtype: list of list
+    """
+    files = []
+    for bundle in sorted(os.listdir(path)):
+        bundle_path = os.path.join(path, bundle)
+        if not os.path.isdir(bundle_path):
+            continue
+        for filename in sorted(os.listdir(bundle_path)):
+            if filename.endswith('.json'):
+                files.append([bundle, filename, os.path.getmtime(
+                    os.path.join(bundle_path, filename))])
+    return files
+
+
+def compile_messages(package_name=None):
+    """
+    Compile all message bundles of a messages package into one index file.
+
+    The index is written into the top of the package and used by
+    L{twtranslate} instead of loading one JSON file per language and
+    bundle. The fallback language chains and the parsed PLURAL variants
+    of the messages are resolved when compiling, so they are not computed
+    again at runtime. The index stores the names and modification times
+    of the bundle files and is ignored when they changed, so it must be
+    compiled again after updating the messages.
+
+    @param package_name: the messages package, the current one if omitted
+    @type package_name: str
+    @return: path of the compiled index file
+    @rtype: str
+    """
+    global _compiled_messages
+    if package_name is None:
+        package_name = _messages_package_name
+    mod = __import__(package_name, fromlist=[str('__path__')])
+    path = next(iter(mod.__path__))
+
+    signature = _message_files(path)
+    messages = defaultdict(dict)
+    plurals = {}
+    langs = set(code for code in plural_rules if code != '_default')
+    for bundle, filename, _ in signature:
+        lang = filename[:-len('.json')]
+        langs.add(lang)
+        with codecs.open(os.path.join(path, bundle, filename),
+                         'r', 'utf-8') as f:
+            transdict = json.load(f)
+        for twtitle, message in transdict.items():
+            if twtitle == '@metadata':
+                continue
+            messages[twtitle][lang] = message
+            for match in _PLURAL_RE.finditer(message):
+                variants = match.group(2)
+                try:
+                    plural_entries, specific_entries = \
+                        _parse_plural_variants(variants)
+                except AssertionError:
+                    # leave malformed variants to fail when translating
+                    continue
+                # JSON objects only have str keys
+                plurals[variants] = [
+                    plural_entries,
+                    dict((str(number), plural)
+                         for number, plural in specific_entries.items())]
+    fallbacks = dict((lang, _altlang(lang) + ['en']) for lang in langs)
+
+    filename = os.path.join(path, _COMPILED_MESSAGES)
+    with open(filename, 'w') as f:
+        json.dump({'signature': signature, 'messages': messages,
+                   'fallbacks': fallbacks, 'plurals': plurals}, f,
+                  sort_keys=True, separators=(',', ':'))
+    if package_name == _messages_package_name:
+        _compiled_messages = None
+    return filename
+
+
+def _load_compiled_messages():
+    """
+    Return the compiled messages index of the current package.
+
+    Loading the index also seeds the caches of the fallback language chains
+    and the parsed PLURAL variants with the entries resolved when compiling.
+
+    @return: the index or False if there is none or it is outdated
+    @rtype: dict or bool
+    """
+    global _compiled_messages
+    if _compiled_messages is not None:
+        return _compiled_messages
+
+    _compiled_messages = False
+    try:
+        mod = __import__(_messages_package_name, fromlist=[str('__path__')])
+    except ImportError:
+        return False
+    path = next(iter(mod.__path__))
+    filename = os.path.join(path, _COMPILED_MESSAGES)
+    try:
+        with open(filename, 'r') as f:
+            data = json.load(f)
+    except (IOError, OSError, ValueError):
+        return False
+    if data.get('signature') != _message_files(path):
+        pywikibot.log('Ignoring outdated compiled i18n messages {0}'
+                      .format(filename))
+        return False
+    _fallback_chains.update(data.get('fallbacks', {}))
+    for variants, (plural_entries, specific_entries) in \
+            data.get('plurals', {}).items():
+        _plural_variants[variants] = plural_entries, dict(
+            (int(number), plural)
+            for number, plural in specific_entries.items())
+    _compiled_messages = data['messages']
+    return _compiled_messages
+
+
 def _get_translation(lang, twtitle):
     """
     Return message of certain twtitle if exists.
@@ -316,6 +458,9 @@ def _get_translation(lang, twtitle):
     """
     if twtitle in _cache[lang]:
         return _cache[lang][twtitle]
+    compiled = _load_compiled_messages()
+    if compiled:
+        return compiled.get(twtitle, {}).get(lang)
     message_bundle = twtitle.split('-')[0]
     trans_text = None
     filename = '%s/%s.json' % (message_bundle, lang)
@@ -356,19 +501,7 @@ def _extract_plural(code, message, parameters):
                 'an int', 1)
             num = int(num)
 
-        plural_entries = []
-        specific_entries = {}
-        # A plural entry can not start at the end of the variants list,
-        # and must end with | or the end of the variants list.
-        for number, plural in re.findall(r'(?!$)(?: *(\d+) *= *)?(.*?)(?:\||$)',
-                                         variants):
-            if number:
-                specific_entries[int(number)] = plural
-            else:
-                assert not specific_entries, \
-                    'generic entries defined after specific in "{0}"'.format(variants)
-                plural_entries += [plural]
-
+        plural_entries, specific_entries = _parse_plural_variants(variants)
         if num in specific_entries:
             return specific_entries[num]
 
@@ -395,7 +528,37 @@ def _extract_plural(code, message, parameters):
         assert rule['nplurals'] == 1
         plural_value = static_plural_value
 
-    return re.sub(PLURAL_PATTERN, replace_plural, message)
+    return _PLURAL_RE.sub(replace_plural, message)
+
+
+def _parse_plural_variants(variants):
+    """
+    Split the variants of a PLURAL instance into generic and specific ones.
+
+    The result is cached as messages are usually translated repeatedly.
+
+    @param variants: the PLURAL variants separated by |
+    @type variants: str
+    @return: the list of generic entries and a dict of specific entries
+    @rtype: tuple of list and dict
+    """
+    if variants in _plural_variants:
+        return _plural_variants[variants]
+
+    plural_entries = []
+    specific_entries = {}
+    # A plural entry can not start at the end of the variants list,
+    # and must end with | or the end of the variants list.
+    for number, plural in _PLURAL_VARIANT_RE.findall(variants):
+        if number:
+            specific_entries[int(number)] = plural
+        else:
+            assert not specific_entries, \
+                'generic entries defined after specific in "{0}"'.format(variants)
+            plural_entries += [plural]
+
+    _plural_variants[variants] = plural_entries, specific_entries
+    return plural_entries, specific_entries
 
 
 class _PluralMappingAlias(Mapping):
@@ -616,7 +779,11 @@ def twtranslate(source, twtitle, parameters=None, fallback=True,
     # modes are caught with the KeyError.
     langs = [lang]
     if fallback:
-        langs += _altlang(lang) + ['en']
+        # the compiled index provides the chains resolved in advance
+        _load_compiled_messages()
+        if lang not in _fallback_chains:
+            _fallback_chains[lang] = _altlang(lang) + ['en']
+        langs += _fallback_chains[lang]
     for alt in langs:
         trans = _get_translation(alt, twtitle)
         if trans:
@@ -24,6 +24,7 @@ if sys.version_info[0] > 2:
 
 _init_routines = []
 _inited_routines = []
+_loggers = {}  # logger names mapped to loggers used by logoutput
 
 
 def add_init_routine(routine):
@@ -69,16 +70,25 @@ def logoutput(text, decoder=None, newline=True, _level=INFO, _logger="",
 
     Helper function used by all the user-output convenience functions.
 
+    Nothing is done unless the logger is enabled for the level, so a
+    disabled debug() call is cheap. Text can also be a callable returning
+    the text; it is only called if the record is logged, which avoids
+    formatting large objects for disabled levels.
+
     """
-    if _logger:
-        logger = logging.getLogger("pywiki." + _logger)
-    else:
-        logger = logging.getLogger("pywiki")
+    try:
+        logger = _loggers[_logger]
+    except KeyError:
+        logger = _loggers[_logger] = logging.getLogger(
+            'pywiki.' + _logger if _logger else 'pywiki')
 
     # invoke any init routines
     if _init_routines:
         _init()
 
+    if not logger.isEnabledFor(_level):
+        return
+
     # frame 0 is logoutput() in this module,
     # frame 1 is the convenience function (output(), etc.)
     # frame 2 is whatever called the convenience function
@@ -90,6 +100,9 @@ def logoutput(text, decoder=None, newline=True, _level=INFO, _logger="",
                'caller_line': frame.f_lineno,
                'newline': ("\n" if newline else "")}
 
+    if callable(text):
+        text = text()
+
     if decoder:
         text = text.decode(decoder)
     elif not isinstance(text, unicode):
@@ -169,6 +182,9 @@ def critical(text, decoder=None, newline=True, **kwargs):
 def debug(text, layer, decoder=None, newline=True, **kwargs):
     """Output a debug record to the log file.
 
+    Debug records are usually disabled, so text which is expensive to
+    create should be given as a callable returning it.
+
     @param layer: The name of the logger that text will be sent to.
     """
     logoutput(text, decoder, newline, DEBUG, layer, **kwargs)
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+Metrics of the requests made by a bot.
+
+When enabled, the API requests, the HTTP requests and the throttle record
+counters and latency histograms per site and API module into the in-process
+L{registry}. The registry can be inspected by the bot itself and is written
+to the sinks, e.g. a JSON lines or Prometheus text file, when the bot exits.
+
+Metrics are enabled by config.metrics or the global -metrics option. While
+they are disabled, recording a value only costs a check of L{registry}.
+"""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import atexit
+import bisect
+import json
+import threading
+import time
+
+from pywikibot import config
+from pywikibot.logging import log
+
+# Upper bounds in seconds of the buckets of the histograms
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# The registry receiving the values, None while metrics are disabled
+registry = None
+
+_sinks = []
+
+
+class Histogram(object):
+
+    """Distribution of observed values over fixed buckets."""
+
+    def __init__(self, buckets=BUCKETS):
+        """
+        Constructor.
+
+        @param buckets: ascending upper bounds of the buckets. Larger values
+            are counted in an additional unbounded bucket.
+        @type buckets: tuple of float
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Add a value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """
+        Return the number of values up to each bound.
+
+        @return: the upper bound of each bucket, None for the last one, with
+            the number of values up to the bound
+        @rtype: list of tuple
+        """
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (None, ), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class MetricsRegistry(object):
+
+    """Thread safe in-process store of counters and histograms."""
+
+    def __init__(self):
+        """Constructor."""
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    @staticmethod
+    def _key(name, labels):
+        """Return the key of a metric."""
+        return name, tuple(sorted(labels.items())) if labels else ()
+
+    def increment(self, name, value=1, labels=None):
+        """
+        Add a value to a counter.
+
+        @param name: name of the counter
+        @type name: str
+        @param value: the value to add
+        @type value: int or float
+        @param labels: labels of the counter, e.g. the site
+        @type labels: dict
+        """
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=None):
+        """
+        Add a value to a histogram.
+
+        @param name: name of the histogram
+        @type name: str
+        @param value: the observed value, e.g. a duration in seconds
+        @type value: float
+        @param labels: labels of the histogram, e.g. the site
+        @type labels: dict
+        """
+        key = self._key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def counter(self, name, **labels):
+        """Return the value of a counter, 0 if nothing was recorded."""
+        return self.counters.get(self._key(name, labels), 0)
+
+    def histogram(self, name, **labels):
+        """Return a histogram, None if nothing was recorded."""
+        return self.histograms.get(self._key(name, labels))
+
+    def samples(self):
+        """
+        Return all metrics.
+
+        @return: the kind ('counter' or 'histogram'), the name, the labels
+            and the value or histogram of each metric, ordered by name
+        @rtype: list of tuple
+        """
+        with self.lock:
+            result = [('counter', name, dict(labels), value)
+                      for (name, labels), value in self.counters.items()]
+            result += [('histogram', name, dict(labels), histogram)
+                       for (name, labels), histogram
+                       in self.histograms.items()]
+        return sorted(result, key=lambda sample: (
+            sample[1], sorted(sample[2].items())))
+
+    def reset(self):
+        """Remove all metrics."""
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+class FileSink(object):
+
+    """Base class of the sinks writing the metrics to a file."""
+
+    mode = 'w'
+
+    def __init__(self, filename):
+        """
+        Constructor.
+
+        @param filename: the file name, relative to the logs directory
+        @type filename: str
+        """
+        self.filename = config.datafilepath('logs', filename)
+
+    def dump(self, registry):
+        """Write the metrics of the registry to the file."""
+        with open(self.filename, self.mode) as f:
+            f.write(self.format(registry))
+        log('Metrics written to {0}'.format(self.filename))
+
+    def format(self, registry):
+        """Return the metrics of the registry as text."""
+        raise NotImplementedError
+
+
+class JSONLinesSink(FileSink):
+
+    """
+    Append the metrics as JSON objects, one per line.
+
+    Each line has the time of the dump, the name, the labels and the value of
+    a counter or the count, sum and cumulative buckets of a histogram.
+    """
+
+    mode = 'a'
+
+    def format(self, registry):
+        """Return the metrics of the registry as JSON lines."""
+        now = time.time()
+        lines = []
+        for kind, name, labels, value in registry.samples():
+            data = {'time': now, 'type': kind, 'name': name,
+                    'labels': labels}
+            if kind == 'histogram':
+                data.update(count=value.count, sum=value.sum,
+                            buckets=[[bound, count] for bound, count
+                                     in value.cumulative()])
+            else:
+                data['value'] = value
+            lines.append(json.dumps(data, sort_keys=True) + '\n')
+        return ''.join(lines)
+
+
+class PrometheusSink(FileSink):
+
+    """
+    Write the metrics in the Prometheus text format.
+
+    The file is replaced on each dump, e.g. to be read by the textfile
+    collector of the node exporter.
+    """
+
+    prefix = 'pywikibot_'
+
+    @staticmethod
+    def _labels(labels, **extra):
+        """Return the labels in the Prometheus format."""
+        labels = dict(labels, **extra)
+        if not labels:
+            return ''
+        return '{%s}' % ','.join(
+            '{0}="{1}"'.format(key, '{0}'.format(value)
+                               .replace('\\', '\\\\').replace('"', '\\"')
+                               .replace('\n', '\\n'))
+            for key, value in sorted(labels.items()))
+
+    def format(self, registry):
+        """Return the metrics of the registry in the Prometheus format."""
+        lines = []
+        last_name = None
+        for kind, name, labels, value in registry.samples():
+            name = self.prefix + name
+            if name != last_name:
+                lines.append('# TYPE {0} {1}'.format(name, kind))
+                last_name = name
+            if kind == 'histogram':
+                for bound, count in value.cumulative():
+                    lines.append('{0}_bucket{1} {2}'.format(
+                        name, self._labels(
+                            labels, le='+Inf' if bound is None else bound),
+                        count))
+                lines.append('{0}_sum{1} {2!r}'.format(
+                    name, self._labels(labels), value.sum))
+                lines.append('{0}_count{1} {2}'.format(
+                    name, self._labels(labels), value.count))
+            else:
+                lines.append('{0}{1} {2!r}'.format(
+                    name, self._labels(labels), value))
+        return ''.join(line + '\n' for line in lines)
+
+
+SINKS = {
+    'jsonl': JSONLinesSink,
+    'prometheus': PrometheusSink,
+}
+
+
+def enable(sinks=()):
+    """
+    Start recording metrics.
+
+    @param sinks: objects with a dump(registry) method, which are called by
+        L{dump}
+    @type sinks: iterable
+    """
+    global registry
+
+    if registry is None:
+        registry = MetricsRegistry()
+    for sink in sinks:
+        if sink not in _sinks:
+            _sinks.append(sink)
+
+
+def disable():
+    """Stop recording metrics and remove the registry and the sinks."""
+    global registry
+
+    registry = None
+    del _sinks[:]
+
+
+def configure():
+    """Enable metrics and the file sink if they are enabled in config."""
+    if not config.metrics:
+        return
+    sinks = []
+    if config.metrics_file:
+        if config.metrics_format not in SINKS:
+            raise ValueError('Unknown metrics format {0!r}, use one of {1}'
+                             .format(config.metrics_format,
+                                     ', '.join(sorted(SINKS))))
+        if not any(isinstance(sink, FileSink) for sink in _sinks):
+            sinks.append(SINKS[config.metrics_format](config.metrics_file))
+    enable(sinks)
+
+
+def increment(name, value=1, labels=None):
+    """Add a value to a counter of the registry if metrics are enabled."""
+    if registry is not None:
+        registry.increment(name, value, labels)
+
+
+def observe(name, value, labels=None):
+    """Add a value to a histogram of the registry if metrics are enabled."""
+    if registry is not None:
+        registry.observe(name, value, labels)
+
+
+def dump():
+    """Write the metrics to all sinks."""
+    if registry is not None:
+        for sink in _sinks:
+            sink.dump(registry)
+
+
+atexit.register(dump)
+configure()
@@ -67,9 +67,9 @@ from pywikibot.data.api import APIError
 from pywikibot.family import Family
 from pywikibot.site import DataSite, Namespace, need_version
 from pywikibot.tools import (
-    compute_file_hash,
     PYTHON_VERSION,
     MediaWikiVersion, UnicodeMixin, ComparableMixin, DotReadableDict,
+    concurrent_map,
     deprecated, deprecate_arg, deprecated_args, issue_deprecation_warning,
     add_full_name, manage_wrapping,
     ModuleDeprecationWrapper as _ModuleDeprecationWrapper,
@@ -2680,15 +2680,17 @@ class FilePage(Page):
 
         req = http.fetch(revision.url, stream=True)
         if req.status == 200:
+            # compute the hash while writing instead of reading the file again
+            sha1 = hashlib.sha1()
             try:
                 with open(filename, 'wb') as f:
                     for chunk in req.data.iter_content(chunk_size):
+                        sha1.update(chunk)
                         f.write(chunk)
             except IOError as e:
                 raise e
 
-            sha1 = compute_file_hash(filename)
-            return sha1 == revision.sha1
+            return sha1.hexdigest() == revision.sha1
         else:
             pywikibot.warning('Unsuccesfull request (%s): %s' % (req.status, req.uri))
             return False
@@ -2745,11 +2747,70 @@ class Category(Page):
             titleWithSortKey = self.title(withSection=False)
         return '[[%s]]' % titleWithSortKey
 
+    def _direct_subcategories(self, total=None, content=False):
+        """
+        Yield the subcategories of this category.
+
+        They are cached in the category once all of them were fetched.
+        """
+        if hasattr(self, '_subcats'):
+            for subcat in self._subcats[:total]:
+                yield subcat
+            return
+        subcats = []
+        for member in self.site.categorymembers(
+                self, member_type='subcat', total=total, content=content):
+            subcat = Category(member)
+            subcats.append(subcat)
+            yield subcat
+        if total is None or len(subcats) < total:
+            self._subcats = subcats
+
+    def _walk_subcategories(self, levels, content=False):
+        """
+        Yield the subcategories of this category tree breadth first.
+
+        The subcategories of the categories of one level are queried in
+        parallel, see config.concurrent_category_workers. Each category is
+        yielded once, so that cycles in the category tree are not followed.
+
+        @param levels: the number of levels of subcategories; None for all
+        @type levels: int or None
+        @param content: if True, retrieve the content of the current version
+            of each category description page
+        @type content: bool
+        """
+        seen = set()
+        level = [self]
+        depth = 0
+        while level and (levels is None or depth < levels):
+            next_level = []
+            for subcats in concurrent_map(
+                    lambda cat: list(cat._direct_subcategories(
+                        content=content)),
+                    level, config.concurrent_category_workers):
+                for subcat in subcats:
+                    if subcat.pageid not in seen and subcat != self:
+                        seen.add(subcat.pageid)
+                        next_level.append(subcat)
+                        yield subcat
+            level = next_level
+            depth += 1
+
+    def _recurse_levels(self, recurse):
+        """Return the number of subcategory levels of a recursion."""
+        if recurse is True:
+            return None
+        return recurse or 0
+
     @deprecated_args(startFrom=None, cacheResults=None, step=None)
     def subcategories(self, recurse=False, total=None, content=False):
         """
         Iterate all subcategories of the current category.
 
+        The subcategories are iterated level by level and each of them only
+        once, see L{articles}.
+
         @param recurse: if not False or 0, also iterate subcategories of
             subcategories. If an int, limit recursion to this number of
             levels. (Example: recurse=1 will iterate direct subcats and
@@ -2760,42 +2821,42 @@ class Category(Page):
         @param content: if True, retrieve the content of the current version
             of each category description page (default False)
         """
-        if not isinstance(recurse, bool) and recurse:
-            recurse = recurse - 1
-        if not hasattr(self, "_subcats"):
-            self._subcats = []
-            for member in self.site.categorymembers(
-                    self, member_type='subcat', total=total, content=content):
-                subcat = Category(member)
-                self._subcats.append(subcat)
-                yield subcat
-                if total is not None:
-                    total -= 1
-                    if total == 0:
-                        return
-                if recurse:
-                    for item in subcat.subcategories(
-                            recurse, total=total, content=content):
-                        yield item
-                        if total is not None:
-                            total -= 1
-                            if total == 0:
-                                return
+        if not recurse:
+            gen = self._direct_subcategories(total=total, content=content)
         else:
-            for subcat in self._subcats:
-                yield subcat
+            levels = self._recurse_levels(recurse)
+            gen = self._walk_subcategories(
+                None if levels is None else levels + 1, content=content)
+        for subcat in gen:
+            yield subcat
+            if total is not None:
+                total -= 1
+                if total == 0:
+                    return
+
+    def _recurse_members(self, recurse, total, member_func):
+        """
+        Yield the members of the subcategories of a category tree.
+
+        The members of several subcategories are queried in parallel, see
+        config.concurrent_category_workers, and yielded in the order of the
+        subcategories.
+
+        @param member_func: function returning the list of members of a
+            subcategory, given the subcategory and the maximum number
+        @type member_func: callable
+        """
+        gen = concurrent_map(
+            lambda subcat: member_func(subcat, total),
+            self._walk_subcategories(self._recurse_levels(recurse)),
+            config.concurrent_category_workers)
+        for members in gen:
+            for member in members:
+                yield member
                 if total is not None:
                     total -= 1
                     if total == 0:
                         return
-                if recurse:
-                    for item in subcat.subcategories(
-                            recurse, total=total, content=content):
-                        yield item
-                        if total is not None:
-                            total -= 1
-                            if total == 0:
-                                return
 
     @deprecated_args(startFrom='startsort', step=None)
     def articles(self, recurse=False, total=None,
@@ -2808,6 +2869,12 @@ class Category(Page):
         By default, yields all *pages* in the category that are not
         subcategories!
 
+        When recursing, the articles of the subcategories follow those of
+        the category, level by level of the category tree. Each subcategory
+        is visited once, even if the categories form a cycle. The articles
+        of several subcategories are queried in parallel, see
+        config.concurrent_category_workers.
+
         @param recurse: if not False or 0, also iterate articles in
             subcategories. If an int, limit recursion to this number of
             levels. (Example: recurse=1 will iterate articles in first-level
@@ -2839,46 +2906,39 @@ class Category(Page):
             lexically; not valid if sortby="timestamp"
         @type endsort: str
         """
-        for member in self.site.categorymembers(self,
-                                                namespaces=namespaces,
-                                                total=total,
-                                                content=content, sortby=sortby,
-                                                reverse=reverse,
-                                                starttime=starttime,
-                                                endtime=endtime,
-                                                startsort=startsort,
-                                                endsort=endsort,
-                                                member_type=['page', 'file']
-                                                ):
+        def category_articles(cat, total):
+            return cat.site.categorymembers(cat,
+                                            namespaces=namespaces,
+                                            total=total,
+                                            content=content, sortby=sortby,
+                                            reverse=reverse,
+                                            starttime=starttime,
+                                            endtime=endtime,
+                                            startsort=startsort,
+                                            endsort=endsort,
+                                            member_type=['page', 'file'])
+
+        for member in category_articles(self, total):
             yield member
             if total is not None:
                 total -= 1
                 if total == 0:
                     return
         if recurse:
-            if not isinstance(recurse, bool) and recurse:
-                recurse = recurse - 1
-            for subcat in self.subcategories():
-                for article in subcat.articles(recurse, total=total,
-                                               content=content,
-                                               namespaces=namespaces,
-                                               sortby=sortby,
-                                               reverse=reverse,
-                                               starttime=starttime,
-                                               endtime=endtime,
-                                               startsort=startsort,
-                                               endsort=endsort
-                                               ):
-                    yield article
-                    if total is not None:
-                        total -= 1
-                        if total == 0:
-                            return
+            for member in self._recurse_members(
+                    recurse, total,
+                    lambda cat, total: list(category_articles(cat, total))):
+                yield member
 
     @deprecated_args(step=None)
     def members(self, recurse=False, namespaces=None, total=None,
                 content=False):
-        """Yield all category contents (subcats, pages, and files)."""
+        """
+        Yield all category contents (subcats, pages, and files).
+
+        When recursing, the members of the subcategories are iterated like
+        in L{articles}.
+        """
         for member in self.site.categorymembers(
                 self, namespaces, total=total, content=content):
             yield member
@@ -2887,16 +2947,11 @@ class Category(Page):
                 if total == 0:
                     return
         if recurse:
-            if not isinstance(recurse, bool) and recurse:
-                recurse = recurse - 1
-            for subcat in self.subcategories():
-                for article in subcat.members(
-                        recurse, namespaces, total=total, content=content):
-                    yield article
-                    if total is not None:
-                        total -= 1
-                        if total == 0:
-                            return
+            for member in self._recurse_members(
+                    recurse, total,
+                    lambda cat, total: list(cat.site.categorymembers(
+                        cat, namespaces, total=total, content=content))):
+                yield member
 
     @need_version('1.13')
     def isEmptyCategory(self):
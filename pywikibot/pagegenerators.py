@@ -38,6 +38,7 @@ from warnings import warn
 import pywikibot
 
 from pywikibot.tools import (
+    CompactSet,
     deprecated,
     deprecated_args,
     DequeGenerator,
@@ -362,6 +363,21 @@ docuReplacements = {'&params;': parameterHelp}
 __doc__ = __doc__.replace("&params;", parameterHelp)
 
 
+def _filter_unique_pages(iterable):
+    """
+    Yield unique pages from an iterable, omitting duplicates.
+
+    The pages are kept to recognize duplicates, or only their hashes with
+    config.compact_dedup, see L{pywikibot.tools.CompactSet}.
+
+    @param iterable: the source iterable
+    @type iterable: collections.Iterable
+    """
+    if config.compact_dedup:
+        return filter_unique(iterable, container=CompactSet())
+    return filter_unique(iterable)
+
+
 class GeneratorFactory(object):
 
     """Process command line arguments and return appropriate page generator.
@@ -373,7 +389,7 @@ class GeneratorFactory(object):
     # This is the function that will be used to de-duplicate iterators.
     # See the documentation in L{pywikibot.tools.filter_unique} for reasons
     # why this should be changed to improve space and time of execution.
-    _filter_unique = staticmethod(filter_unique)
+    _filter_unique = staticmethod(_filter_unique_pages)
     # The seen list can not yet be shared at present, due to `intersect` mode
     # not being known until after all generators have been created.
     # When not in intersect mode, _filter_unique could be:
@@ -492,7 +508,8 @@ class GeneratorFactory(object):
                     '"-intersect" ignored as only one generator is specified.')
         else:
             if self.intersect:
-                gensList = intersect_generators(self.gens)
+                gensList = intersect_generators(
+                    self.gens, compact=config.compact_dedup)
                 # By definition no duplicates are possible.
                 dupfiltergen = gensList
             else:
@@ -2588,16 +2605,21 @@ def MySQLPageGenerator(query, site=None, verbose=None):
     if site is None:
         site = pywikibot.Site()
 
+    encoding = site.encoding()
     row_gen = mysql.mysql_query(query,
                                 dbname=site.dbName(),
-                                encoding=site.encoding(),
+                                encoding=encoding,
                                 verbose=verbose)
+    namespaces = {}
     for row in row_gen:
         namespaceNumber, pageName = row
         if pageName:
             # Namespace Dict only supports int
-            namespace = site.namespace(int(namespaceNumber))
-            pageName = pageName.decode(site.encoding())
+            namespaceNumber = int(namespaceNumber)
+            if namespaceNumber not in namespaces:
+                namespaces[namespaceNumber] = site.namespace(namespaceNumber)
+            namespace = namespaces[namespaceNumber]
+            pageName = pageName.decode(encoding)
             if namespace:
                 pageTitle = '%s:%s' % (namespace, pageName)
             else:
@@ -2759,7 +2781,8 @@ def WikidataPageFromItemGenerator(gen, site):
 
 def WikidataSPARQLPageGenerator(query, site=None,
                                 item_name='item', endpoint=None,
-                                entity_url=None, result_type=set):
+                                entity_url=None, result_type=set,
+                                page_size=None):
     """Generate pages that result from the given SPARQL query.
 
     @param query: the SPARQL query string.
@@ -2772,6 +2795,11 @@ def WikidataSPARQLPageGenerator(query, site=None,
     @param result_type: type of the iterable in which
              SPARQL results are stored (default set)
     @type result_type: iterable
+    @param page_size: if given, the results are requested in pages of this
+        many rows using LIMIT and OFFSET and the items are yielded as the
+        pages arrive instead of collecting them in result_type first.
+        Duplicate items are skipped.
+    @type page_size: int or None
 
     """
     from pywikibot.data import sparql
@@ -2783,9 +2811,14 @@ def WikidataSPARQLPageGenerator(query, site=None,
     if not endpoint or not entity_url:
         dependencies['repo'] = repo
     query_object = sparql.SparqlQuery(**dependencies)
-    data = query_object.get_items(query,
-                                  item_name=item_name,
-                                  result_type=result_type)
+    if page_size is None:
+        data = query_object.get_items(query,
+                                      item_name=item_name,
+                                      result_type=result_type)
+    else:
+        data = filter_unique(query_object.iter_items(query,
+                                                     item_name=item_name,
+                                                     page_size=page_size))
     items_pages = (pywikibot.ItemPage(repo, item) for item in data)
     if isinstance(site, pywikibot.site.DataSite):
         return items_pages
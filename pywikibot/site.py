@@ -18,6 +18,7 @@ __version__ = '$Id$'
 import copy
 import datetime
 import functools
+import hashlib
 import heapq
 import itertools
 import json
@@ -36,6 +37,8 @@ import pywikibot.family
 
 from pywikibot.comms.http import get_authentication
 from pywikibot.data import api
+from pywikibot.data.redirectmap import RedirectMap
+from pywikibot.data.uploadjournal import UploadJournal
 from pywikibot.echo import Notification
 from pywikibot.exceptions import (
     Error,
@@ -67,6 +70,7 @@ from pywikibot.exceptions import (
 from pywikibot.family import WikimediaFamily
 from pywikibot.throttle import Throttle
 from pywikibot.tools import (
+    ChunkReader,
     compute_file_hash,
     itergroup, UnicodeMixin, ComparableMixin, SelfCallMixin, SelfCallString,
     deprecated, deprecate_arg, deprecated_args, remove_last_args,
@@ -3234,6 +3238,20 @@ class APISite(BaseSite):
 
         return page._redirtarget
 
+    @property
+    def redirect_map(self):
+        """
+        Return the local map of the redirects of this site.
+
+        It resolves the redirect chains of many pages with few requests,
+        see L{RedirectMap.resolve}.
+
+        @rtype: RedirectMap
+        """
+        if not hasattr(self, '_redirect_map'):
+            self._redirect_map = RedirectMap(self)
+        return self._redirect_map
+
     def load_pages_from_pageids(self, pageids):
         """
         Return a page generator from pageids.
@@ -3351,7 +3369,7 @@ class APISite(BaseSite):
                              % (len(cache), self))
 
             for pagedata in rvgen:
-                pywikibot.debug(u"Preloading %s" % pagedata, _logger)
+                pywikibot.debug(lambda: u"Preloading %s" % pagedata, _logger)
                 try:
                     if pagedata['title'] not in cache:
                         # API always returns a "normalized" title which is
@@ -6025,6 +6043,11 @@ class APISite(BaseSite):
             U{https://www.mediawiki.org/wiki/API:Upload#Chunked_uploading}). It
             will only upload in chunks, if the version number is 1.20 or higher
             and the chunk size is positive but lower than the file size.
+            The next chunk is read while a chunk is sent and the SHA1 of the
+            file is computed from the chunks to verify the upload. If
+            config.upload_journal is True, the stashed chunks are recorded
+            and an interrupted upload of the same file continues with them
+            when no file key is given.
         @type chunk_size: int
         @param _file_key: Reuses an already uploaded file using the filekey. If
             None (default) it will upload the file.
@@ -6121,6 +6144,7 @@ class APISite(BaseSite):
         result = None
         file_page_title = filepage.title(withNamespace=False)
         file_size = None
+        local_sha1 = None
         offset = _offset
         # make sure file actually exists
         if source_filename:
@@ -6130,6 +6154,16 @@ class APISite(BaseSite):
                 raise ValueError("File '%s' does not exist."
                                  % source_filename)
 
+        journal = None
+        if (source_filename and chunk_size > 0 and file_size is not None and
+                chunk_size < file_size and _file_key is None and
+                pywikibot.config.upload_journal):
+            journal = UploadJournal(self, file_page_title, source_filename)
+            _file_key, offset = self._resume_upload(journal, source_filename,
+                                                    file_size)
+            if _file_key:
+                _verify_stash = False
+
         if source_filename and _file_key:
             assert offset is False or file_size is not None
             if _verify_stash is None:
@@ -6204,116 +6238,125 @@ class APISite(BaseSite):
                         'action': 'upload', 'token': token, 'text': text,
                         'filename': file_page_title, 'comment': comment})
                 if chunked_upload:
-                    if offset > 0:
-                        pywikibot.log('Continuing upload from byte '
-                                      '{0}'.format(offset))
-                    while True:
-                        f.seek(offset)
-                        chunk = f.read(chunk_size)
-                        req = self._request(
-                            throttle=throttle, mime=True,
-                            parameters={
-                                'action': 'upload',
-                                'token': token,
-                                'stash': True,
-                                'filesize': filesize,
-                                'offset': offset,
-                                'filename': file_page_title,
-                                'ignorewarnings': ignore_all_warnings})
-                        req.mime_params['chunk'] = (
-                            chunk, ('application', 'octet-stream'),
-                            {'filename': mime_filename})
-                        if _file_key:
-                            req['filekey'] = _file_key
-                        try:
-                            data = req.submit()['upload']
-                            self._uploaddisabled = False
-                        except api.APIError as error:
-                            # TODO: catch and process foreseeable errors
-                            if error.code == u'uploaddisabled':
-                                self._uploaddisabled = True
-                            elif error.code == u'stashfailed' and \
-                                    'offset' in error.other:
-                                # TODO: Ask MediaWiki to change this
-                                # ambiguous error code.
-
-                                new_offset = int(error.other['offset'])
-                                # If the offset returned from the server
-                                # (the offset it expects now) is equal to
-                                # the offset we sent it, there must be
-                                # something else that prevented the upload,
-                                # instead of simple offset mismatch. This
-                                # also prevents infinite loops when we
-                                # upload the same chunk again and again,
-                                # every time ApiError.
-                                if offset != new_offset:
+                    with ChunkReader(source_filename, chunk_size,
+                                     sha='sha1') as reader:
+                        if offset > 0:
+                            pywikibot.log('Continuing upload from byte '
+                                          '{0}'.format(offset))
+                        while True:
+                            chunk = reader.read(offset)
+                            req = self._request(
+                                throttle=throttle, mime=True,
+                                parameters={
+                                    'action': 'upload',
+                                    'token': token,
+                                    'stash': True,
+                                    'filesize': filesize,
+                                    'offset': offset,
+                                    'filename': file_page_title,
+                                    'ignorewarnings': ignore_all_warnings})
+                            req.mime_params['chunk'] = (
+                                chunk, ('application', 'octet-stream'),
+                                {'filename': mime_filename})
+                            if _file_key:
+                                req['filekey'] = _file_key
+                            try:
+                                data = req.submit()['upload']
+                                self._uploaddisabled = False
+                            except api.APIError as error:
+                                # TODO: catch and process foreseeable errors
+                                if error.code == u'uploaddisabled':
+                                    self._uploaddisabled = True
+                                elif error.code == u'stashfailed' and \
+                                        'offset' in error.other:
+                                    # TODO: Ask MediaWiki to change this
+                                    # ambiguous error code.
+
+                                    new_offset = int(error.other['offset'])
+                                    # If the offset returned from the server
+                                    # (the offset it expects now) is equal to
+                                    # the offset we sent it, there must be
+                                    # something else that prevented the upload,
+                                    # instead of simple offset mismatch. This
+                                    # also prevents infinite loops when we
+                                    # upload the same chunk again and again,
+                                    # every time ApiError.
+                                    if offset != new_offset:
+                                        pywikibot.log(
+                                            'Old offset: {0}; Returned '
+                                            'offset: {1}; Chunk size: '
+                                            '{2}'.format(offset, new_offset,
+                                                         len(chunk)))
+                                        pywikibot.warning(
+                                            'Attempting to correct '
+                                            'automatically from offset '
+                                            'mismatch error.')
+                                        offset = new_offset
+                                        continue
+                                raise error
+                            if 'nochange' in data:  # in simulation mode
+                                break
+                            _file_key = data['filekey']
+                            if ('warnings' in data and
+                                    not ignore_all_warnings):
+                                if callable(ignore_warnings):
+                                    restart = False
+                                    if 'offset' not in data:
+                                        # This is a result of a warning in
+                                        # the first chunk. The chunk is not
+                                        # actually stashed so upload must be
+                                        # restarted if the warning is
+                                        # allowed.
+                                        # T112416 and T112405#1637544
+                                        restart = True
+                                        data['offset'] = True
+                                    if ignore_warnings(
+                                            create_warnings_list(data)):
+                                        # Future warnings of this run
+                                        # can be ignored
+                                        if restart:
+                                            return self.upload(
+                                                filepage, source_filename,
+                                                source_url, comment, text,
+                                                watch, True, chunk_size, None,
+                                                0, report_success=False)
+
+                                        ignore_warnings = True
+                                        ignore_all_warnings = True
+                                        offset = data['offset']
+                                        continue
+                                    else:
+                                        return False
+                                result = data
+                                if 'offset' not in result:
+                                    result['offset'] = 0
+                                break
+                            throttle = False
+                            if 'offset' in data:
+                                new_offset = int(data['offset'])
+                                if offset + len(chunk) != new_offset:
                                     pywikibot.log(
-                                        'Old offset: {0}; Returned '
-                                        'offset: {1}; Chunk size: '
-                                        '{2}'.format(offset, new_offset,
-                                                     len(chunk)))
-                                    pywikibot.warning('Attempting to correct '
-                                                      'automatically from '
-                                                      'offset mismatch error.')
-                                    offset = new_offset
-                                    continue
-                            raise error
-                        if 'nochange' in data:  # in simulation mode
-                            break
-                        _file_key = data['filekey']
-                        if 'warnings' in data and not ignore_all_warnings:
-                            if callable(ignore_warnings):
-                                restart = False
-                                if 'offset' not in data:
-                                    # This is a result of a warning in the
-                                    # first chunk. The chunk is not actually
-                                    # stashed so upload must be restarted if
-                                    # the warning is allowed.
-                                    # T112416 and T112405#1637544
-                                    restart = True
-                                    data['offset'] = True
-                                if ignore_warnings(create_warnings_list(data)):
-                                    # Future warnings of this run
-                                    # can be ignored
-                                    if restart:
-                                        return self.upload(
-                                            filepage, source_filename,
-                                            source_url, comment, text, watch,
-                                            True, chunk_size, None, 0,
-                                            report_success=False)
-
-                                    ignore_warnings = True
-                                    ignore_all_warnings = True
-                                    offset = data['offset']
-                                    continue
-                                else:
-                                    return False
-                            result = data
-                            if 'offset' not in result:
-                                result['offset'] = 0
-                            break
-                        throttle = False
-                        if 'offset' in data:
-                            new_offset = int(data['offset'])
-                            if offset + len(chunk) != new_offset:
-                                pywikibot.log('Old offset: {0}; Returned '
-                                              'offset: {1}; Chunk size: '
-                                              '{2}'.format(offset, new_offset,
-                                                           len(chunk)))
-                                pywikibot.warning('Unexpected offset.')
-                            offset = new_offset
-                        else:
-                            pywikibot.warning('Offset was not supplied.')
-                            offset += len(chunk)
-                        if data['result'] != 'Continue':  # finished
-                            pywikibot.log('Finished uploading last chunk.')
-                            final_request['filekey'] = _file_key
-                            break
+                                        'Old offset: {0}; Returned offset: '
+                                        '{1}; Chunk size: {2}'.format(
+                                            offset, new_offset, len(chunk)))
+                                    pywikibot.warning('Unexpected offset.')
+                                offset = new_offset
+                            else:
+                                pywikibot.warning('Offset was not supplied.')
+                                offset += len(chunk)
+                            if journal:
+                                journal.update(_file_key, offset)
+                            if data['result'] != 'Continue':  # finished
+                                pywikibot.log('Finished uploading last chunk.')
+                                final_request['filekey'] = _file_key
+                                break
+                        local_sha1 = reader.hexdigest()
                 else:  # not chunked upload
                     if _file_key:
                         final_request['filekey'] = _file_key
                     else:
                         file_contents = f.read()
+                        local_sha1 = hashlib.sha1(file_contents).hexdigest()
                         filetype = (mimetypes.guess_type(source_filename)[0] or
                                     'application/octet-stream')
                         final_request.mime_params = {
@@ -6380,14 +6423,57 @@ class APISite(BaseSite):
         elif "result" not in result:
             pywikibot.output(u"Upload: unrecognized response: %s" % result)
         if result["result"] == "Success":
+            if journal:
+                journal.remove()
             if report_success:
                 pywikibot.output(u"Upload successful.")
             # If we receive a nochange, that would mean we're in simulation
             # mode, don't attempt to access imageinfo
             if "nochange" not in result:
                 filepage._load_file_revisions([result["imageinfo"]])
+                sha1 = result['imageinfo'].get('sha1')
+                if local_sha1 and sha1 and sha1 != local_sha1:
+                    pywikibot.warning(
+                        'The SHA1 of the uploaded {0} is {1} while the local '
+                        'file is {2}'.format(file_page_title, sha1,
+                                             local_sha1))
         return result['result'] == 'Success'
 
+    def _resume_upload(self, journal, source_filename, file_size):
+        """
+        Return the file key and offset to continue an interrupted upload.
+
+        The chunks recorded in the journal are verified against the stash
+        on the wiki and the local file. If they don't match or the stash
+        expired, the journal entry is removed.
+
+        @param journal: the journal entry of the upload
+        @type journal: UploadJournal
+        @return: file key and offset or None and 0 to start a new upload
+        @rtype: tuple
+        """
+        entry = journal.load()
+        if not entry:
+            return None, 0
+        file_key = entry[0]
+        try:
+            stash_info = self.stash_info(file_key, ['size', 'sha1'])
+        except api.APIError as e:
+            pywikibot.log('Stashed chunks of {0} not available: {1}'
+                          .format(source_filename, e))
+        else:
+            offset = stash_info.get('size')
+            if (offset is not None and offset <= file_size and
+                    compute_file_hash(source_filename, bytes_to_read=offset) ==
+                    stash_info.get('sha1')):
+                pywikibot.output('Resuming interrupted upload of {0} at byte '
+                                 '{1}'.format(source_filename, offset))
+                return file_key, offset
+            pywikibot.log('Stashed chunks of {0} do not match the file'
+                          .format(source_filename))
+        journal.remove()
+        return None, 0
+
     @deprecated_args(number='total',
                      repeat=None,
                      namespace="namespaces",
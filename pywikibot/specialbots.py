@@ -28,7 +28,9 @@ from pywikibot.bot import (
 )
 from pywikibot.editor import TextEditor
 from pywikibot.textlib import replace_links
-from pywikibot.tools import PY2, deprecated, deprecated_args
+from pywikibot.tools import (
+    PY2, compute_file_hash, deprecated, deprecated_args,
+)
 from pywikibot.tools.formatter import color_format
 
 if not PY2:
@@ -45,12 +47,14 @@ class UploadRobot(BaseBot):
 
     """Upload bot."""
 
+    read_block_size = 1 << 20  # bytes read at once when downloading a file
+
     @deprecated_args(uploadByUrl=None)
     def __init__(self, url, urlEncoding=None, description=u'',
                  useFilename=None, keepFilename=False,
                  verifyDescription=True, ignoreWarning=False,
                  targetSite=None, aborts=[], chunk_size=0,
-                 summary=None, **kwargs):
+                 summary=None, sha1_index=None, **kwargs):
         """
         Constructor.
 
@@ -89,6 +93,11 @@ class UploadRobot(BaseBot):
             or aborts are set to True and that the description is also set. It
             overwrites verifyDescription to False and keepFilename to True.
         @type always: bool
+        @param sha1_index: Local index of the files on the target site. It is
+            updated when the bot runs and files already on the target site
+            are skipped without asking the wiki, unless the 'duplicate'
+            warning is ignored.
+        @type sha1_index: pywikibot.data.fileindex.FileHashIndex
 
         @deprecated: Using upload_image() is deprecated, use upload_file() with
             file_url param instead
@@ -115,6 +124,8 @@ class UploadRobot(BaseBot):
         self.aborts = aborts
         self.chunk_size = chunk_size
         self.summary = summary
+        self.sha1_index = sha1_index
+        self._hashes = {}
         if config.upload_to_commons:
             self.targetSite = targetSite or pywikibot.Site('commons',
                                                            'commons')
@@ -128,7 +139,12 @@ class UploadRobot(BaseBot):
         return "://" in self.url or os.path.exists(self.url)
 
     def read_file_content(self, file_url=None):
-        """Return name of temp file in which remote file is saved."""
+        """
+        Return name of temp file in which remote file is saved.
+
+        The file is written to the temp file while it is downloaded, so it
+        is never held in memory completely.
+        """
         if not file_url:
             file_url = self.url
             pywikibot.warning("file_url is not given. "
@@ -136,67 +152,101 @@ class UploadRobot(BaseBot):
         pywikibot.output(u'Reading file %s' % file_url)
         resume = False
         rlen = 0
-        _contents = None
         dt = 15
         uo = URLopener()
         retrieved = False
+        handle, tempname = tempfile.mkstemp()
 
-        while not retrieved:
-            if resume:
-                pywikibot.output(u"Resume download...")
-                uo.addheader('Range', 'bytes=%s-' % rlen)
-
-            infile = uo.open(file_url)
-            info = infile.info()
+        with os.fdopen(handle, 'wb') as t:
+            while not retrieved:
+                if resume:
+                    pywikibot.output(u"Resume download...")
+                    uo.addheader('Range', 'bytes=%s-' % rlen)
 
-            if PY2:
-                content_type = info.getheader('Content-Type')
-                content_len = info.getheader('Content-Length')
-                accept_ranges = info.getheader('Accept-Ranges')
-            else:
-                content_type = info.get('Content-Type')
-                content_len = info.get('Content-Length')
-                accept_ranges = info.get('Accept-Ranges')
+                infile = uo.open(file_url)
+                info = infile.info()
 
-            if 'text/html' in content_type:
-                pywikibot.output(u"Couldn't download the image: "
-                                 "the requested URL was not found on server.")
-                return
+                if PY2:
+                    content_type = info.getheader('Content-Type')
+                    content_len = info.getheader('Content-Length')
+                    accept_ranges = info.getheader('Accept-Ranges')
+                else:
+                    content_type = info.get('Content-Type')
+                    content_len = info.get('Content-Length')
+                    accept_ranges = info.get('Accept-Ranges')
+
+                if 'text/html' in content_type:
+                    pywikibot.output(u"Couldn't download the image: "
+                                     "the requested URL was not found on "
+                                     "server.")
+                    infile.close()
+                    break
 
-            valid_ranges = accept_ranges == 'bytes'
+                valid_ranges = accept_ranges == 'bytes'
 
-            if resume:
-                _contents += infile.read()
-            else:
-                _contents = infile.read()
+                if not resume:
+                    t.seek(0)
+                    t.truncate()
+                    rlen = 0
+                while True:
+                    block = infile.read(self.read_block_size)
+                    if not block:
+                        break
+                    t.write(block)
+                    rlen += len(block)
 
-            infile.close()
-            retrieved = True
+                infile.close()
+                retrieved = True
 
-            if content_len:
-                rlen = len(_contents)
-                content_len = int(content_len)
-                if rlen < content_len:
-                    retrieved = False
-                    pywikibot.output(
-                        u"Connection closed at byte %s (%s left)"
-                        % (rlen, content_len))
-                    if valid_ranges and rlen > 0:
-                        resume = True
-                    pywikibot.output(u"Sleeping for %d seconds..." % dt)
-                    time.sleep(dt)
-                    if dt <= 60:
-                        dt += 15
-                    elif dt < 360:
-                        dt += 60
-            else:
-                pywikibot.log(
-                    u"WARNING: length check of retrieved data not possible.")
-        handle, tempname = tempfile.mkstemp()
-        with os.fdopen(handle, "wb") as t:
-            t.write(_contents)
+                if content_len:
+                    content_len = int(content_len)
+                    if rlen < content_len:
+                        retrieved = False
+                        pywikibot.output(
+                            u"Connection closed at byte %s (%s left)"
+                            % (rlen, content_len))
+                        resume = valid_ranges and rlen > 0
+                        pywikibot.output(u"Sleeping for %d seconds..." % dt)
+                        time.sleep(dt)
+                        if dt <= 60:
+                            dt += 15
+                        elif dt < 360:
+                            dt += 60
+                else:
+                    pywikibot.log(
+                        u"WARNING: length check of retrieved data not "
+                        "possible.")
+        if not retrieved:
+            os.remove(tempname)
+            return None
         return tempname
 
+    def _hash_files(self, file_urls):
+        """Compute the hashes of the local files before uploading them."""
+        for file_url in file_urls:
+            if '://' not in file_url and file_url not in self._hashes:
+                self._hashes[file_url] = compute_file_hash(file_url)
+
+    def _is_duplicate(self, file_url):
+        """
+        Return whether the file is skipped as it is on the target site.
+
+        @param file_url: the url or path of the file
+        @type file_url: str
+        @rtype: bool
+        """
+        if not self.sha1_index or file_url not in self._hashes:
+            return False
+        if self._handle_warning('duplicate') is True:
+            return False
+        sha1 = self._hashes[file_url]
+        titles = self.sha1_index.lookup([sha1]).get(sha1)
+        if titles:
+            pywikibot.output('Skipping {0}: duplicate of {1}'
+                             .format(file_url, ', '.join(titles)))
+            return True
+        return False
+
     def _handle_warning(self, warning):
         """
         Return whether the warning cause an abort or be ignored.
@@ -405,6 +455,9 @@ class UploadRobot(BaseBot):
         If the upload fails, ask the user whether to try again or not.
         If the user chooses not to retry, return None.
         """
+        if self._is_duplicate(file_url):
+            return None
+
         filename = self.process_filename(file_url)
         if not filename:
             return None
@@ -417,9 +470,18 @@ class UploadRobot(BaseBot):
 
         success = False
         ignore_warnings = self.ignoreWarning is True or self._handle_warnings
+        tempname = None
+        sha1_key = file_url
         if ('://' in file_url and
                 'upload_by_url' not in site.userinfo['rights']):
-            file_url = self.read_file_content(file_url)
+            file_url = tempname = self.read_file_content(file_url)
+            if not tempname:
+                return None
+            if self.sha1_index:
+                self._hashes[sha1_key] = compute_file_hash(tempname)
+                if self._is_duplicate(sha1_key):
+                    os.remove(tempname)
+                    return None
 
         try:
             success = imagepage.upload(file_url,
@@ -443,10 +505,16 @@ class UploadRobot(BaseBot):
                 # No warning, upload complete.
                 pywikibot.output(u"Upload of %s successful." % filename)
                 self._save_counter += 1
+                if self.sha1_index and sha1_key in self._hashes:
+                    self.sha1_index.add(imagepage.title(),
+                                        self._hashes[sha1_key])
                 return filename  # data['filename']
             else:
                 pywikibot.output(u"Upload aborted.")
                 return None
+        finally:
+            if tempname:
+                os.remove(tempname)
 
     def run(self):
         """Run bot."""
@@ -464,6 +532,11 @@ class UploadRobot(BaseBot):
                 % (self.targetSite.user(), self.targetSite))
             return
 
+        if self.sha1_index:
+            self.sha1_index.update()
+            self._hash_files([self.url] if isinstance(self.url, basestring)
+                             else self.url)
+
         try:
             if isinstance(self.url, basestring):
                 self._treat_counter = 1
@@ -127,6 +127,12 @@ NON_LATIN_DIGITS = {
     'or': u'୦୧୨୩୪୫୬୭୮୯',
 }
 
+# Translation table used by TimeStripper to make non-latin digits latin.
+_LATIN_DIGITS_TABLE = dict(
+    (ord(digit), '%d' % i)
+    for digits in NON_LATIN_DIGITS.values()
+    for i, digit in enumerate(digits))
+
 # Used in TimeStripper. When a timestamp-like line has longer gaps
 # than this between year, month, etc in it, then the line will not be
 # considered to contain a timestamp.
@@ -1879,6 +1885,9 @@ class TimeStripper(object):
 
     """Find timestamp in page and return it as pywikibot.Timestamp object."""
 
+    # compiled patterns, keyed by the month names of the site
+    _patterns_cache = {}
+
     def __init__(self, site=None):
         """Constructor."""
         if site is None:
@@ -1886,24 +1895,61 @@ class TimeStripper(object):
         else:
             self.site = site
 
-        self.origNames2monthNum = {}
-        for n, (_long, _short) in enumerate(self.site.months_names, start=1):
-            self.origNames2monthNum[_long] = n
-            self.origNames2monthNum[_short] = n
+        self.groups = ['year', 'month', 'hour', 'time', 'day', 'minute',
+                       'tzinfo']
+
+        months_names = tuple(tuple(names) for names in self.site.months_names)
+        if months_names not in self._patterns_cache:
+            self._patterns_cache[months_names] = self._compile_patterns(
+                months_names)
+        (self.origNames2monthNum, self.is_digit_month,
+         self.ptimeR, self.ptimeznR, self.pyearR, self.pmonthR, self.pdayR,
+         self._candidate_pat) = self._patterns_cache[months_names]
+
+        # order is important to avoid mismatch when searching
+        self.patterns = [
+            self.ptimeR,
+            self.ptimeznR,
+            self.pyearR,
+            self.pmonthR,
+            self.pdayR,
+        ]
+
+        self._hyperlink_pat = re.compile(r'\[\s*?http[s]?://[^\]]*?\]')
+        self._comment_pat = re.compile(r'<!--(.*?)-->')
+        self._wikilink_pat = re.compile(
+            r'\[\[(?P<link>[^\]\|]*?)(?P<anchor>\|[^\]]*)?\]\]')
+
+        self.tzinfo = tzoneFixedOffset(self.site.siteinfo['timeoffset'],
+                                       self.site.siteinfo['timezone'])
+
+    @staticmethod
+    def _compile_patterns(months_names):
+        """
+        Compile the patterns for the given month names.
+
+        @param months_names: month names as returned by site.months_names
+        @type months_names: tuple of tuples
+        @return: month names mapped to month numbers, whether months may be
+            given as digits and the patterns for time, time zone, year,
+            month, day and timestamp candidates
+        @rtype: tuple
+        """
+        origNames2monthNum = {}
+        for n, (_long, _short) in enumerate(months_names, start=1):
+            origNames2monthNum[_long] = n
+            origNames2monthNum[_short] = n
             # in some cases month in ~~~~ might end without dot even if
             # site.months_names do not.
             if _short.endswith('.'):
-                self.origNames2monthNum[_short[:-1]] = n
-
-        self.groups = ['year', 'month', 'hour', 'time', 'day', 'minute',
-                       'tzinfo']
+                origNames2monthNum[_short[:-1]] = n
 
         timeR = r'(?P<time>(?P<hour>([0-1]\d|2[0-3]))[:\.h](?P<minute>[0-5]\d))'
         timeznR = r'\((?P<tzinfo>[A-Z]+)\)'
         yearR = r'(?P<year>(19|20)\d\d)(?:%s)?' % u'\ub144'
         # if months have 'digits' as names, they need to be
         # removed; will be handled as digits in regex, adding d+{1,2}\.?
-        escaped_months = [_ for _ in self.origNames2monthNum if
+        escaped_months = [_ for _ in origNames2monthNum if
                           not _.strip('.').isdigit()]
         # match longest names first.
         escaped_months = [re.escape(_) for
@@ -1911,38 +1957,24 @@ class TimeStripper(object):
         # work around for cs wiki: if month are in digits, we assume
         # that format is dd. mm. (with dot and spaces optional)
         # the last one is workaround for Korean
-        if any(_.isdigit() for _ in self.origNames2monthNum):
-            self.is_digit_month = True
+        if any(_.isdigit() for _ in origNames2monthNum):
+            is_digit_month = True
             monthR = r'(?P<month>(%s)|(?:1[012]|0?[1-9])\.)' \
                 % u'|'.join(escaped_months)
             dayR = r'(?P<day>(3[01]|[12]\d|0?[1-9]))(?:%s)?\.?\s*(?:[01]?\d\.)?' % u'\uc77c'
         else:
-            self.is_digit_month = False
+            is_digit_month = False
             monthR = r'(?P<month>(%s))' % u'|'.join(escaped_months)
             dayR = r'(?P<day>(3[01]|[12]\d|0?[1-9]))\.?'
 
-        self.ptimeR = re.compile(timeR)
-        self.ptimeznR = re.compile(timeznR)
-        self.pyearR = re.compile(yearR)
-        self.pmonthR = re.compile(monthR)
-        self.pdayR = re.compile(dayR)
+        # Every timestamp has a time followed by a time zone. Lines without
+        # them are skipped with a single search.
+        candidateR = r'(?:[0-1]\d|2[0-3])[:\.h][0-5]\d.*?\([A-Z]+\)'
 
-        # order is important to avoid mismatch when searching
-        self.patterns = [
-            self.ptimeR,
-            self.ptimeznR,
-            self.pyearR,
-            self.pmonthR,
-            self.pdayR,
-        ]
-
-        self._hyperlink_pat = re.compile(r'\[\s*?http[s]?://[^\]]*?\]')
-        self._comment_pat = re.compile(r'<!--(.*?)-->')
-        self._wikilink_pat = re.compile(
-            r'\[\[(?P<link>[^\]\|]*?)(?P<anchor>\|[^\]]*)?\]\]')
-
-        self.tzinfo = tzoneFixedOffset(self.site.siteinfo['timeoffset'],
-                                       self.site.siteinfo['timezone'])
+        return (origNames2monthNum, is_digit_month,
+                re.compile(timeR), re.compile(timeznR), re.compile(yearR),
+                re.compile(monthR), re.compile(dayR),
+                re.compile(candidateR, re.DOTALL))
 
     @property
     @deprecated('_hyperlink_pat')
@@ -1963,10 +1995,7 @@ class TimeStripper(object):
 
     def fix_digits(self, line):
         """Make non-latin digits like Persian to latin to parse."""
-        for system in NON_LATIN_DIGITS.values():
-            for i in range(0, 10):
-                line = line.replace(system[i], str(i))
-        return line
+        return line.translate(_LATIN_DIGITS_TABLE)
 
     def _last_match_and_replace(self, txt, pat):
         """
@@ -2041,6 +2070,10 @@ class TimeStripper(object):
         def censor_match(match):
             return '_' * (match.end() - match.start())
 
+        # Most lines do not contain a signature; skip them early.
+        if not self._candidate_pat.search(self.fix_digits(line)):
+            return None
+
         # match date fields
         dateDict = {}
 
@@ -10,12 +10,13 @@ from __future__ import absolute_import, unicode_literals
 __version__ = '$Id$'
 #
 
+import json
 import math
 import threading
 import time
 
 import pywikibot
-from pywikibot import config
+from pywikibot import config, metrics
 
 _logger = "wiki.throttle"
 
@@ -37,8 +38,15 @@ class Throttle(object):
     Each Site initiates one Throttle object (site.throttle) to control the
     rate of access.
 
+    The time slept is accounted per kind of wait in the slept attribute:
+    'read' and 'write' for the delays between requests, 'lag' for the waits
+    due to server lag and 'multiplicity' for the part of the delays which is
+    added because other processes access the same site.
+
     """
 
+    kinds = ('read', 'write', 'lag', 'multiplicity')
+
     def __init__(self, site, mindelay=None, maxdelay=None, writedelay=None,
                  multiplydelay=True):
         """Constructor."""
@@ -70,10 +78,13 @@ class Throttle(object):
         self.lastwait = 0.0
         self.delay = 0
         self.checktime = 0
+        # seconds slept and number of waits per kind of wait
+        self.slept = dict.fromkeys(self.kinds, 0.0)
+        self.waits = dict.fromkeys(self.kinds, 0)
         self.multiplydelay = multiplydelay
         if self.multiplydelay:
             self.checkMultiplicity()
-        self.setDelays()
+        self.setDelays(writedelay=self.writedelay)
 
     def checkMultiplicity(self):
         """Count running processes for site and set process_multiplicity."""
@@ -153,7 +164,7 @@ class Throttle(object):
             self.writedelay = min(max(self.mindelay, writedelay),
                                   self.maxdelay)
             # Start the delay count now, not at the next check
-            self.last_read = self.last_write = time.time()
+            self.last_read = self.last_write = self._now()
 
     def getDelay(self, write=False):
         """Return the actual delay, accounting for multiple processes.
@@ -167,7 +178,7 @@ class Throttle(object):
         else:
             thisdelay = self.delay
         if self.multiplydelay:  # We're checking for multiple processes
-            if time.time() > self.checktime + self.checkdelay:
+            if self._now() > self.checktime + self.checkdelay:
                 self.checkMultiplicity()
             if thisdelay < (self.mindelay * self.next_multiplicity):
                 thisdelay = self.mindelay * self.next_multiplicity
@@ -178,19 +189,71 @@ class Throttle(object):
 
     def waittime(self, write=False):
         """Return waiting time in seconds if a query would be made right now."""
+        return self._waittimes(write=write)[0]
+
+    def _waittimes(self, write=False):
+        """
+        Return the waiting time and the part of it due to other processes.
+
+        @rtype: tuple of float
+        """
         # Take the previous requestsize in account calculating the desired
         # delay this time
         thisdelay = self.getDelay(write=write)
-        now = time.time()
+        now = self._now()
         if write:
             ago = now - self.last_write
         else:
             ago = now - self.last_read
-        if ago < thisdelay:
-            delta = thisdelay - ago
-            return delta
-        else:
-            return 0.0
+        if ago >= thisdelay:
+            return 0.0, 0.0
+        delta = thisdelay - ago
+        if self.multiplydelay and self.process_multiplicity > 1:
+            # the waiting time if this were the only process
+            single = max(0.0, thisdelay / self.process_multiplicity - ago)
+            return delta, delta - single
+        return delta, 0.0
+
+    def _now(self):
+        """Return the current time in seconds since the epoch."""
+        return time.time()
+
+    def _account(self, kind, seconds):
+        """Add time slept to the wait statistics."""
+        if seconds <= 0:
+            return
+        self.slept[kind] += seconds
+        self.waits[kind] += 1
+        if metrics.registry:
+            metrics.increment('throttle_sleep_seconds', seconds,
+                              {'site': self.mysite, 'kind': kind})
+
+    def _record(self, kind, requested, seconds, **data):
+        """Append a throttled request to config.throttle_timeline."""
+        if not config.throttle_timeline:
+            return
+        data.update(site=self.mysite, kind=kind, time=requested,
+                    wait=max(0.0, seconds))
+        with open(config.datafilepath('logs', config.throttle_timeline),
+                  'a') as f:
+            f.write(json.dumps(data, sort_keys=True) + '\n')
+
+    def report(self):
+        """
+        Return a summary of the time slept, None if it never slept.
+
+        @rtype: unicode or None
+        """
+        total = sum(self.slept.values())
+        if not total:
+            return None
+        parts = ['{0:.1f} s {1}'.format(self.slept[kind], kind)
+                 for kind in self.kinds if self.waits[kind]]
+        text = 'Throttle on {0} slept {1:.1f} seconds: {2}'.format(
+            self.mysite, total, ', '.join(parts))
+        if self.multiplydelay and self.process_multiplicity > 1:
+            text += ' ({0} processes)'.format(self.process_multiplicity)
+        return text
 
     def drop(self):
         """Remove me from the list of running bot processes."""
@@ -258,7 +321,8 @@ class Throttle(object):
 
         """
         with self.lock:
-            wait = self.waittime(write=write)
+            requested = self._now()
+            wait, multiplicity_wait = self._waittimes(write=write)
             # Calculate the multiplicity of the next delay based on how
             # big the request is that is being posted now.
             # We want to add "one delay" for each factor of two in the
@@ -267,11 +331,15 @@ class Throttle(object):
             self.next_multiplicity = math.log(1 + requestsize) / math.log(2.0)
 
             self.wait(wait)
+            kind = 'write' if write else 'read'
+            self._account(kind, wait - multiplicity_wait)
+            self._account('multiplicity', multiplicity_wait)
+            self._record(kind, requested, wait, size=requestsize)
 
             if write:
-                self.last_write = time.time()
+                self.last_write = self._now()
             else:
-                self.last_read = time.time()
+                self.last_read = self._now()
 
     def lag(self, lagtime):
         """Seize the throttle lock due to server lag.
@@ -279,12 +347,106 @@ class Throttle(object):
         This will prevent any thread from accessing this site.
 
         """
-        started = time.time()
+        started = self._now()
         with self.lock:
             # start at 1/2 the current server lag time
             # wait at least 5 seconds but not more than 120 seconds
             delay = min(max(5, lagtime // 2), 120)
             # account for any time we waited while acquiring the lock
-            wait = delay - (time.time() - started)
+            wait = delay - (self._now() - started)
 
             self.wait(wait)
+            self._account('lag', wait)
+            self._record('lag', started, wait, lag=lagtime)
+
+
+class SimulatedThrottle(Throttle):
+
+    """
+    Throttle with a simulated clock which does not sleep.
+
+    It is used to replay a recorded request timeline with other throttle
+    settings, see L{replay}.
+    """
+
+    def __init__(self, site, processes=1, **kwargs):
+        """
+        Constructor.
+
+        @param site: the site, only used in the report
+        @param processes: the number of processes accessing the site
+        @type processes: int
+        @kwarg mindelay, maxdelay, writedelay, multiplydelay: the settings
+            of L{Throttle}
+        """
+        self.clock = 0.0
+        self.processes = processes
+        super(SimulatedThrottle, self).__init__(site, **kwargs)
+
+    def checkMultiplicity(self):
+        """Use the simulated number of processes."""
+        self.checktime = self.clock
+        self.process_multiplicity = self.processes
+
+    def _now(self):
+        """Return the simulated time."""
+        return self.clock
+
+    def _record(self, kind, requested, seconds, **data):
+        """Do not record the simulated requests."""
+        pass
+
+    def wait(self, seconds):
+        """Advance the simulated time instead of sleeping."""
+        if seconds > 0:
+            self.clock += seconds
+
+
+def load_timeline(filename, site=None):
+    """
+    Load a request timeline recorded with config.throttle_timeline.
+
+    @param filename: the file name, relative to the logs directory
+    @type filename: str
+    @param site: only load the requests to this site, e.g. 'wikipedia:en'
+    @type site: str
+    @return: the recorded requests ordered by time
+    @rtype: list of dict
+    """
+    with open(config.datafilepath('logs', filename)) as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    if site is not None:
+        events = [event for event in events if event['site'] == site]
+    return sorted(events, key=lambda event: event['time'])
+
+
+def replay(events, site='simulation', **kwargs):
+    """
+    Replay a recorded request timeline against other throttle settings.
+
+    The time between the end of a throttle wait and the next request, e.g.
+    the network and processing time of the bot, is kept and the throttle
+    waits are computed with the given settings.
+
+    @param events: recorded requests of one site, see L{load_timeline}
+    @type events: list of dict
+    @param site: the site shown in the report
+    @kwarg processes: the number of processes accessing the site
+    @kwarg mindelay, maxdelay, writedelay, multiplydelay: the settings
+        of L{Throttle}
+    @return: the throttle after the replay. Its clock is the simulated
+        duration and its slept attribute has the simulated waits.
+    @rtype: L{SimulatedThrottle}
+    """
+    throttle = SimulatedThrottle(site, **kwargs)
+    previous_end = None
+    for event in events:
+        if previous_end is not None:
+            throttle.clock += max(0.0, event['time'] - previous_end)
+        if event['kind'] == 'lag':
+            throttle.lag(event['lag'])
+        else:
+            throttle(requestsize=event.get('size', 1),
+                     write=event['kind'] == 'write')
+        previous_end = event['time'] + event['wait']
+    return throttle
@@ -8,6 +8,7 @@
 from __future__ import absolute_import, unicode_literals
 __version__ = '$Id$'
 
+import array
 import collections
 import gzip
 import hashlib
@@ -757,21 +758,124 @@ class ThreadList(list):
                   % (thd, thd.queue.qsize()), self._logger)
 
 
-def intersect_generators(genlist):
+class _ThreadedCall(threading.Thread):
+
+    """Call a function in a thread and keep its result or exception."""
+
+    def __init__(self, func, item):
+        """Constructor."""
+        super(_ThreadedCall, self).__init__(name='ThreadedCall')
+        self.daemon = True
+        self.func = func
+        self.item = item
+        self.exception = None
+
+    def run(self):
+        """Call the function."""
+        try:
+            self.value = self.func(self.item)
+        except BaseException as e:
+            self.exception = e
+
+    def result(self):
+        """Wait for the call and return its result or raise its exception."""
+        self.join()
+        if self.exception is not None:
+            raise self.exception
+        return self.value
+
+
+def concurrent_map(func, iterable, workers):
+    """
+    Yield the result of func for each item, calling it in parallel threads.
+
+    The results are yielded in the order of the items. Up to workers calls
+    run at the same time, and they start before their results are needed,
+    so that at most that many results wait to be yielded. The iterable is
+    consumed lazily. An exception raised by func is raised again when its
+    result would be yielded.
+
+    >>> list(concurrent_map(lambda x: x * 2, range(5), 3))
+    [0, 2, 4, 6, 8]
+
+    @param func: the function to call with each item
+    @type func: callable
+    @param iterable: the items
+    @type iterable: iterable
+    @param workers: the number of parallel calls; 1 calls func in the
+        calling thread
+    @type workers: int
+    """
+    if workers <= 1:
+        for item in iterable:
+            yield func(item)
+        return
+    pending = collections.deque()
+    for item in iterable:
+        if len(pending) == workers:
+            yield pending.popleft().result()
+        call = _ThreadedCall(func, item)
+        call.start()
+        pending.append(call)
+    while pending:
+        yield pending.popleft().result()
+
+
+def _put_until_stopped(queue, entry, stopped):
+    """
+    Put an entry on a queue unless stopped before; return whether put.
+
+    It blocks while the queue is full, so the reader must empty the queue
+    after it stopped the writers.
+    """
+    if stopped.is_set():
+        return False
+    queue.put(entry)
+    return True
+
+
+def _feed_queue(index, source, queue, stopped):
+    """
+    Put the items of a source on a queue until stopped.
+
+    The entries are (index, True, item) for each item and finally
+    (index, False, exception) with None if the source was exhausted.
+    """
+    error = None
+    try:
+        for item in source:
+            if not _put_until_stopped(queue, (index, True, item), stopped):
+                return
+    except Exception as e:
+        error = e
+    _put_until_stopped(queue, (index, False, error), stopped)
+
+
+def intersect_generators(genlist, compact=False, qsize=65536):
     """
     Intersect generators listed in genlist.
 
     Yield items only if they are yielded by all generators in genlist.
-    Threads (via ThreadedGenerator) are used in order to run generators
-    in parallel, so that items can be yielded before generators are
-    exhausted.
+    Threads are used in order to run generators in parallel, so that items
+    can be yielded before generators are exhausted. They put their items on
+    a shared queue.
 
-    Threads are stopped when they are either exhausted or Ctrl-C is pressed.
-    Quitting before all generators are finished is attempted if
-    there is no more chance of finding an item in all queues.
+    Threads are stopped when the intersection is finished or left, or when
+    Ctrl-C is pressed, which ends the intersection.
+    Quitting before all generators are finished is done as soon as there is
+    no more chance of finding an item in all generators: once a generator
+    is exhausted, only items already yielded by it are kept.
 
     @param genlist: list of page generators
     @type genlist: list
+    @param compact: if True, keep the hashes of the items instead of the
+        items while they are not yielded by all generators, see
+        L{CompactSet}. Only the hashes of yielded items are kept anyway.
+    @type compact: bool
+    @param qsize: the maximum number of items waiting on the queue; it is
+        at least the number of generators
+    @type qsize: int
+    @raises Exception: an exception raised by a generator
     """
     # If any generator is empty, no pages are going to be returned
     for source in genlist:
@@ -780,56 +884,147 @@ def intersect_generators(genlist):
                   'skipped immediately.'.format(source), 'intersect')
             return
 
-    # Item is cached to check that it is found n_gen
-    # times before being yielded.
-    cache = collections.defaultdict(set)
-    n_gen = len(genlist)
+    # Each pending item has a bit mask of the generators which yielded it.
+    # Duplicates from the same generator are not counted twice.
+    pending = {}
+    key = CompactSet.item_hash if compact else None
+    yielded = CompactSet()
+    complete = (1 << len(genlist)) - 1
+    exhausted = 0
+
+    # Each thread puts at most one item after it was stopped, so all of
+    # them fit on the queue once it was emptied.
+    queue = Queue.Queue(max(qsize, len(genlist)))
+    stopped = threading.Event()
+    for index, source in enumerate(genlist):
+        thread = threading.Thread(target=_feed_queue, name=repr(source),
+                                  args=(index, source, queue, stopped))
+        thread.daemon = True
+        thread.start()
 
-    # Class to keep track of alive threads.
-    # Start new threads and remove completed threads.
-    thrlist = ThreadList()
+    try:
+        while True:
+            if PY2:
+                # Python 2 handles KeyboardInterrupt only with a timeout
+                try:
+                    index, is_item, item = queue.get(True, 0.25)
+                except Queue.Empty:
+                    continue
+            else:
+                index, is_item, item = queue.get()
+            if not is_item:
+                if item is not None:
+                    raise item
+                exhausted |= 1 << index
+                # Items not yielded by an exhausted generator are dropped.
+                pending = dict((k, mask) for k, mask in pending.items()
+                               if mask & exhausted == exhausted)
+            elif item not in yielded:
+                k = key(item) if key else item
+                mask = pending.pop(k, 0) | 1 << index
+                if mask == complete:
+                    yielded.add(item)
+                    yield item
+                elif mask & exhausted == exhausted:
+                    pending[k] = mask
+            if exhausted and not pending:
+                return
+    except KeyboardInterrupt:
+        debug('Intersection interrupted by the user', 'intersect')
+    finally:
+        stopped.set()
+        # wake up the threads waiting to put an item, so that they stop
+        try:
+            while True:
+                queue.get_nowait()
+        except Queue.Empty:
+            pass
 
-    for source in genlist:
-        threaded_gen = ThreadedGenerator(name=repr(source), target=source)
-        threaded_gen.daemon = True
-        thrlist.append(threaded_gen)
 
-    while True:
-        # Get items from queues in a round-robin way.
-        for t in thrlist:
-            try:
-                # TODO: evaluate if True and timeout is necessary.
-                item = t.queue.get(True, 0.1)
+if PY2:
+    _HASH_TYPECODE = 'L'
+else:
+    _HASH_TYPECODE = 'Q'
 
-                # Cache entry is a set of thread.
-                # Duplicates from same thread are not counted twice.
-                cache[item].add(t)
-                if len(cache[item]) == n_gen:
-                    yield item
-                    # Remove item from cache.
-                    # No chance of seeing it again (see later: early stop).
-                    cache.pop(item)
-
-                active = thrlist.active_count()
-                max_cache = n_gen
-                if cache.values():
-                    max_cache = max(len(v) for v in cache.values())
-                # No. of active threads is not enough to reach n_gen.
-                # We can quit even if some thread is still active.
-                # There could be an item in all generators which has not yet
-                # appeared from any generator. Only when we have lost one
-                # generator, then we can bail out early based on seen items.
-                if active < n_gen and n_gen - max_cache > active:
-                    thrlist.stop_all()
-                    return
-            except Queue.Empty:
-                pass
-            except KeyboardInterrupt:
-                thrlist.stop_all()
-            finally:
-                # All threads are done.
-                if thrlist.active_count() == 0:
-                    return
+
+class CompactSet(object):
+
+    """
+    Set of the hashes of items, stored in an array.
+
+    It keeps no reference to the items and needs 16 to 32 bytes per item
+    on 64-bit platforms, so it may be used as the container of
+    L{filter_unique} for many items, e.g. millions of pages. Different
+    items with the same hash are considered equal, which is unlikely for
+    the 64-bit hashes of strings, but e.g. hash(-1) == hash(-2).
+
+    >>> seen = CompactSet(['Foo', 'Bar'])
+    >>> 'Foo' in seen, 'Baz' in seen
+    (True, False)
+    >>> len(seen)
+    2
+    """
+
+    _bits = array.array(_HASH_TYPECODE).itemsize * 8
+    _mask = (1 << _bits) - 1
+
+    def __init__(self, iterable=()):
+        """
+        Constructor.
+
+        @param iterable: the initial items
+        @type iterable: iterable
+        """
+        # open addressing with linear probing; 0 marks an empty slot
+        self._slots = array.array(_HASH_TYPECODE, [0]) * 16
+        self._size_bits = 4
+        self._len = 0
+        for item in iterable:
+            self.add(item)
+
+    @classmethod
+    def item_hash(cls, item):
+        """Return the hash of an item as it is stored, which is not 0."""
+        # Python never returns the hash -1, which is stored as the mask
+        return hash(item) & cls._mask or cls._mask
+
+    def _index(self, value):
+        """Return the index of the slot of a hash or of the free slot."""
+        slots = self._slots
+        index_mask = len(slots) - 1
+        # Fibonacci hashing spreads hashes which differ in high bits only
+        i = (value * 0x9E3779B97F4A7C15 & self._mask) >> (
+            self._bits - self._size_bits)
+        while slots[i] and slots[i] != value:
+            i = (i + 1) & index_mask
+        return i
+
+    def _grow(self):
+        """Double the number of slots."""
+        values = [value for value in self._slots if value]
+        self._size_bits += 1
+        self._slots = array.array(_HASH_TYPECODE, [0]) * (
+            1 << self._size_bits)
+        for value in values:
+            self._slots[self._index(value)] = value
+
+    def __contains__(self, item):
+        """Return whether the hash of an item is in the set."""
+        return bool(self._slots[self._index(self.item_hash(item))])
+
+    def __len__(self):
+        """Return the number of hashes in the set."""
+        return self._len
+
+    def add(self, item):
+        """Add the hash of an item."""
+        value = self.item_hash(item)
+        i = self._index(value)
+        if not self._slots[i]:
+            self._slots[i] = value
+            self._len += 1
+            if self._len * 2 > len(self._slots):
+                self._grow()
 
 
 def filter_unique(iterable, container=None, key=None, add=None):
@@ -848,7 +1043,8 @@ def filter_unique(iterable, container=None, key=None, add=None):
 
     To avoid these issues, it is advisable for the caller to provide their own
     container and set the key parameter to be the function L{hash}, or use a
-    L{weakref} as the key.
+    L{weakref} as the key. A L{CompactSet} keeps only the hashes of the
+    items in an array and needs no key.
 
     The container can be any object that supports __contains__.
     If the container is a set or dict, the method add or __setitem__ will be
@@ -1763,3 +1959,110 @@ def compute_file_hash(filename, sha='sha1', bytes_to_read=None):
             bytes_to_read -= len(read_bytes)
             sha.update(read_bytes)
     return sha.hexdigest()
+
+
+class ChunkReader(object):
+
+    """
+    Read chunks of a file, the next chunk ahead in a background thread.
+
+    While a chunk is processed, e.g. sent to a server, the following chunk
+    is already read from the disk. The hash of the file can be computed
+    from the chunks while they are read, so the file is read only once.
+    """
+
+    def __init__(self, filename, chunk_size, sha=None):
+        """
+        Constructor.
+
+        @param filename: filename path
+        @type filename: basestring
+        @param chunk_size: the size of the chunks in bytes
+        @type chunk_size: int
+        @param sha: hashing function name in hashlib to compute the hash
+            of the file from the chunks, e.g. 'sha1'
+        @type sha: str or None
+        """
+        self.chunk_size = chunk_size
+        self.size = os.path.getsize(filename)
+        self._file = open(filename, 'rb')
+        self._thread = None
+        self._ahead = None  # offset and chunk read ahead
+        self._sha = getattr(hashlib, sha)() if sha else None
+        self._hashed = 0  # number of bytes hashed
+
+    def _read(self, offset):
+        """Read the chunk at offset."""
+        self._file.seek(offset)
+        return self._file.read(self.chunk_size)
+
+    def _read_ahead(self, offset):
+        """Read the chunk at offset and keep it."""
+        self._ahead = offset, self._read(offset)
+
+    def _update_hash(self, offset, chunk):
+        """Add the bytes of the chunk to the hash which are not hashed."""
+        while self._hashed < offset:
+            # a chunk was skipped, e.g. when continuing an upload
+            self._file.seek(self._hashed)
+            data = self._file.read(min(offset - self._hashed,
+                                       self.chunk_size))
+            if not data:
+                return
+            self._sha.update(data)
+            self._hashed += len(data)
+        end = offset + len(chunk)
+        if end > self._hashed:
+            self._sha.update(chunk[self._hashed - offset:])
+            self._hashed = end
+
+    def read(self, offset):
+        """
+        Return the chunk at offset and start reading the following one.
+
+        @param offset: the offset of the chunk in bytes
+        @type offset: int
+        @rtype: bytes
+        """
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if self._ahead and self._ahead[0] == offset:
+            chunk = self._ahead[1]
+        else:
+            chunk = self._read(offset)
+        self._ahead = None
+        if self._sha:
+            self._update_hash(offset, chunk)
+        if offset + len(chunk) < self.size:
+            self._thread = threading.Thread(target=self._read_ahead,
+                                            args=(offset + len(chunk), ))
+            self._thread.start()
+        return chunk
+
+    def hexdigest(self):
+        """
+        Return the hash of the file when all chunks have been read.
+
+        @return: the hexdigest or None if the file was not read completely
+            or no hashing function was given
+        @rtype: str or None
+        """
+        if self._sha and self._hashed == self.size:
+            return self._sha.hexdigest()
+        return None
+
+    def close(self):
+        """Close the file."""
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self._file.close()
+
+    def __enter__(self):
+        """Enter a with statement."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the file when leaving a with statement."""
+        self.close()
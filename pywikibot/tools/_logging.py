@@ -10,6 +10,7 @@ from __future__ import absolute_import, unicode_literals
 __version__ = '$Id$'
 
 import logging
+import logging.handlers
 import os
 
 from pywikibot.tools import PY2
@@ -121,3 +122,22 @@ class LoggingFormatter(logging.Formatter):
             return strExc.decode(self._encoding) + '\n'
         else:
             return strExc + '\n'
+
+
+if hasattr(logging.handlers, 'QueueHandler'):
+    class QueueHandler(logging.handlers.QueueHandler):
+
+        """
+        Put records into a queue to be written by a listener thread.
+
+        Unlike the base class the records are not formatted when queued,
+        they are formatted by the handlers of the listener, e.g. a
+        RotatingFileHandler with a LoggingFormatter.
+        """
+
+        def prepare(self, record):
+            """Return the record unchanged."""
+            return record
+else:
+    # Python 2 does not provide QueueHandler and QueueListener
+    QueueHandler = None
@@ -81,6 +81,8 @@ Options (may be omitted):
   -calc:PAGE      calculate key for PAGE and exit
   -file:FILE      load list of pages from FILE
   -force          override security options
+  -full           process all pages, also those which did not change since
+                  the last run
   -locale:LOCALE  switch to locale LOCALE
   -namespace:NS   only archive pages from a given namespace
   -page:PAGE      archive a single PAGE, default ns is a user talk page
@@ -100,6 +102,7 @@ import locale
 import math
 import os
 import re
+import sqlite3
 import time
 
 from hashlib import md5
@@ -357,8 +360,11 @@ class DiscussionThread(object):
         self.now = now
         self.ts = timestripper
         self.code = self.ts.site.code
-        self.content = ""
-        self.timestamp = None
+        self._lines = []
+        self._content = None
+        self._timestamp = None
+        # the newest timestamp is searched on first access
+        self._parsed = True
 
     def __repr__(self):
         """Return a string representation."""
@@ -366,19 +372,42 @@ class DiscussionThread(object):
                % (self.__class__.__name__, self.title,
                   len(self.content.encode('utf-8')))
 
+    @property
+    def content(self):
+        """Return the content of the thread."""
+        if self._content is None:
+            self._content = ''.join(line + '\n' for line in self._lines)
+        return self._content
+
+    @property
+    def timestamp(self):
+        """Return the newest timestamp of the thread."""
+        if not self._parsed:
+            timestamps = [timestamp for timestamp in
+                          map(self.ts.timestripper, self._lines)
+                          if timestamp]
+            self._timestamp = max(timestamps) if timestamps else None
+            self._parsed = True
+        return self._timestamp
+
+    @timestamp.setter
+    def timestamp(self, value):
+        """Set the newest timestamp of the thread."""
+        self._timestamp = value
+        self._parsed = True
+
     def feed_line(self, line):
-        """Add a line to the content and find the newest timestamp."""
-        if not self.content and not line:
+        """Add a line to the content."""
+        if not self._lines and not line:
             return
 
-        self.content += line + '\n'
-        timestamp = self.ts.timestripper(line)
-
-        if not self.timestamp:  # first time
-            self.timestamp = timestamp
+        self._lines.append(line)
+        self._content = None
+        self._parsed = False
 
-        if timestamp:
-            self.timestamp = max(self.timestamp, timestamp)
+    def digest(self):
+        """Return a digest of title and content to recognize the thread."""
+        return md5(self.to_text().encode('utf-8')).hexdigest()
 
     def size(self):
         """Return size of discussion thread."""
@@ -509,6 +538,105 @@ class DiscussionPage(pywikibot.Page):
         self.save(summary)
 
 
+class ArchiveState(object):
+
+    """
+    State of the pages processed by previous runs.
+
+    For each page and archiving template the revision id processed last,
+    the time when threads can be archived next and the newest timestamp
+    of each thread is stored in a sqlite database. A page which did not
+    change since then is only loaded again when threads can be archived,
+    and only changed threads are searched for timestamps.
+    """
+
+    EPOCH = datetime.datetime(1970, 1, 1, tzinfo=TZoneUTC())
+
+    def __init__(self, site):
+        """Constructor."""
+        self.db = sqlite3.connect(pywikibot.config.datafilepath(
+            'archivebot', 'state-%s-%s.sqlite3' % (site.family.name,
+                                                   site.code)), timeout=60)
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS pages '
+                            '(template TEXT, title TEXT, revid INTEGER, '
+                            'due REAL, PRIMARY KEY (template, title))')
+            self.db.execute('CREATE TABLE IF NOT EXISTS threads '
+                            '(template TEXT, title TEXT, digest TEXT, '
+                            'timestamp REAL)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS threads_page '
+                            'ON threads (template, title)')
+
+    def _seconds(self, timestamp):
+        """Return the seconds since the epoch of a datetime."""
+        return (timestamp - self.EPOCH).total_seconds()
+
+    def unchanged(self, page, template, now):
+        """
+        Return whether the page can be skipped.
+
+        @param page: the page to be archived
+        @type page: pywikibot.Page
+        @param template: the title of the archiving template
+        @type template: unicode
+        @param now: the current time
+        @type now: datetime.datetime
+        @return: whether the page did not change since the last run and no
+            threads can be archived yet
+        @rtype: bool
+        """
+        row = self.db.execute(
+            'SELECT revid, due FROM pages WHERE template = ? AND title = ?',
+            (template, page.title())).fetchone()
+        if row is None or row[0] != page.latest_revision_id:
+            return False
+        return row[1] is None or row[1] > self._seconds(now)
+
+    def timestamps(self, page, template, tzinfo):
+        """
+        Return the newest timestamps of the threads found by the last run.
+
+        @return: thread digest mapped to its newest timestamp
+        @rtype: dict
+        """
+        return dict(
+            (digest, None if seconds is None else
+             pywikibot.Timestamp.fromtimestamp(seconds, tzinfo))
+            for digest, seconds in self.db.execute(
+                'SELECT digest, timestamp FROM threads '
+                'WHERE template = ? AND title = ?',
+                (template, page.title())))
+
+    def update(self, page, template, threads, due):
+        """
+        Store the state of the page after it was processed.
+
+        @param threads: the threads on the page
+        @type threads: list of DiscussionThread
+        @param due: the time when threads can be archived or None
+        @type due: datetime.datetime
+        """
+        title = page.title()
+        with self.db:
+            self.db.execute(
+                'INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)',
+                (template, title, page.latest_revision_id,
+                 None if due is None else self._seconds(due)))
+            self.db.execute(
+                'DELETE FROM threads WHERE template = ? AND title = ?',
+                (template, title))
+            self.db.executemany(
+                'INSERT INTO threads VALUES (?, ?, ?, ?)',
+                ((template, title, thread.digest(),
+                  None if thread.timestamp is None
+                  else self._seconds(thread.timestamp))
+                 for thread in threads))
+
+    def close(self):
+        """Close the database."""
+        self.db.close()
+
+
 class PageArchiver(object):
 
     """
@@ -520,8 +648,13 @@ class PageArchiver(object):
 
     algo = 'none'
 
-    def __init__(self, page, tpl, salt, force=False):
-        """Constructor."""
+    def __init__(self, page, tpl, salt, force=False, state=None):
+        """
+        Constructor.
+
+        @param state: the state of previous runs to be used and updated
+        @type state: ArchiveState
+        """
         self.attributes = {
             'algo': ['old(24h)', False],
             'archive': ['', False],
@@ -534,7 +667,16 @@ class PageArchiver(object):
         self.site = page.site
         self.tpl = pywikibot.Page(self.site, tpl)
         self.timestripper = TimeStripper(site=self.site)
+        self.state = state
         self.page = DiscussionPage(page, self)
+        if self.state:
+            # Only threads which changed since the last run are parsed
+            timestamps = self.state.timestamps(self.page, self.tpl.title(),
+                                               self.timestripper.tzinfo)
+            for thread in self.page.threads:
+                digest = thread.digest()
+                if digest in timestamps:
+                    thread.timestamp = timestamps[digest]
         self.load_config()
         self.comment_params = {
             'from': self.page.title(),
@@ -650,10 +792,40 @@ class PageArchiver(object):
                 self.page.threads.append(t)
         return set(whys)
 
+    def next_due(self, threads):
+        """
+        Return the time when threads can be archived next.
+
+        @param threads: the threads on the page
+        @type threads: list of DiscussionThread
+        @return: the time or None if threads can't be archived before the
+            page is changed
+        @rtype: datetime.datetime or None
+        """
+        re_t = re.search(r'^old\((.*)\)$', self.get_attr('algo'))
+        if not re_t:
+            return None
+        mintoarchive = max(int(self.get_attr('minthreadstoarchive', 2)), 1)
+        archivable = len(threads) - int(self.get_attr('minthreadsleft', 5))
+        if archivable < mintoarchive:
+            return None
+        due = sorted(t.timestamp + str2time(re_t.group(1), t.timestamp)
+                     for t in threads if t.timestamp)
+        if len(due) < mintoarchive:
+            return None
+        return due[mintoarchive - 1]
+
+    def update_state(self, threads):
+        """Store the state of the page in self.state if available."""
+        if self.state:
+            self.state.update(self.page, self.tpl.title(), threads,
+                              self.next_due(threads))
+
     def run(self):
         """Run the bot."""
         if not self.page.botMayEdit():
             return
+        threads = self.page.threads
         whys = self.analyze_page()
         mintoarchive = int(self.get_attr('minthreadstoarchive', 2))
         if self.archived_threads < mintoarchive:
@@ -661,6 +833,7 @@ class PageArchiver(object):
             # (lowers edit frequency)
             pywikibot.output(u'Only %d (< %d) threads are old enough. Skipping'
                              % (self.archived_threads, mintoarchive))
+            self.update_state(threads)
             return
         if whys:
             # Search for the marker template
@@ -692,6 +865,7 @@ class PageArchiver(object):
                                        'archivebot-page-summary',
                                        self.comment_params)
             self.page.update(comment)
+            self.update_state(self.page.threads)
 
 
 def main(*args):
@@ -708,6 +882,7 @@ def main(*args):
     namespace = None
     salt = ''
     force = False
+    full = False
     calc = None
     args = []
 
@@ -732,6 +907,8 @@ def main(*args):
             salt = v
         for v in if_arg_value(arg, '-force'):
             force = True
+        for v in if_arg_value(arg, '-full'):
+            full = True
         for v in if_arg_value(arg, '-filename'):
             filename = v
         for v in if_arg_value(arg, '-page'):
@@ -759,6 +936,8 @@ def main(*args):
         pywikibot.bot.suggest_help(additional_text='No template was specified.')
         return False
 
+    state = None if full else ArchiveState(site)
+
     for a in args:
         pagelist = []
         a = pywikibot.Page(site, a, ns=10).title()
@@ -775,12 +954,17 @@ def main(*args):
         if pagename:
             pagelist.append(pywikibot.Page(site, pagename, ns=3))
         pagelist = sorted(pagelist)
+        now = datetime.datetime.utcnow().replace(tzinfo=TZoneUTC())
         for pg in iter(pagelist):
-            pywikibot.output(u'Processing %s' % pg)
             # Catching exceptions, so that errors in one page do not bail out
             # the entire process
             try:
-                archiver = PageArchiver(pg, a, salt, force)
+                if state and state.unchanged(pg, a, now):
+                    pywikibot.output('Skipping %s: unchanged since last run'
+                                     % pg)
+                    continue
+                pywikibot.output(u'Processing %s' % pg)
+                archiver = PageArchiver(pg, a, salt, force, state)
                 archiver.run()
             except ArchiveBotSiteConfigError as e:
                 # no stack trace for errors originated by pages on-site
@@ -790,6 +974,9 @@ def main(*args):
                 pywikibot.error(u'Error occurred while processing page %s' % pg)
                 pywikibot.exception(tb=True)
 
+    if state:
+        state.close()
+
 
 if __name__ == '__main__':
     main()
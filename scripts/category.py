@@ -85,9 +85,9 @@ Options for several actions:
                   listed.
 
 For the actions tidy and tree, the bot will store the category structure
-locally in category.dump. This saves time and server load, but if it uses
-these data later, they may be outdated; use the -rebuild parameter in this
-case.
+locally in the categories subdirectory. This saves time and server load.
+The stored categories are updated with the recent changes of the wiki when
+the bot starts; use the -rebuild parameter to load all of them again.
 
 For example, to create a new category from a list of persons, type:
 
@@ -118,7 +118,6 @@ from __future__ import absolute_import, unicode_literals
 
 import codecs
 import os
-import pickle
 import re
 import sys
 
@@ -129,8 +128,9 @@ from pywikibot import i18n, textlib
 from pywikibot.bot import (
     MultipleSitesBot, IntegerOption, StandardOption, ContextOption,
 )
+from pywikibot.data.categorygraph import CategoryGraph
 from pywikibot.tools import (
-    deprecated_args, deprecated, ModuleDeprecationWrapper, open_archive
+    deprecated_args, deprecated, ModuleDeprecationWrapper,
 )
 from pywikibot.tools.formatter import color_format
 
@@ -164,126 +164,55 @@ cfd_templates = {
 
 class CategoryDatabase(object):
 
-    """Temporary database saving pages and subcategories for each category.
+    """Database saving pages and subcategories for each category.
 
-    This prevents loading the category pages over and over again.
+    This prevents loading the category pages over and over again. The
+    categories of each site are kept in a L{CategoryGraph}, which is updated
+    with the changes on the wiki when it is first used in a run.
     """
 
-    def __init__(self, rebuild=False, filename='category.dump.bz2'):
+    @deprecated_args(filename=None)
+    def __init__(self, rebuild=False):
         """Constructor."""
-        if not os.path.isabs(filename):
-            filename = config.datafilepath(filename)
-        self.filename = filename
-        if rebuild:
-            self.rebuild()
+        self.graphs = {}
+        self._rebuild = rebuild
 
-    @property
-    def is_loaded(self):
-        """Return whether the contents have been loaded."""
-        return hasattr(self, 'catContentDB') and hasattr(self, 'superclassDB')
+    def graph(self, site):
+        """Return the updated category graph of a site.
 
-    def _load(self):
-        if not self.is_loaded:
-            try:
-                pywikibot.output(u'Reading dump from %s'
-                                 % config.shortpath(self.filename))
-                with open_archive(self.filename, 'rb') as f:
-                    databases = pickle.load(f)
-                # keys are categories, values are 2-tuples with lists as
-                # entries.
-                self.catContentDB = databases['catContentDB']
-                # like the above, but for supercategories
-                self.superclassDB = databases['superclassDB']
-                del databases
-            except:
-                # If something goes wrong, just rebuild the database
-                self.rebuild()
+        @rtype: L{CategoryGraph}
+        """
+        if site not in self.graphs:
+            graph = self.graphs[site] = CategoryGraph(site)
+            if self._rebuild:
+                graph.clear()
+            graph.update()
+        return self.graphs[site]
 
     def rebuild(self):
         """Rebuild the dabatase."""
-        self.catContentDB = {}
-        self.superclassDB = {}
+        self._rebuild = True
+        for graph in self.graphs.values():
+            graph.clear()
+            graph.update()
 
     def getSubcats(self, supercat):
-        """Return the list of subcategories for a given supercategory.
-
-        Saves this list in a temporary database so that it won't be loaded from
-        the server next time it's required.
-        """
-        self._load()
-        # if we already know which subcategories exist here
-        if supercat in self.catContentDB:
-            return self.catContentDB[supercat][0]
-        else:
-            subcatset = set(supercat.subcategories())
-            articleset = set(supercat.articles())
-            # add to dictionary
-            self.catContentDB[supercat] = (subcatset, articleset)
-            return subcatset
+        """Return the set of subcategories for a given supercategory."""
+        return set(self.graph(supercat.site).subcategories(supercat))
 
     def getArticles(self, cat):
-        """Return the list of pages for a given category.
-
-        Saves this list in a temporary database so that it won't be loaded from
-        the server next time it's required.
-        """
-        self._load()
-        # if we already know which articles exist here
-        if cat in self.catContentDB:
-            return self.catContentDB[cat][1]
-        else:
-            subcatset = set(cat.subcategories())
-            articleset = set(cat.articles())
-            # add to dictionary
-            self.catContentDB[cat] = (subcatset, articleset)
-            return articleset
+        """Return the set of pages for a given category."""
+        return set(self.graph(cat.site).articles(cat))
 
     def getSupercats(self, subcat):
         """Return the supercategory (or a set of) for a given subcategory."""
-        self._load()
-        # if we already know which subcategories exist here
-        if subcat in self.superclassDB:
-            return self.superclassDB[subcat]
-        else:
-            supercatset = set(subcat.categories())
-            # add to dictionary
-            self.superclassDB[subcat] = supercatset
-            return supercatset
-
-    def dump(self, filename=None):
-        """Save the dictionaries to disk if not empty.
+        return set(self.graph(subcat.site).supercategories(subcat))
 
-        Pickle the contents of the dictionaries superclassDB and catContentDB
-        if at least one is not empty. If both are empty, removes the file from
-        the disk.
-
-        If the filename is None, it'll use the filename determined in __init__.
-        """
-        if filename is None:
-            filename = self.filename
-        elif not os.path.isabs(filename):
-            filename = config.datafilepath(filename)
-        if self.is_loaded and (self.catContentDB or self.superclassDB):
-            pywikibot.output(u'Dumping to %s, please wait...'
-                             % config.shortpath(filename))
-            databases = {
-                'catContentDB': self.catContentDB,
-                'superclassDB': self.superclassDB
-            }
-            # store dump to disk in binary format
-            with open_archive(filename, 'wb') as f:
-                try:
-                    pickle.dump(databases, f, protocol=config.pickle_protocol)
-                except pickle.PicklingError:
-                    pass
-        else:
-            try:
-                os.remove(filename)
-            except EnvironmentError:
-                pass
-            else:
-                pywikibot.output(u'Database is empty. %s removed'
-                                 % config.shortpath(filename))
+    def dump(self):
+        """Close the graphs, which are stored already."""
+        for graph in self.graphs.values():
+            graph.close()
+        self.graphs = {}
 
 
 class CategoryAddBot(MultipleSitesBot):
@@ -1030,11 +959,12 @@ class CategoryTreeRobot(object):
             * parent - the Category of the category we're coming from
 
         """
+        graph = self.catDB.graph(cat.site)
         result = u'#' * currentDepth
         if currentDepth > 0:
             result += u' '
         result += cat.title(asLink=True, textlink=True, withNamespace=False)
-        result += ' (%d)' % cat.categoryinfo['pages']
+        result += ' (%d)' % graph.categoryinfo(cat)['pages']
         if currentDepth < self.maxDepth // 2:
             # noisy dots
             pywikibot.output('.', newline=False)
@@ -1042,7 +972,7 @@ class CategoryTreeRobot(object):
         supercat_names = [super_cat.title(asLink=True,
                                           textlink=True,
                                           withNamespace=False)
-                          for super_cat in self.catDB.getSupercats(cat)
+                          for super_cat in graph.supercategories(cat)
                           if super_cat != parent]
 
         if supercat_names:
@@ -1055,10 +985,10 @@ class CategoryTreeRobot(object):
         del supercat_names
         result += '\n'
         if currentDepth < self.maxDepth:
-            for subcat in self.catDB.getSubcats(cat):
+            for subcat in graph.subcategories(cat):
                 # recurse into subdirectories
                 result += self.treeview(subcat, currentDepth + 1, parent=cat)
-        elif self.catDB.getSubcats(cat):
+        elif graph.categoryinfo(cat)['subcats']:
             # show that there are more categories beyond the depth limit
             result += '#' * (currentDepth + 1) + ' [...]\n'
         return result
@@ -1075,6 +1005,11 @@ class CategoryTreeRobot(object):
 
         """
         cat = pywikibot.Category(self.site, self.catTitle)
+        pywikibot.output('Loading categories...')
+        # load the whole tree level by level with batched requests
+        graph = self.catDB.graph(self.site)
+        for _ in graph.walk(cat, self.maxDepth, parents=True):
+            pass
         pywikibot.output('Generating tree...', newline=False)
         tree = self.treeview(cat)
         pywikibot.output(u'')
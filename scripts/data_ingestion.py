@@ -6,6 +6,14 @@ A generic bot to do data ingestion (batch uploading).
 usage:
 
     python pwb.py data_ingestion -csvdir:local_dir/ -page:config_page
+
+The following parameters are supported:
+
+-csvdir:        The directory of the CSV files
+
+-sha1index      Check for duplicates in a local index of the files on the
+                target site instead of asking the wiki for each file. The
+                index is built on the first run and updated on later runs.
 """
 #
 # (C) Pywikibot team, 2013-2017
@@ -19,7 +27,9 @@ import codecs
 import hashlib
 import io
 import os
+import shutil
 import sys
+import tempfile
 
 import posixpath
 
@@ -35,6 +45,7 @@ import pywikibot
 from pywikibot import pagegenerators
 
 from pywikibot.comms.http import fetch
+from pywikibot.data.fileindex import FileHashIndex
 from pywikibot.specialbots import UploadRobot
 from pywikibot.tools import deprecated, deprecated_args
 
@@ -151,7 +162,7 @@ class DataIngestionBot(pywikibot.Bot):
     """Data ingestion bot."""
 
     def __init__(self, reader, titlefmt, pagefmt,
-                 site='deprecated_default_commons'):
+                 site='deprecated_default_commons', sha1_index=None):
         """
         Constructor.
 
@@ -166,6 +177,9 @@ class DataIngestionBot(pywikibot.Bot):
             Defaults to 'deprecated_default_commons' to use Wikimedia Commons
             for backwards compatibility reasons. Deprecated.
         @type site: APISite, 'deprecated_default_commons' or None
+        @param sha1_index: Up to date local index of the files on the site
+            of the photos to check for duplicates without asking the wiki.
+        @type sha1_index: pywikibot.data.fileindex.FileHashIndex
         """
         if site == 'deprecated_default_commons':
             warn('site=\'deprecated_default_commons\' is deprecated; '
@@ -176,6 +190,7 @@ class DataIngestionBot(pywikibot.Bot):
 
         self.titlefmt = titlefmt
         self.pagefmt = pagefmt
+        self.sha1_index = sha1_index
 
     @property
     @deprecated('generator')
@@ -191,7 +206,14 @@ class DataIngestionBot(pywikibot.Bot):
 
     def treat(self, photo):
         """Process each page."""
-        duplicates = photo.findDuplicateImages()
+        if self.sha1_index:
+            sha1 = hashlib.sha1(photo.downloadPhoto().getvalue()).hexdigest()
+            duplicates = [
+                pywikibot.FilePage(photo.site, title).title(
+                    withNamespace=False)
+                for title in self.sha1_index.lookup([sha1]).get(sha1, [])]
+        else:
+            duplicates = photo.findDuplicateImages()
         if duplicates:
             pywikibot.output(u"Skipping duplicate of %r" % duplicates)
             return duplicates[0]
@@ -199,15 +221,32 @@ class DataIngestionBot(pywikibot.Bot):
         title = photo.getTitle(self.titlefmt)
         description = photo.getDescription(self.pagefmt)
 
-        bot = UploadRobot(url=photo.URL,
+        if self.site.has_right('upload_by_url'):
+            url = photo.URL
+            tempname = None
+        else:
+            # upload the downloaded photo instead of downloading it again
+            handle, tempname = tempfile.mkstemp()
+            contents = photo.downloadPhoto()
+            contents.seek(0)
+            with os.fdopen(handle, 'wb') as f:
+                shutil.copyfileobj(contents, f)
+            url = tempname
+
+        bot = UploadRobot(url=[url],
                           description=description,
                           useFilename=title,
                           keepFilename=True,
                           verifyDescription=False,
                           targetSite=self.site)
-        bot._contents = photo.downloadPhoto().getvalue()
-        bot._retrieved = True
-        bot.run()
+        try:
+            bot.run()
+        finally:
+            if tempname:
+                os.remove(tempname)
+        if self.sha1_index and bot._save_counter:
+            self.sha1_index.add(
+                pywikibot.FilePage(photo.site, title).title(), sha1)
 
         return title
 
@@ -259,10 +298,13 @@ def main(*args):
     local_args = pywikibot.handle_args(args)
     genFactory = pagegenerators.GeneratorFactory()
     csv_dir = None
+    use_sha1_index = False
 
     for arg in local_args:
         if arg.startswith('-csvdir:'):
             csv_dir = arg[8:]
+        elif arg == '-sha1index':
+            use_sha1_index = True
         else:
             genFactory.handleArg(arg)
 
@@ -291,7 +333,12 @@ def main(*args):
             pywikibot.error('%s could not be opened: %s' % (filename, e))
             continue
 
+        sha1_index = None
         try:
+            if use_sha1_index:
+                sha1_index = FileHashIndex(config_page.site)
+                sha1_index.update()
+
             files = CSVReader(f, urlcolumn='url',
                               site=config_page.site,
                               dialect=configuration['csvDialect'],
@@ -300,11 +347,13 @@ def main(*args):
             bot = DataIngestionBot(files,
                                    configuration['titleFormat'],
                                    configuration['formattingTemplate'],
-                                   site=None)
+                                   site=None, sha1_index=sha1_index)
 
             bot.run()
         finally:
             f.close()
+            if sha1_index:
+                sha1_index.close()
 
 
 if __name__ == "__main__":
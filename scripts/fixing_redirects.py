@@ -25,6 +25,7 @@ import pywikibot
 from pywikibot import pagegenerators
 from pywikibot.bot import (SingleSiteBot, ExistingPageBot, NoRedirectPageBot,
                            AutomaticTWSummaryBot, suggest_help)
+from pywikibot.data import redirectmap
 from pywikibot.textlib import does_text_contain_section
 from pywikibot.tools.formatter import color_format
 from pywikibot.tools import first_lower, first_upper as firstcap
@@ -127,32 +128,37 @@ class FixingRedirectBot(SingleSiteBot, ExistingPageBot, NoRedirectPageBot,
 
     def treat_page(self):
         """Change all redirects from the current page to actual links."""
-        links = self.current_page.linkedPages()
+        links = list(self.current_page.linkedPages())
+        if not links:
+            pywikibot.output('Nothing left to do.')
+            return
         newtext = self.current_page.text
-        i = None
-        for i, page in enumerate(links):
-            if not page.exists():
+        # resolve the redirects of all links at once
+        chains = self.current_page.site.redirect_map.resolve(links)
+        for page, chain in zip(links, chains):
+            if not chain.hops and chain.status == redirectmap.MISSING:
                 try:
                     target = page.moved_target()
                 except (pywikibot.NoMoveTarget,
                         pywikibot.CircularRedirect,
                         pywikibot.InvalidTitle):
                     continue
-            elif page.isRedirectPage():
+            elif chain.hops and chain.status == redirectmap.EXISTS:
+                title = chain.target
+                if chain.fragment:
+                    title += '#' + chain.fragment
                 try:
-                    target = page.getRedirectTarget()
-                except (pywikibot.CircularRedirect,
-                        pywikibot.InvalidTitle):
+                    target = pywikibot.Page(page.site, title)
+                except pywikibot.InvalidTitle:
+                    continue
+                section = target.section()
+                if section and not does_text_contain_section(target.text,
+                                                             section):
+                    pywikibot.warning(
+                        'Section #{0} not found on page {1}'.format(
+                            section, target.title(asLink=True,
+                                                  withSection=False)))
                     continue
-                else:
-                    section = target.section()
-                    if section and not does_text_contain_section(target.text,
-                                                                 section):
-                        pywikibot.warning(
-                            'Section #{0} not found on page {1}'.format(
-                                section, target.title(asLink=True,
-                                                      withSection=False)))
-                        continue
             else:
                 continue
             # no fix to user namespaces
@@ -160,10 +166,7 @@ class FixingRedirectBot(SingleSiteBot, ExistingPageBot, NoRedirectPageBot,
                 continue
             newtext = self.replace_links(newtext, page, target)
 
-        if i is None:
-            pywikibot.output('Nothing left to do.')
-        else:
-            self.put_current(newtext)
+        self.put_current(newtext)
 
 
 def main(*args):
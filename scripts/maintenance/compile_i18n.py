@@ -0,0 +1,46 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Compile all i18n message bundles into a single index file.
+
+The compiled index is used by i18n.twtranslate instead of loading one JSON
+file per language and bundle. It has to be compiled again after the message
+bundles have been updated, otherwise it is ignored.
+
+The following parameters are supported:
+
+-package:name   The messages package to compile, by default the one used by
+                pywikibot (scripts.i18n).
+"""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import pywikibot
+
+from pywikibot import i18n
+
+
+def main(*args):
+    """Process command line arguments and compile the messages."""
+    package_name = None
+    for arg in pywikibot.handle_args(args):
+        if arg.startswith('-package:'):
+            package_name = arg[len('-package:'):]
+        else:
+            pywikibot.bot.suggest_help(unknown_parameters=[arg])
+            return
+
+    try:
+        filename = i18n.compile_messages(package_name)
+    except ImportError as e:
+        pywikibot.error('Unable to load the messages package: {0}'.format(e))
+    else:
+        pywikibot.output('Compiled messages written to {0}'.format(filename))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Replay a recorded request timeline against other throttle settings.
+
+The timeline is recorded by setting config.throttle_timeline to a file name.
+Each throttled request of a bot is then appended to that file in the logs
+subdirectory. This script replays the requests of each site with the given
+settings and compares the duration and the throttle waits with the recorded
+ones, without making any request.
+
+The following parameters are supported:
+
+-timeline:name    The timeline file in the logs subdirectory, by default
+                  config.throttle_timeline.
+
+-site:name        Only replay the requests to this site, e.g. wikipedia:en.
+
+-delay:n          The minimum delay in seconds between reads, by default
+                  config.minthrottle.
+
+-maxdelay:n       The maximum delay in seconds, by default config.maxthrottle.
+
+-writedelay:n     The delay in seconds between writes, by default
+                  config.put_throttle.
+
+-processes:n      The number of processes accessing the site, 1 by default.
+"""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import pywikibot
+
+from pywikibot import config
+from pywikibot.throttle import load_timeline, replay
+
+
+def main(*args):
+    """Process command line arguments and replay the timeline."""
+    filename = config.throttle_timeline
+    site = None
+    settings = {}
+    for arg in pywikibot.handle_args(args):
+        option, sep, value = arg.partition(':')
+        if option == '-timeline':
+            filename = value
+        elif option == '-site':
+            site = value
+        elif option in ('-delay', '-maxdelay', '-writedelay'):
+            name = 'mindelay' if option == '-delay' else option[1:]
+            settings[name] = float(value)
+        elif option == '-processes':
+            settings['processes'] = int(value)
+        else:
+            pywikibot.bot.suggest_help(unknown_parameters=[arg])
+            return
+
+    if not filename:
+        pywikibot.bot.suggest_help(missing_parameters=['-timeline'])
+        return
+
+    events = load_timeline(filename, site)
+    sites = {}
+    for event in events:
+        sites.setdefault(event['site'], []).append(event)
+    if not sites:
+        pywikibot.output('No requests recorded in {0}'.format(filename))
+
+    for name, site_events in sorted(sites.items()):
+        recorded = (site_events[-1]['time'] + site_events[-1]['wait'] -
+                    site_events[0]['time'])
+        recorded_wait = sum(event['wait'] for event in site_events)
+        throttle = replay(site_events, site=name, **settings)
+        pywikibot.output(
+            '{0}: {1} requests, recorded {2:.1f} seconds including {3:.1f} '
+            'seconds of throttle waits, simulated {4:.1f} seconds'
+            .format(name, len(site_events), recorded, recorded_wait,
+                    throttle.clock))
+        pywikibot.output(throttle.report() or
+                         'Simulated throttle did not sleep')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,21 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 """
-Program to match two images based on histograms.
+Program to match images based on histograms and perceptual hashes.
 
 Usage:
 
-    python pwb.py match_images ImageA ImageB
+    python pwb.py match_images ImageA ImageB [ImageC ...]
 
-It is essential to provide two images to work on.
+The first image is compared with each other image. Instead of further images
+the candidates can be given with page generators:
+
+    python pwb.py match_images ImageA -cat:Category
+
+Without any image the perceptual hashes of the files of the generator are
+indexed and files which are likely the same are listed in groups:
+
+    python pwb.py match_images -cat:Category
 
 &params;
 
@@ -21,6 +29,12 @@ Furthermore, the following command line parameters are supported:
                     fetching file usage details instead of the default
                     mylang retrieved from user-congig.py script.
 
+-width:n            Compare thumbnails of this width instead of the original
+                    files. Much less data is downloaded for large files.
+
+-distance:n         The maximum number of different bits of the perceptual
+                    hashes of files listed as likely the same (default: 4).
+
 This is just a first version so that other people can play around with it.
 Expect the code to change a lot!
 """
@@ -34,71 +48,111 @@ from __future__ import absolute_import, division, unicode_literals
 
 import io
 
+import numpy
+
 from PIL import Image
 
 import pywikibot
 
+from pywikibot import pagegenerators
 from pywikibot.comms import http
+from pywikibot.data import api
+from pywikibot.tools import itergroup
+
+docuReplacements = {
+    '&params;': pagegenerators.parameterHelp
+}
+
+# The areas of an image which are compared, relative to its size
+REGIONS = [
+    ('Whole image', (0, 0, 1, 1)),
+    ('Top left of image', (0, 0, 0.5, 0.5)),
+    ('Top right of image', (0.5, 0, 1, 0.5)),
+    ('Bottom left of image', (0, 0.5, 0.5, 1)),
+    ('Bottom right of image', (0.5, 0.5, 1, 1)),
+    ('Center of image', (0.25, 0.25, 0.75, 0.75)),
+]
+
+
+def region_histograms(image, size=None):
+    """
+    Return the histograms of the regions of an image.
+
+    @param image: the image
+    @type image: PIL.Image.Image
+    @param size: resize the image to this width and height first
+    @type size: tuple
+    @rtype: list of numpy.ndarray
+    """
+    if size and image.size != size:
+        image = image.resize(size)
+    width, height = image.size
+    return [numpy.array(image.crop((int(width * left), int(height * top),
+                                    int(width * right), int(height * bottom))
+                                   ).histogram())
+            for _, (left, top, right, bottom) in REGIONS]
+
+
+def match_histograms(histogramA, histogramB):
+    """Return the ratio of pixels of two histograms that match."""
+    if len(histogramA) != len(histogramB):
+        return 0
+    totalPixels = numpy.maximum(histogramA, histogramB).sum()
+    if totalPixels == 0:
+        return 0
+    return numpy.minimum(histogramA, histogramB).sum() / totalPixels
 
 
-def match_image_pages(imagePageA, imagePageB):
+def image_hash(image, size=8):
+    """
+    Return the perceptual difference hash of an image.
+
+    The image is reduced to size + 1 times size gray pixels and each bit
+    of the hash tells whether a pixel is brighter than its left neighbour.
+    Similar images have hashes which differ only in a few bits.
+
+    @param image: the image
+    @type image: PIL.Image.Image
+    @param size: the number of bits of the hash is the square of it
+    @type size: int
+    @rtype: int
+    """
+    pixels = numpy.asarray(image.convert('L').resize((size + 1, size)),
+                           dtype=numpy.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(''.join('1' if bit else '0' for bit in bits), 2)
+
+
+def match_image_pages(imagePageA, imagePageB, width=None):
     """The function expects two image page objects.
 
     It will return True if the image are the same and False if the images are
     not the same
 
+    @param width: compare thumbnails of this width
+    @type width: int
+    """
+    imageA = get_image_from_image_page(imagePageA, width)
+    imageB = get_image_from_image_page(imagePageB, width)
+    return match_histogram_scores(region_histograms(imageA),
+                                  region_histograms(imageB, imageA.size))
+
+
+def match_histogram_scores(histogramsA, histogramsB):
+    """
+    Compare the region histograms of two images and output the scores.
+
+    @return: whether the images are the same
+    @rtype: bool
     """
-    imageA = get_image_from_image_page(imagePageA)
-    imageB = get_image_from_image_page(imagePageB)
-
-    (imA_width, imA_height) = imageA.size
-    (imB_width, imB_height) = imageB.size
-
-    imageB = imageB.resize((imA_width, imA_height))
-
-    imageA_topleft = imageA.crop((0, 0, imA_width // 2, imA_height // 2))
-    imageB_topleft = imageB.crop((0, 0, imA_width // 2, imA_height // 2))
-
-    imageA_topright = imageA.crop((imA_width // 2, 0, imA_width,
-                                  imA_height // 2))
-    imageB_topright = imageB.crop((imA_width // 2, 0, imA_width,
-                                  imA_height // 2))
-
-    imageA_bottomleft = imageA.crop((0, imA_height // 2, imA_width // 2,
-                                     imA_height))
-    imageB_bottomleft = imageB.crop((0, imA_height // 2, imA_width // 2,
-                                     imA_height))
-
-    imageA_bottomright = imageA.crop((imA_width // 2, imA_height // 2,
-                                      imA_width, imA_height))
-    imageB_bottomright = imageB.crop((imA_width // 2, imA_height // 2,
-                                      imA_width, imA_height))
-
-    imageA_center = imageA.crop((int(imA_width * 0.25), int(imA_height * 0.25),
-                                int(imA_width * 0.75), int(imA_height * 0.75)))
-    imageB_center = imageB.crop((int(imA_width * 0.25), int(imA_height * 0.25),
-                                int(imA_width * 0.75), int(imA_height * 0.75)))
-
-    wholeScore = match_images(imageA, imageB)
-    topleftScore = match_images(imageA_topleft, imageB_topleft)
-    toprightScore = match_images(imageA_topright, imageB_topright)
-    bottomleftScore = match_images(imageA_bottomleft, imageB_bottomleft)
-    bottomrightScore = match_images(imageA_bottomright, imageB_bottomright)
-    centerScore = match_images(imageA_center, imageB_center)
-    averageScore = (wholeScore + topleftScore + toprightScore +
-                    bottomleftScore + bottomrightScore + centerScore) / 6
-
-    pywikibot.output('Whole image           {0:>7.2%}\n'
-                     'Top left of image     {1:>7.2%}\n'
-                     'Top right of image    {2:>7.2%}\n'
-                     'Bottom left of image  {3:>7.2%}\n'
-                     'Bottom right of image {4:>7.2%}\n'
-                     'Center of image       {5:>7.2%}\n'
-                     '                      -------\n'
-                     'Average               {6:>7.2%}'.format(
-                         wholeScore, topleftScore, toprightScore,
-                         bottomleftScore, bottomrightScore, centerScore,
-                         averageScore))
+    scores = [match_histograms(histogramA, histogramB)
+              for histogramA, histogramB in zip(histogramsA, histogramsB)]
+    averageScore = sum(scores) / len(scores)
+
+    pywikibot.output('\n'.join('{0:<22}{1:>7.2%}'.format(name, score)
+                               for (name, _), score in zip(REGIONS, scores)))
+    pywikibot.output('{0:<22}-------\n'
+                     '{1:<22}{2:>7.2%}'.format('', 'Average', averageScore))
 
     # Hard coded at 80%, change this later on.
     if averageScore > 0.8:
@@ -109,35 +163,144 @@ def match_image_pages(imagePageA, imagePageB):
         return False
 
 
-def get_image_from_image_page(imagePage):
-    """Get the image object to work based on an imagePage object."""
-    imageBuffer = None
-    imageURL = imagePage.fileUrl()
-    imageURLopener = http.fetch(imageURL)
-    imageBuffer = io.BytesIO(imageURLopener.raw[:])
-    image = Image.open(imageBuffer)
-    return image
+def match_image_candidates(imagePage, candidates, width=None):
+    """
+    Compare one image with many candidates.
+
+    The image is downloaded and its histograms are computed only once.
+
+    @param imagePage: the image to compare
+    @type imagePage: pywikibot.FilePage
+    @param candidates: the images to compare with
+    @type candidates: iterable of pywikibot.FilePage
+    @param width: compare thumbnails of this width
+    @type width: int
+    @return: the candidates which match
+    @rtype: list of pywikibot.FilePage
+    """
+    image = get_image_from_image_page(imagePage, width)
+    histograms = region_histograms(image)
+    matches = []
+    for candidate, candidate_image in fetch_images(candidates, width):
+        pywikibot.output('\n>>> {0} <<<'.format(candidate.title()))
+        if match_histogram_scores(
+                histograms, region_histograms(candidate_image, image.size)):
+            matches.append(candidate)
+    return matches
+
+
+def build_hash_index(imagePages, width=None):
+    """
+    Return the perceptual hashes of images.
+
+    @param imagePages: the images
+    @type imagePages: iterable of pywikibot.FilePage
+    @param width: hash thumbnails of this width
+    @type width: int
+    @return: image pages mapped to their hash
+    @rtype: dict
+    """
+    return dict((page, image_hash(image))
+                for page, image in fetch_images(imagePages, width))
 
 
-def match_images(imageA, imageB):
-    """Match two image objects. Return the ratio of pixels that match."""
-    histogramA = imageA.histogram()
-    histogramB = imageB.histogram()
+def find_near_duplicates(index, distance=4):
+    """
+    Return groups of images whose hashes differ only in a few bits.
 
-    totalMatch = 0
-    totalPixels = 0
+    @param index: image pages mapped to their hash
+    @type index: dict
+    @param distance: maximum number of different bits
+    @type distance: int
+    @rtype: list of lists of pywikibot.FilePage
+    """
+    pages = list(index)
+    hashes = numpy.array([index[page] for page in pages], dtype=numpy.uint64)
+    groups = []
+    grouped = set()
+    for i, page in enumerate(pages):
+        if i in grouped:
+            continue
+        # count the different bits to all following hashes at once
+        different = numpy.unpackbits(
+            (hashes[i + 1:] ^ hashes[i]).view(numpy.uint8).reshape(-1, 8),
+            axis=1).sum(axis=1)
+        group = [i] + [j for j in (numpy.nonzero(different <= distance)[0] +
+                                   i + 1)
+                       if j not in grouped]
+        if len(group) > 1:
+            grouped.update(group)
+            groups.append([pages[j] for j in group])
+    return groups
+
+
+def thumbnail_urls(imagePages, width):
+    """
+    Return the urls of the thumbnails of many images with few requests.
+
+    @param imagePages: the images
+    @type imagePages: list of pywikibot.FilePage
+    @param width: the width of the thumbnails
+    @type width: int
+    @return: the titles mapped to the urls of the thumbnails
+    @rtype: dict
+    """
+    urls = {}
+    for site in set(page.site for page in imagePages):
+        titles = [page.title() for page in imagePages if page.site == site]
+        for i in range(0, len(titles), 50):
+            gen = api.PropertyGenerator(
+                'imageinfo', site=site,
+                parameters={'titles': titles[i:i + 50], 'iiprop': 'url',
+                            'iiurlwidth': width})
+            for pagedata in gen:
+                if pagedata.get('imageinfo'):
+                    info = pagedata['imageinfo'][0]
+                    urls[pagedata['title']] = info.get('thumburl',
+                                                       info['url'])
+    return urls
+
+
+def fetch_images(imagePages, width=None, batch_size=50):
+    """
+    Yield image pages with their images, skipping those which fail.
 
-    if len(histogramA) != len(histogramB):
-        return 0
+    @param imagePages: the images
+    @type imagePages: iterable of pywikibot.FilePage
+    @param width: fetch thumbnails of this width
+    @type width: int
+    @rtype: generator of tuples
+    """
+    for batch in itergroup(imagePages, batch_size):
+        urls = thumbnail_urls(batch, width) if width else {}
+        for imagePage in batch:
+            try:
+                url = urls.get(imagePage.title()) or imagePage.get_file_url()
+                yield imagePage, get_image_from_url(url)
+            except Exception as e:
+                pywikibot.warning('Skipping {0}: {1}'.format(
+                    imagePage.title(), e))
 
-    for i in range(0, len(histogramA)):
-        totalMatch = totalMatch + min(histogramA[i], histogramB[i])
-        totalPixels = totalPixels + max(histogramA[i], histogramB[i])
 
-    if totalPixels == 0:
-        return 0
+def get_image_from_url(url):
+    """Get the image object of an url."""
+    return Image.open(io.BytesIO(http.fetch(url).raw))
+
+
+def get_image_from_image_page(imagePage, width=None):
+    """
+    Get the image object to work based on an imagePage object.
+
+    @param width: get a thumbnail of this width instead of the original file
+    @type width: int
+    """
+    return get_image_from_url(imagePage.get_file_url(url_width=width))
 
-    return totalMatch / totalPixels
+
+def match_images(imageA, imageB):
+    """Match two image objects. Return the ratio of pixels that match."""
+    return match_histograms(numpy.array(imageA.histogram()),
+                            numpy.array(imageB.histogram()))
 
 
 def main(*args):
@@ -145,11 +308,12 @@ def main(*args):
     images = []
     other_family = u''
     other_lang = u''
-    imagePageA = None
-    imagePageB = None
+    width = None
+    distance = 4
 
     # Read commandline parameters.
     local_args = pywikibot.handle_args(args)
+    genFactory = pagegenerators.GeneratorFactory()
 
     for arg in local_args:
         if arg.startswith('-otherfamily:'):
@@ -162,10 +326,25 @@ def main(*args):
                 other_lang = pywikibot.input(u'What language do you want to use?')
             else:
                 other_lang = arg[len('otherlang:'):]
+        elif arg.startswith('-width:'):
+            width = int(arg[len('-width:'):])
+        elif arg.startswith('-distance:'):
+            distance = int(arg[len('-distance:'):])
+        elif genFactory.handleArg(arg):
+            continue
         else:
             images.append(arg)
 
-    if len(images) != 2:
+    gen = genFactory.getCombinedGenerator()
+    if not images and gen:
+        index = build_hash_index(
+            (page for page in gen if page.namespace() == 6), width)
+        for group in find_near_duplicates(index, distance):
+            pywikibot.output('Likely the same: {0}'.format(
+                ', '.join(page.title() for page in group)))
+        return True
+
+    if not images or (len(images) < 2 and not gen):
         pywikibot.bot.suggest_help(
             additional_text='Unable to execute script because it '
                             'requires two images to work on.')
@@ -175,18 +354,28 @@ def main(*args):
                                          images[0])
     if other_lang:
         if other_family:
-            imagePageB = pywikibot.page.FilePage(pywikibot.Site(
-                                                 other_lang, other_family),
-                                                 images[1])
+            site = pywikibot.Site(other_lang, other_family)
         else:
-            imagePageB = pywikibot.page.FilePage(pywikibot.Site(
-                                                 other_lang),
-                                                 images[1])
+            site = pywikibot.Site(other_lang)
     else:
-        imagePageB = pywikibot.page.FilePage(pywikibot.Site(),
-                                             images[1])
+        site = pywikibot.Site()
+
+    if len(images) == 2 and not gen:
+        imagePageB = pywikibot.page.FilePage(site, images[1])
+        match_image_pages(imagePageA, imagePageB, width)
+        return True
 
-    match_image_pages(imagePageA, imagePageB)
+    candidates = [pywikibot.page.FilePage(site, image)
+                  for image in images[1:]]
+    if gen:
+        candidates += [pywikibot.page.FilePage(page) for page in gen
+                       if page.namespace() == 6]
+    matches = match_image_candidates(imagePageA, candidates, width)
+    pywikibot.output('\n{0} of {1} images match {2}'.format(
+        len(matches), len(candidates), imagePageA.title()))
+    for page in matches:
+        pywikibot.output(page.title())
+    return True
 
 
 if __name__ == "__main__":
@@ -87,10 +87,11 @@ import pywikibot
 
 from pywikibot import i18n, xmlreader
 from pywikibot.bot import OptionHandler, SingleSiteBot
+from pywikibot.data import redirectmap
 from pywikibot.exceptions import ArgumentDeprecationWarning
 from pywikibot.textlib import extract_templates_and_params_regex_simple
 from pywikibot.tools.formatter import color_format
-from pywikibot.tools import issue_deprecation_warning
+from pywikibot.tools import issue_deprecation_warning, itergroup
 
 if sys.version_info[0] > 2:
     basestring = (str, )
@@ -221,17 +222,6 @@ class RedirectGenerator(OptionHandler):
                     return
                 yield p
 
-    def _next_redirect_group(self):
-        """Generator that yields batches of 500 redirects as a list."""
-        apiQ = []
-        for page in self.get_redirect_pages_via_api():
-            apiQ.append(str(page.pageid))
-            if len(apiQ) >= 500:
-                yield apiQ
-                apiQ = []
-        if apiQ:
-            yield apiQ
-
     def get_redirects_via_api(self, maxlen=8):
         """
         Return a generator that yields tuples of data about redirect Pages.
@@ -242,57 +232,31 @@ class RedirectGenerator(OptionHandler):
                          1 - normal redirect, target page exists and is not a
                              redirect
                  2..maxlen - start of a redirect chain of that many redirects
-                             (currently, the API seems not to return sufficient
-                             data to make these return values possible, but
-                             that may change)
                   maxlen+1 - start of an even longer chain, or a loop
-                             (currently, the API seems not to return sufficient
-                             data to allow this return values, but that may
-                             change)
-                      None - start of a redirect chain of unknown length, or
-                             loop
+                      None - redirect to another site
             2 - target page title of the redirect, or chain (may not exist)
             3 - target page of the redirect, or end of chain, or page title
                 where chain or loop detecton was halted, or None if unknown
+
+        The redirect chains are resolved by the redirect map of the site, so
+        the chains of many redirects are queried at once.
         """
-        for apiQ in self._next_redirect_group():
-            gen = pywikibot.data.api.Request(
-                site=self.site, parameters={'action': 'query',
-                                            'redirects': True,
-                                            'pageids': apiQ})
-            data = gen.submit()
-            if 'error' in data:
-                raise RuntimeError("API query error: %s" % data)
-            if data == [] or 'query' not in data:
-                raise RuntimeError("No results given.")
-            redirects = {}
-            pages = {}
-            redirects = dict((x['from'], x['to'])
-                             for x in data['query']['redirects'])
-
-            for pagetitle in data['query']['pages'].values():
-                if 'missing' in pagetitle and 'pageid' not in pagetitle:
-                    pages[pagetitle['title']] = False
-                else:
-                    pages[pagetitle['title']] = True
-            for redirect in redirects:
-                target = redirects[redirect]
-                result = 0
-                final = None
-                try:
-                    if pages[target]:
-                        final = target
-                        try:
-                            while result <= maxlen:
-                                result += 1
-                                final = redirects[final]
-                            # result = None
-                        except KeyError:
-                            pass
-                except KeyError:
+        redirect_map = self.site.redirect_map
+        for group in itergroup(self.get_redirect_pages_via_api(), 500):
+            for chain in redirect_map.resolve(group):
+                if not chain.hops:
+                    continue
+                final = chain.target
+                if chain.status == redirectmap.MISSING and chain.hops == 1:
+                    result = 0
+                    final = None
+                elif chain.status == redirectmap.INTERWIKI:
                     result = None
-                    pass
-                yield (redirect, result, target, final)
+                elif chain.status == redirectmap.LOOP:
+                    result = maxlen + 1
+                else:
+                    result = min(chain.hops, maxlen + 1)
+                yield (chain.title, result, chain.chain[1], final)
 
     def retrieve_broken_redirects(self):
         """Retrieve broken redirects."""
@@ -30,6 +30,10 @@ Arguments:
   -recursive    When the filename is a directory it also uploads the files from
                 the subdirectories.
   -summary      Pick a custom edit summary for the bot.
+  -sha1index    Skip files which are already on the target site using a local
+                index of the files. The index is built on the first run and
+                updated on later runs. Files are still uploaded if
+                -ignorewarn includes the 'duplicate' warning.
 
 It is possible to combine -abortonwarn and -ignorewarn so that if the specific
 warning is given it won't apply the general one but more specific one. So if it
@@ -60,6 +64,7 @@ import re
 
 import pywikibot
 from pywikibot.bot import suggest_help
+from pywikibot.data.fileindex import FileHashIndex
 from pywikibot.specialbots import UploadRobot
 
 
@@ -85,6 +90,7 @@ def main(*args):
     chunk_size_regex = r'^-chunked(?::(\d+(?:\.\d+)?)[ \t]*(k|ki|m|mi)?b?)?$'
     chunk_size_regex = re.compile(chunk_size_regex, re.I)
     recursive = False
+    use_sha1_index = False
 
     # process all global bot args
     # returns a list of non-global args, i.e. args for upload.py
@@ -96,6 +102,8 @@ def main(*args):
                 verifyDescription = False
             elif arg == '-recursive':
                 recursive = True
+            elif arg == '-sha1index':
+                use_sha1_index = True
             elif arg.startswith('-keep'):
                 keepFilename = True
             elif arg.startswith('-filename:'):
@@ -188,7 +196,13 @@ def main(*args):
                       aborts=aborts, ignoreWarning=ignorewarn,
                       chunk_size=chunk_size, always=always,
                       summary=summary)
-    bot.run()
+    if use_sha1_index:
+        bot.sha1_index = FileHashIndex(bot.targetSite)
+    try:
+        bot.run()
+    finally:
+        if bot.sha1_index:
+            bot.sha1_index.close()
 
 
 if __name__ == "__main__":
@@ -4,12 +4,14 @@
 This bot is used for checking external links found at the wiki.
 
 It checks several pages at once, with a limit set by the config variable
-max_external_links, which defaults to 50.
+max_external_links, which defaults to 50. Each link is only checked once per
+run and requests to the same host are limited by the config variables
+max_external_links_per_host and weblink_host_delay.
 
 The bot won't change any wiki pages, it will only report dead links such that
 people can fix or remove the links themselves.
 
-The bot will store all links found dead in a .dat file in the deadlinks
+The bot will store all links found dead in a database in the deadlinks
 subdirectory. To avoid the removing of links which are only temporarily
 unavailable, the bot ONLY reports links which were reported dead at least
 two times, with a time lag of at least one week. Such links will be logged to a
@@ -28,7 +30,7 @@ feature, set report_dead_links_on_talk = True in your user-config.py, or
 specify "-talk" on the command line. Adding "-notalk" switches this off
 irrespective of the configuration variable.
 
-When a link is found alive, it will be removed from the .dat file.
+When a link is found alive, it will be removed from the database.
 
 These command line parameters can be used to specify which pages to work on:
 
@@ -71,6 +73,12 @@ max_external_links        - The maximum number of web pages that should be
                             is congested, and will then think that the page
                             is offline.
 
+max_external_links_per_host - The maximum number of web pages on the same
+                            host that should be loaded simultaneously.
+
+weblink_host_delay        - The minimum number of seconds between starting
+                            two requests to the same host.
+
 report_dead_links_on_talk - If set to true, causes the script to report dead
                             links on the article's talk page if (and ONLY if)
                             the linked page has been unavailable at least two
@@ -106,10 +114,13 @@ Syntax examples:
 from __future__ import absolute_import, unicode_literals
 
 import codecs
+import collections
 import datetime
+import os
 import pickle
 import re
 import socket
+import sqlite3
 import sys
 import threading
 import time
@@ -133,7 +144,9 @@ from pywikibot.bot import ExistingPageBot, SingleSiteBot
 from pywikibot.pagegenerators import (
     XMLDumpPageGenerator as _XMLDumpPageGenerator,
 )
-from pywikibot.tools import deprecated
+from pywikibot.tools import (
+    deprecated, issue_deprecation_warning, OrderedDict,
+)
 from pywikibot.tools.formatter import color_format
 
 import requests
@@ -564,27 +577,112 @@ class LinkChecker(object):
                                      self.response.reason)
 
 
-class LinkCheckThread(threading.Thread):
+def _record_result(history, page, url, alive, message):
+    """Record the result of a check in the history."""
+    if alive:
+        if history.setLinkAlive(url):
+            pywikibot.output('*Link to %s in [[%s]] is back alive.'
+                             % (url, page.title()))
+    else:
+        pywikibot.output('*[[%s]] links to %s - %s.'
+                         % (page.title(), url, message))
+        history.setLinkDead(url, message, page, config.weblink_dead_days)
+
 
-    """A thread responsible for checking one URL.
+class LinkCheckWorker(threading.Thread):
 
-    After checking the page, it will die.
+    """
+    A worker thread checking the URLs queued in a L{LinkCheckPool}.
+
+    The thread runs until the pool is finished and its queue is empty.
+    """
+
+    header = {
+        'Accept': 'text/xml,application/xml,application/xhtml+xml,'
+                  'text/html;q=0.9,text/plain;q=0.8,image/png,*/*;q=0.5',
+        'Accept-Language': 'de-de,de;q=0.8,en-us;q=0.5,en;q=0.3',
+        'Accept-Charset': 'ISO-8859-1,utf-8;q=0.7,*;q=0.7',
+        'Keep-Alive': '30',
+        'Connection': 'keep-alive',
+    }
+
+    def __init__(self, pool):
+        """Constructor."""
+        threading.Thread.__init__(self)
+        self.pool = pool
+        self.HTTPignore = pool.HTTPignore
+        self._use_fake_user_agent = config.fake_user_agent_default.get(
+            'weblinkchecker', False)
+        # thread dies when program terminates
+        self.setDaemon(True)
+
+    def run(self):
+        """Check the queued URLs until the pool is finished."""
+        while True:
+            task = self.pool.next_task()
+            if task is None:
+                break
+            host, page, url = task
+            try:
+                alive, message = self.check(page, url)
+            except Exception:
+                pywikibot.exception('Exception while processing URL %s in '
+                                    'page %s' % (url, page.title()))
+                alive, message = None, None
+            finally:
+                self.pool.task_done(host)
+            self.pool.report(url, alive, message)
+
+    def fetch(self, url, method, headers):
+        """Fetch the URL using the shared session of comms.http."""
+        return comms.http.fetch(
+            url, method=method, headers=headers,
+            use_fake_user_agent=self._use_fake_user_agent)
+
+    def check(self, page, url):
+        """
+        Check whether the URL is alive.
+
+        A HEAD request is sent first. As some servers do not answer HEAD
+        requests correctly, a GET request for the first byte follows if
+        it did not succeed.
+
+        @return: whether the URL is alive and the error message otherwise
+        @rtype: tuple of bool and str
+        """
+        try:
+            r = self.fetch(url, 'HEAD', self.header)
+            if r.status != requests.codes.ok:
+                header = dict(self.header, Range='bytes=0-0')
+                r = self.fetch(url, 'GET', header)
+        except requests.exceptions.InvalidURL:
+            return False, i18n.twtranslate(page.site,
+                                           'weblinkchecker-badurl_msg',
+                                           {'URL': url})
+        except (requests.exceptions.RequestException,
+                pywikibot.ServerError) as e:
+            return False, e.__class__.__name__
+        if (r.status in (requests.codes.ok, requests.codes.partial_content) and
+                str(r.status) not in self.HTTPignore):
+            return True, None
+        return False, '{0}'.format(r.status)
+
+
+class LinkCheckThread(LinkCheckWorker):
+
+    """
+    DEPRECATED: A thread checking one URL.
+
+    After checking the URL, it will die. Use L{LinkCheckPool} instead.
     """
 
     def __init__(self, page, url, history, HTTPignore, day):
         """Constructor."""
+        issue_deprecation_warning('LinkCheckThread', 'LinkCheckPool', 2)
         threading.Thread.__init__(self)
         self.page = page
         self.url = url
         self.history = history
-        self.header = {
-            'Accept': 'text/xml,application/xml,application/xhtml+xml,'
-                      'text/html;q=0.9,text/plain;q=0.8,image/png,*/*;q=0.5',
-            'Accept-Language': 'de-de,de;q=0.8,en-us;q=0.5,en;q=0.3',
-            'Accept-Charset': 'ISO-8859-1,utf-8;q=0.7,*;q=0.7',
-            'Keep-Alive': '30',
-            'Connection': 'keep-alive',
-        }
         # identification for debugging purposes
         self.setName((u'%s - %s' % (page.title(), url)).encode('utf-8',
                                                                'replace'))
@@ -594,59 +692,158 @@ class LinkCheckThread(threading.Thread):
         self.day = day
 
     def run(self):
-        """Run the bot."""
-        ok = False
-        try:
-            header = self.header
-            r = comms.http.fetch(
-                self.url, headers=header,
-                use_fake_user_agent=self._use_fake_user_agent)
-        except requests.exceptions.InvalidURL:
-            message = i18n.twtranslate(self.page.site,
-                                       'weblinkchecker-badurl_msg',
-                                       {'URL': self.url})
-        except:
-            pywikibot.output('Exception while processing URL %s in page %s'
-                             % (self.url, self.page.title()))
-            raise
-        if (r.status == requests.codes.ok and
-                str(r.status) not in self.HTTPignore):
-            ok = True
-        else:
-            message = '{0}'.format(r.status)
-        if ok:
-            if self.history.setLinkAlive(self.url):
-                pywikibot.output('*Link to %s in [[%s]] is back alive.'
-                                 % (self.url, self.page.title()))
-        else:
-            pywikibot.output('*[[%s]] links to %s - %s.'
-                             % (self.page.title(), self.url, message))
-            self.history.setLinkDead(self.url, message, self.page,
-                                     config.weblink_dead_days)
+        """Check the URL and record the result in the history."""
+        alive, message = self.check(self.page, self.url)
+        _record_result(self.history, self.page, self.url, alive, message)
 
 
-class History(object):
+class LinkCheckPool(object):
 
     """
-    Store previously found dead links.
+    Check URLs with a fixed number of L{LinkCheckWorker} threads.
+
+    Each URL is checked once per run and the result is recorded in the
+    history for every page containing it. At most
+    config.max_external_links_per_host checks of the same host are
+    running at a time and they are started at least
+    config.weblink_host_delay seconds apart. The workers are started by
+    L{start}.
+    """
 
-    The URLs are dictionary keys, and
-    values are lists of tuples where each tuple represents one time the URL was
-    found dead. Tuples have the form (title, date, error) where title is the
-    wiki page where the URL was found, date is an instance of time, and error
-    is a string with error code and message.
+    def __init__(self, history, HTTPignore, workers=None):
+        """Constructor."""
+        self.history = history
+        self.HTTPignore = HTTPignore
+        self.workers = workers or config.max_external_links
+        self.max_per_host = config.max_external_links_per_host
+        self.host_delay = config.weblink_host_delay
+        # limit the URLs waiting to be checked, so that the page generator
+        # does not run far ahead of the checks
+        self.max_pending = self.workers * 2
+
+        self._lock = threading.Condition()
+        self._pending = OrderedDict()  # host -> deque of tasks
+        self._pending_count = 0
+        self._running = collections.defaultdict(int)  # host -> checks
+        self._next_start = {}  # host -> earliest start of the next check
+        self._pages = {}  # URL -> pages containing it, until checked
+        self._results = {}  # URL -> (alive, message)
+        self._finishing = False
+        self.threads = []
+
+    def start(self):
+        """Start the workers unless they were started already."""
+        if self.threads:
+            return
+        self.threads = [LinkCheckWorker(self) for i in range(self.workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def add(self, page, url):
+        """
+        Queue the URL found in page to be checked.
+
+        Blocks while too many URLs are waiting to be checked.
+        """
+        with self._lock:
+            if url in self._pages:
+                self._pages[url].append(page)
+                return
+            if url not in self._results:
+                while self._pending_count >= self.max_pending:
+                    self._lock.wait()
+                host = urlparse.urlparse(url).netloc
+                self._pending.setdefault(host, collections.deque()).append(
+                    (page, url))
+                self._pending_count += 1
+                self._pages[url] = [page]
+                self._lock.notify_all()
+                return
+            alive, message = self._results[url]
+        self._record(page, url, alive, message)
+
+    def next_task(self):
+        """
+        Return the next URL which may be checked.
 
-    We assume that the first element in the list represents the first time we
-    found this dead link, and the last element represents the last time.
+        Blocks until a check may be started.
+
+        @return: host, page and URL or None if the pool is finished
+        @rtype: tuple or None
+        """
+        with self._lock:
+            while True:
+                if self._finishing and not self._pending_count:
+                    return None
+                now = time.time()
+                timeout = None
+                for host, tasks in self._pending.items():
+                    if self._running[host] >= self.max_per_host:
+                        continue
+                    delay = self._next_start.get(host, 0) - now
+                    if delay > 0:
+                        timeout = delay if timeout is None else min(timeout,
+                                                                    delay)
+                        continue
+                    page, url = tasks.popleft()
+                    if not tasks:
+                        del self._pending[host]
+                    self._pending_count -= 1
+                    self._running[host] += 1
+                    self._next_start[host] = now + self.host_delay
+                    self._lock.notify_all()
+                    return host, page, url
+                self._lock.wait(timeout)
+
+    def task_done(self, host):
+        """Mark a check of the host as finished."""
+        with self._lock:
+            self._running[host] -= 1
+            if not self._running[host]:
+                del self._running[host]
+            self._lock.notify_all()
+
+    def report(self, url, alive, message):
+        """Record the result of a check for all pages containing the URL."""
+        with self._lock:
+            pages = self._pages.pop(url)
+            if alive is not None:
+                self._results[url] = (alive, message)
+        if alive is not None:
+            for page in pages:
+                self._record(page, url, alive, message)
+
+    def _record(self, page, url, alive, message):
+        """Record the result of a check in the history."""
+        _record_result(self.history, page, url, alive, message)
+
+    def finish(self):
+        """Let the workers stop when all queued URLs have been checked."""
+        with self._lock:
+            self._finishing = True
+            self._lock.notify_all()
+
+    def alive_threads(self):
+        """Return the number of workers which did not stop yet."""
+        return sum(1 for thread in self.threads if thread.is_alive())
+
+
+class History(object):
+
+    """
+    Store previously found dead links.
 
-    Example:
+    The history is kept in a sqlite database in the deadlinks subdirectory.
+    Each time an URL was found dead a row (url, title, date, error) is
+    appended, where title is the wiki page where the URL was found, date is
+    a timestamp as returned by time.time() and error is a string with error
+    code and message. When the URL is found alive, its rows are deleted.
 
-    dict = {
-        'https://www.example.org/page': [
-            ('WikiPageTitle', DATE, '404: File not found'),
-            ('WikiPageName2', DATE, '404: File not found'),
-        ]
+    Every change is committed immediately. Thus the history neither has to
+    be loaded at start nor written at the end and several processes may
+    share it.
 
+    A history from the former pickled .dat file is imported on first use.
     """
 
     def __init__(self, reportThread, site=None):
@@ -657,18 +854,84 @@ class History(object):
         else:
             self.site = site
         self.semaphore = threading.Semaphore()
+        filename = 'deadlinks-%s-%s' % (self.site.family.name, self.site.code)
         self.datfilename = pywikibot.config.datafilepath(
-            'deadlinks', 'deadlinks-%s-%s.dat' % (self.site.family.name,
-                                                  self.site.code))
+            'deadlinks', filename + '.dat')
+        self.dbfilename = pywikibot.config.datafilepath(
+            'deadlinks', filename + '.sqlite3')
         # Count the number of logged links, so that we can insert captions
         # from time to time
         self.logCount = 0
-        try:
-            with open(self.datfilename, 'rb') as datfile:
-                self.historyDict = pickle.load(datfile)
-        except (IOError, EOFError):
-            # no saved history exists yet, or history dump broken
-            self.historyDict = {}
+        # the connection is shared by the link checking threads and guarded
+        # by the semaphore
+        self.db = sqlite3.connect(self.dbfilename, timeout=60,
+                                  check_same_thread=False)
+        # set by save; link checking threads still running afterwards
+        # cannot record their results anymore
+        self.closed = False
+        # allow other processes to read while this one writes
+        self.db.execute('PRAGMA journal_mode=WAL')
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS deadlinks '
+                            '(url TEXT, title TEXT, date REAL, error TEXT)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS deadlinks_url '
+                            'ON deadlinks (url)')
+            self.db.execute('CREATE TABLE IF NOT EXISTS imported '
+                            '(filename TEXT PRIMARY KEY)')
+        self._import_dat()
+
+    def _import_dat(self):
+        """Import the history from the former pickled .dat file once."""
+        if not os.path.exists(self.datfilename):
+            return
+        with self.db:
+            if self.db.execute('SELECT 1 FROM imported WHERE filename = ?',
+                               (self.datfilename, )).fetchone():
+                return
+            try:
+                with open(self.datfilename, 'rb') as datfile:
+                    historyDict = pickle.load(datfile)
+            except (IOError, EOFError):
+                # history dump broken
+                historyDict = {}
+            pywikibot.output('Importing %d dead links from %s'
+                             % (len(historyDict), self.datfilename))
+            self.db.executemany(
+                'INSERT INTO deadlinks VALUES (?, ?, ?, ?)',
+                ((url, title, date, error)
+                 for url, entries in historyDict.items()
+                 for title, date, error in entries))
+            self.db.execute('INSERT INTO imported VALUES (?)',
+                            (self.datfilename, ))
+
+    def entries(self, url):
+        """
+        Return the times the URL was found dead.
+
+        The first entry represents the first time the link was found dead,
+        the last one the last time.
+
+        @return: tuples of page title, date and error
+        @rtype: list of tuples
+        """
+        with self.semaphore:
+            if self.closed:
+                return []
+            return self._entries(url)
+
+    def _entries(self, url):
+        """Return the times the URL was found dead without locking."""
+        return self.db.execute('SELECT title, date, error FROM deadlinks '
+                               'WHERE url = ? ORDER BY date',
+                               (url, )).fetchall()
+
+    def pages(self):
+        """Return the titles of all pages with dead links."""
+        with self.semaphore:
+            if self.closed:
+                return []
+            return [title for title, in self.db.execute(
+                'SELECT DISTINCT title FROM deadlinks')]
 
     def log(self, url, error, containingPage, archiveURL):
         """Log an error report to a text file in the deadlinks subdirectory."""
@@ -676,7 +939,7 @@ class History(object):
             errorReport = u'* %s ([%s archive])\n' % (url, archiveURL)
         else:
             errorReport = u'* %s\n' % url
-        for (pageTitle, date, error) in self.historyDict[url]:
+        for (pageTitle, date, error) in self.entries(url):
             # ISO 8601 formulation
             isoDate = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(date))
             errorReport += "** In [[%s]] on %s, %s\n" % (pageTitle, isoDate,
@@ -699,61 +962,63 @@ class History(object):
                                      archiveURL)
 
     def setLinkDead(self, url, error, page, weblink_dead_days):
-        """Add the fact that the link was found dead to the .dat file."""
-        self.semaphore.acquire()
+        """Add the fact that the link was found dead to the history."""
         now = time.time()
-        if url in self.historyDict:
-            timeSinceFirstFound = now - self.historyDict[url][0][1]
-            timeSinceLastFound = now - self.historyDict[url][-1][1]
+        with self.semaphore:
+            if self.closed:
+                return
+            entries = self._entries(url)
             # if the last time we found this dead link is less than an hour
             # ago, we won't save it in the history this time.
-            if timeSinceLastFound > 60 * 60:
-                self.historyDict[url].append((page.title(), now, error))
-            # if the first time we found this link longer than x day ago
-            # (default is a week), it should probably be fixed or removed.
-            # We'll list it in a file so that it can be removed manually.
-            if timeSinceFirstFound > 60 * 60 * 24 * weblink_dead_days:
-                # search for archived page
-                try:
-                    archiveURL = get_archive_url(url)
-                except Exception as e:
-                    pywikibot.warning(
-                        'get_closest_memento_url({0}) failed: {1}'.format(
-                            url, e))
-                    archiveURL = None
-                if archiveURL is None:
-                    archiveURL = weblib.getInternetArchiveURL(url)
-                if archiveURL is None:
-                    archiveURL = weblib.getWebCitationURL(url)
-                self.log(url, error, page, archiveURL)
-        else:
-            self.historyDict[url] = [(page.title(), now, error)]
-        self.semaphore.release()
+            if not entries or now - entries[-1][1] > 60 * 60:
+                with self.db:
+                    self.db.execute(
+                        'INSERT INTO deadlinks VALUES (?, ?, ?, ?)',
+                        (url, page.title(), now, error))
+        # if the first time we found this link longer than x day ago
+        # (default is a week), it should probably be fixed or removed.
+        # We'll list it in a file so that it can be removed manually.
+        if entries and now - entries[0][1] > 60 * 60 * 24 * weblink_dead_days:
+            # search for archived page
+            try:
+                archiveURL = get_archive_url(url)
+            except Exception as e:
+                pywikibot.warning(
+                    'get_closest_memento_url({0}) failed: {1}'.format(
+                        url, e))
+                archiveURL = None
+            if archiveURL is None:
+                archiveURL = weblib.getInternetArchiveURL(url)
+            if archiveURL is None:
+                archiveURL = weblib.getWebCitationURL(url)
+            self.log(url, error, page, archiveURL)
 
     def setLinkAlive(self, url):
         """
         Record that the link is now alive.
 
-        If link was previously found dead, remove it from the .dat file.
+        If link was previously found dead, remove it from the history.
 
         @return: True if previously found dead, else returns False.
         """
-        if url in self.historyDict:
-            self.semaphore.acquire()
-            try:
-                del self.historyDict[url]
-            except KeyError:
-                # Not sure why this can happen, but I guess we can ignore this.
-                pass
-            self.semaphore.release()
-            return True
-        else:
-            return False
+        with self.semaphore:
+            if self.closed:
+                return False
+            with self.db:
+                cursor = self.db.execute('DELETE FROM deadlinks WHERE url = ?',
+                                         (url, ))
+            return cursor.rowcount > 0
 
     def save(self):
-        """Save the .dat file to disk."""
-        with open(self.datfilename, 'wb') as f:
-            pickle.dump(self.historyDict, f, protocol=config.pickle_protocol)
+        """
+        Close the history; all changes are already stored.
+
+        Links found dead or alive afterwards are not recorded.
+        """
+        with self.semaphore:
+            if not self.closed:
+                self.closed = True
+                self.db.close()
 
 
 class DeadLinkReportThread(threading.Thread):
@@ -862,7 +1127,7 @@ class WeblinkCheckerRobot(SingleSiteBot, ExistingPageBot):
     """
     Bot which will search for dead weblinks.
 
-    It uses several LinkCheckThreads at once to process pages from generator.
+    It uses a L{LinkCheckPool} to check the links of the pages from generator.
     """
 
     def __init__(self, generator, HTTPignore=None, day=7, site=True):
@@ -884,6 +1149,12 @@ class WeblinkCheckerRobot(SingleSiteBot, ExistingPageBot):
         else:
             self.HTTPignore = HTTPignore
         self.day = day
+        self.pool = LinkCheckPool(self.history, self.HTTPignore)
+
+    def run(self):
+        """Start checking the links and run the bot."""
+        self.pool.start()
+        super(WeblinkCheckerRobot, self).run()
 
     def treat_page(self):
         """Process one page."""
@@ -895,47 +1166,30 @@ class WeblinkCheckerRobot(SingleSiteBot, ExistingPageBot):
                 if ignoreR.match(url):
                     ignoreUrl = True
             if not ignoreUrl:
-                # Limit the number of threads started at the same time. Each
-                # thread will check one page, then die.
-                while threading.activeCount() >= config.max_external_links:
-                    time.sleep(config.retry_wait)
-                thread = LinkCheckThread(page, url, self.history,
-                                         self.HTTPignore, self.day)
-                # thread dies when program terminates
-                thread.setDaemon(True)
-                try:
-                    thread.start()
-                except threading.ThreadError:
-                    pywikibot.warning(
-                        "Can't start a new thread.\nPlease decrease "
-                        "max_external_links in your user-config.py or use\n"
-                        "'-max_external_links:' option with a smaller value. "
-                        "Default is 50.")
-                    raise
+                self.pool.add(page, url)
 
 
 def RepeatPageGenerator():
     """Generator for pages in History."""
     history = History(None)
-    pageTitles = set()
-    for value in history.historyDict.values():
-        for entry in value:
-            pageTitles.add(entry[0])
+    pageTitles = history.pages()
+    history.save()
     for pageTitle in sorted(pageTitles):
         page = pywikibot.Page(pywikibot.Site(), pageTitle)
         yield page
 
 
+@deprecated('LinkCheckPool.alive_threads')
 def countLinkCheckThreads():
     """
-    Count LinkCheckThread threads.
+    DEPRECATED: Count LinkCheckWorker threads.
 
-    @return: number of LinkCheckThread threads
+    @return: number of LinkCheckWorker threads
     @rtype: int
     """
     i = 0
     for thread in threading.enumerate():
-        if isinstance(thread, LinkCheckThread):
+        if isinstance(thread, LinkCheckWorker):
             i += 1
     return i
 
@@ -1013,29 +1267,30 @@ def main(*args):
         try:
             bot.run()
         finally:
+            bot.pool.finish()
             waitTime = 0
             # Don't wait longer than 30 seconds for threads to finish.
-            while countLinkCheckThreads() > 0 and waitTime < 30:
+            while bot.pool.alive_threads() > 0 and waitTime < 30:
                 try:
                     pywikibot.output(u"Waiting for remaining %i threads to "
                                      u"finish, please wait..."
-                                     % countLinkCheckThreads())
+                                     % bot.pool.alive_threads())
                     # wait 1 second
                     time.sleep(1)
                     waitTime += 1
                 except KeyboardInterrupt:
                     pywikibot.output(u'Interrupted.')
                     break
-            if countLinkCheckThreads() > 0:
+            if bot.pool.alive_threads() > 0:
                 pywikibot.output(u'Remaining %i threads will be killed.'
-                                 % countLinkCheckThreads())
+                                 % bot.pool.alive_threads())
                 # Threads will die automatically because they are daemonic.
             if bot.history.reportThread:
                 bot.history.reportThread.shutdown()
                 # wait until the report thread is shut down; the user can
                 # interrupt it by pressing CTRL-C.
                 try:
-                    while bot.history.reportThread.isAlive():
+                    while bot.history.reportThread.is_alive():
                         time.sleep(0.1)
                 except KeyboardInterrupt:
                     pywikibot.output(u'Report thread interrupted.')
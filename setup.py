@@ -76,6 +76,7 @@ if PY2:
 
 script_deps = {
     'flickrripper.py': ['Pillow<3.5.0' if PY26 else 'Pillow'],
+    'match_images.py': ['Pillow<3.5.0' if PY26 else 'Pillow', 'numpy'],
     'states_redirect.py': ['pycountry'],
     'weblinkchecker.py': ['memento_client>=0.5.1,!=0.6.0'],
     'patrol.py': ['mwparserfromhell>=0.3.3'],
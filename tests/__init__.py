@@ -121,6 +121,13 @@ library_test_modules = [
     'upload',
     'site_detect',
     'bot',
+    'metrics',
+    'throttle',
+    'mock_server',
+    'categorygraph',
+    'redirectmap',
+    'mysql',
+    'match_images',
 ]
 
 script_test_modules = [
@@ -7,12 +7,16 @@
 #
 from __future__ import absolute_import, unicode_literals
 
+import shutil
+import tempfile
+
 from datetime import datetime, timedelta
 
 import pywikibot
 import pywikibot.page
 
-from pywikibot.textlib import TimeStripper
+from pywikibot import config
+from pywikibot.textlib import TimeStripper, tzoneFixedOffset
 from pywikibot.tools import StringTypes as basestring
 
 from scripts import archivebot
@@ -228,6 +232,120 @@ class TestArchiveBotAfterDateUpdate(TestCase):
     expected_failures = []
 
 
+class FakeSite(object):
+
+    """Site with a code only."""
+
+    code = 'en'
+
+
+class FakeTimeStripper(object):
+
+    """TimeStripper counting the parsed lines."""
+
+    site = FakeSite()
+    tzinfo = tzoneFixedOffset(0, 'UTC')
+
+    def __init__(self):
+        """Constructor."""
+        self.lines = []
+
+    def timestripper(self, line):
+        """Return a timestamp for lines with a year."""
+        self.lines.append(line)
+        if line.isdigit():
+            return pywikibot.Timestamp(int(line), 1, 1, tzinfo=self.tzinfo)
+        return None
+
+
+class FakePage(object):
+
+    """Page with a title and revision id only."""
+
+    def __init__(self, title, revid):
+        """Constructor."""
+        self._title = title
+        self.latest_revision_id = revid
+
+    def title(self):
+        """Return the title."""
+        return self._title
+
+
+class TestArchiveState(TestCase):
+
+    """Test lazy thread timestamps and the state of previous runs."""
+
+    net = False
+
+    def setUp(self):
+        """Use a temporary base directory."""
+        super(TestArchiveState, self).setUp()
+        self._base_dir = config.base_dir
+        config.base_dir = tempfile.mkdtemp()
+        self.ts = FakeTimeStripper()
+
+    def tearDown(self):
+        """Restore the base directory."""
+        shutil.rmtree(config.base_dir)
+        config.base_dir = self._base_dir
+        super(TestArchiveState, self).tearDown()
+
+    def _thread(self, title, *lines):
+        """Return a thread with the given lines."""
+        thread = archivebot.DiscussionThread(title, None, self.ts)
+        for line in ('', ) + lines:
+            thread.feed_line(line)
+        return thread
+
+    def test_thread(self):
+        """Test that timestamps are searched on first access only."""
+        thread = self._thread('Foo', 'text', '2015', '2016', 'text')
+        self.assertEqual(thread.content, 'text\n2015\n2016\ntext\n')
+        self.assertEqual(self.ts.lines, [])
+        self.assertEqual(thread.timestamp.year, 2016)
+        self.assertEqual(thread.timestamp.year, 2016)
+        self.assertEqual(len(self.ts.lines), 4)
+        thread.timestamp = None
+        self.assertIsNone(thread.timestamp)
+
+    def test_state(self):
+        """Test storing the state of a page."""
+        site = pywikibot.site.BaseSite('en', 'wikipedia')
+        state = archivebot.ArchiveState(site)
+        page = FakePage('Talk:Foo', 10)
+        threads = [self._thread('Foo', '2015'), self._thread('Bar', 'x')]
+        now = datetime(2017, 1, 1, tzinfo=archivebot.TZoneUTC())
+        self.assertFalse(state.unchanged(page, 'Template:Archive', now))
+
+        state.update(page, 'Template:Archive', threads,
+                     datetime(2018, 1, 1, tzinfo=archivebot.TZoneUTC()))
+        state.close()
+
+        state = archivebot.ArchiveState(site)
+        self.assertTrue(state.unchanged(page, 'Template:Archive', now))
+        self.assertFalse(state.unchanged(page, 'Template:Other', now))
+        self.assertFalse(state.unchanged(
+            page, 'Template:Archive',
+            datetime(2018, 1, 2, tzinfo=archivebot.TZoneUTC())))
+        self.assertFalse(state.unchanged(FakePage('Talk:Foo', 11),
+                                         'Template:Archive', now))
+
+        timestamps = state.timestamps(page, 'Template:Archive',
+                                      self.ts.tzinfo)
+        self.assertEqual(timestamps, {
+            threads[0].digest(): threads[0].timestamp,
+            threads[1].digest(): None,
+        })
+        state.update(page, 'Template:Archive', threads[1:], None)
+        self.assertTrue(state.unchanged(
+            page, 'Template:Archive',
+            datetime(2100, 1, 1, tzinfo=archivebot.TZoneUTC())))
+        self.assertEqual(len(state.timestamps(page, 'Template:Archive',
+                                              self.ts.tzinfo)), 1)
+        state.close()
+
+
 if __name__ == '__main__':  # pragma: no cover
     try:
         unittest.main()
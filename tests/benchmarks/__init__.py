@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of performance critical code paths.
+
+The benchmarks are not part of the test suite. Each module can be run
+directly, e.g.::
+
+    python -m tests.benchmarks.diff_benchmark
+
+Modules using L{run_suite} can store their results as JSON and compare them
+with stored results to detect regressions::
+
+    python -m tests.benchmarks.textlib_benchmark --json baseline.json
+    python -m tests.benchmarks.textlib_benchmark --baseline baseline.json
+"""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import argparse
+import datetime
+import json
+import platform
+import timeit
+
+import pywikibot
+
+# Minimum duration in seconds of one timing run
+MIN_DURATION = 0.2
+
+# Default fraction by which a benchmark may be slower than its baseline
+TOLERANCE = 0.2
+
+
+def measure(func, repeat=3):
+    """
+    Return the best duration of one call of func.
+
+    The number of calls per timing run is increased until a run takes at
+    least MIN_DURATION seconds.
+
+    @param func: the callable to time
+    @type func: callable
+    @param repeat: the number of timing runs
+    @type repeat: int
+    @return: duration in seconds
+    @rtype: float
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < MIN_DURATION:
+        number *= 10
+    return min(timer.repeat(repeat, number)) / number
+
+
+def run(benchmarks, repeat=3):
+    """
+    Run and report the given benchmarks.
+
+    @param benchmarks: pairs of benchmark name and callable
+    @type benchmarks: iterable of tuple
+    @param repeat: the number of timing runs of each benchmark
+    @type repeat: int
+    @return: benchmark name mapped to the duration in seconds
+    @rtype: dict
+    """
+    results = {}
+    for name, func in benchmarks:
+        results[name] = measure(func, repeat)
+        pywikibot.output('{0:<60} {1:>12.3f} ms'.format(
+            name, results[name] * 1000))
+    return results
+
+
+def save_results(results, filename):
+    """
+    Write the results and the environment they were measured in as JSON.
+
+    @param results: benchmark name mapped to the duration in seconds
+    @type results: dict
+    @param filename: the file to write
+    @type filename: str
+    """
+    data = {
+        'date': datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    with open(filename, 'w') as f:
+        json.dump(data, f, indent=4, sort_keys=True)
+
+
+def load_results(filename):
+    """
+    Return the results written by L{save_results}.
+
+    @rtype: dict
+    """
+    with open(filename) as f:
+        return json.load(f)['results']
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    Report the change of each result against the baseline.
+
+    Benchmarks missing from either side are not compared.
+
+    @param results: benchmark name mapped to the duration in seconds
+    @type results: dict
+    @param baseline: benchmark name mapped to the duration in seconds
+    @type baseline: dict
+    @param tolerance: the fraction by which a benchmark may be slower
+        than its baseline
+    @type tolerance: float
+    @return: the names of the benchmarks which are slower than allowed
+    @rtype: list
+    """
+    regressions = []
+    for name in sorted(set(results) & set(baseline)):
+        change = results[name] / baseline[name] - 1
+        if change > tolerance:
+            regressions.append(name)
+        pywikibot.output('{0:<60} {1:>12.3f} ms {2:>+8.1%}{3}'.format(
+            name, baseline[name] * 1000, change,
+            ' REGRESSION' if name in regressions else ''))
+    return regressions
+
+
+def run_suite(benchmarks, description=None, args=None):
+    """
+    Run the benchmarks with the options given on the command line.
+
+    The options select benchmarks by name, write the results as JSON and
+    compare them with a baseline written before; see --help.
+
+    @param benchmarks: pairs of benchmark name and callable
+    @type benchmarks: iterable of tuple
+    @param description: the description shown by --help
+    @type description: str
+    @param args: the command line arguments, by default sys.argv
+    @type args: list of str
+    @return: the exit status, 1 if a benchmark regressed
+    @rtype: int
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--filter', default='',
+                        help='only run benchmarks whose name contains this')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='timing runs of each benchmark')
+    parser.add_argument('--json', metavar='FILE',
+                        help='write the results to this file')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='compare the results with this file')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='fraction by which a benchmark may be slower '
+                             'than its baseline')
+    options = parser.parse_args(args)
+
+    results = run([(name, func) for name, func in benchmarks
+                   if options.filter in name], options.repeat)
+    if options.json:
+        save_results(results, options.json)
+    if options.baseline:
+        pywikibot.output('\nBaseline {0}:'.format(options.baseline))
+        regressions = compare(results, load_results(options.baseline),
+                              options.tolerance)
+        if regressions:
+            pywikibot.output('{0} benchmarks regressed by more than {1:.0%}'
+                             .format(len(regressions), options.tolerance))
+            return 1
+    return 0
@@ -0,0 +1,193 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Throughput benchmark of generators and bots against a mock API server.
+
+The flows run real generators, preloading, saving and replace.py against a
+local L{tests.mock_server.MockAPIServer}, so the results do not depend on
+the network or on a live wiki. Each flow reports the requests per second,
+the pages per second and the memory.
+
+The throttle is disabled. The latency of the server and injected maxlag and
+server errors can be set with options, see --help.
+"""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import argparse
+import logging
+import shutil
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import pywikibot
+
+from pywikibot import config, pagegenerators
+from pywikibot.data import api
+
+from scripts import replace
+
+from tests.mock_server import MockAPIServer, MockWiki
+
+
+def peak_memory():
+    """Return the peak memory in MB, traced or of the process."""
+    if tracemalloc and tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    if resource:
+        # kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return float('nan')
+
+
+def allpages_flow(site, args):
+    """Iterate the titles of the allpages generator."""
+    gen = pagegenerators.AllpagesPageGenerator(site=site, total=args.pages)
+    return sum(1 for page in gen)
+
+
+def preload_flow(site, args):
+    """Preload the texts of the allpages generator."""
+    gen = pagegenerators.PreloadingGenerator(
+        pagegenerators.AllpagesPageGenerator(site=site, total=args.pages),
+        groupsize=args.groupsize)
+    return sum(1 for page in gen if page.text)
+
+
+def save_flow(site, args):
+    """Change and save pages one by one."""
+    count = 0
+    gen = pagegenerators.AllpagesPageGenerator(site=site, total=args.edits)
+    for page in pagegenerators.PreloadingGenerator(gen):
+        page.text += '\nsaved'
+        page.save('Benchmark edit')
+        count += 1
+    return count
+
+
+def replace_flow(site, args):
+    """Run replace.py on the preloaded allpages generator.
+
+    Each page is changed, so the changed pages are the treated pages.
+    """
+    gen = pagegenerators.PreloadingGenerator(
+        pagegenerators.AllpagesPageGenerator(site=site, total=args.edits))
+    replacement = replace.Replacement('Lorem', 'Ipsum')
+    replacement.compile(False, 0)
+    bot = replace.ReplaceRobot(gen, [replacement], summary='Benchmark',
+                               always=True, site=site)
+    bot.run()
+    return bot.changed_pages
+
+
+def wbgetentities_flow(site, args):
+    """Load items in batches of 50."""
+    count = 0
+    for start in range(1, args.pages + 1, 50):
+        ids = ['Q{0}'.format(i)
+               for i in range(start, min(start + 50, args.pages + 1))]
+        result = api.Request(site=site, parameters={
+            'action': 'wbgetentities', 'ids': ids}).submit()
+        count += len(result['entities'])
+    return count
+
+
+FLOWS = [
+    ('allpages generator', allpages_flow),
+    ('preloaded allpages', preload_flow),
+    ('Page.save', save_flow),
+    ('replace.py', replace_flow),
+    ('wbgetentities', wbgetentities_flow),
+]
+
+
+def run_flows(server, site, args):
+    """Run the flows and return their results."""
+    results = []
+    root_logger = logging.getLogger('pywiki')
+    for name, flow in FLOWS:
+        if tracemalloc and args.tracemalloc:
+            tracemalloc.start()
+        requests = server.requests
+        started = time.time()
+        # do not measure the console output of the bots
+        root_logger.disabled = True
+        try:
+            pages = flow(site, args)
+        finally:
+            root_logger.disabled = False
+        seconds = time.time() - started
+        requests = server.requests - requests
+        results.append((name, seconds, requests, pages, peak_memory()))
+        if tracemalloc and args.tracemalloc:
+            tracemalloc.stop()
+    return results
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pages', type=int, default=2000,
+                        help='pages of the wiki and of the read flows')
+    parser.add_argument('--edits', type=int, default=200,
+                        help='pages of the edit flows')
+    parser.add_argument('--groupsize', type=int, default=50,
+                        help='pages preloaded per request')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='seconds to wait before each response')
+    parser.add_argument('--maxlag', type=float, default=0,
+                        help='fraction of maxlag errors')
+    parser.add_argument('--errors', type=float, default=0,
+                        help='fraction of server errors')
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help='trace the peak Python memory of each flow '
+                             'instead of the peak of the process')
+    args = parser.parse_args()
+
+    base_dir = config.base_dir
+    get_cache_dir = api.CachedRequest._get_cache_dir
+    config.base_dir = tempfile.mkdtemp()
+    # keep the cached siteinfo and paraminfo of the mock wiki out of the
+    # cache of the tests
+    api.CachedRequest._get_cache_dir = classmethod(
+        lambda cls, *args: cls._make_dir(config.datafilepath('apicache')))
+    config.minthrottle = config.maxthrottle = config.put_throttle = 0
+    config.retry_wait = 0.1
+    config.max_retries = 20
+    try:
+        with MockAPIServer(MockWiki(pages=args.pages, entities=args.pages),
+                           latency=args.latency, maxlag=args.maxlag, lag=0,
+                           error_rate=args.errors) as server:
+            site = server.site()
+            site.login()
+            results = run_flows(server, site, args)
+    finally:
+        api.CachedRequest._get_cache_dir = get_cache_dir
+        shutil.rmtree(config.base_dir)
+        config.base_dir = base_dir
+
+    pywikibot.output('{0:<20} {1:>9} {2:>9} {3:>10} {4:>10} {5:>10}'.format(
+        'flow', 'seconds', 'requests', 'requests/s', 'pages/s', 'memory MB'))
+    for name, seconds, requests, pages, memory in results:
+        pywikibot.output(
+            '{0:<20} {1:>9.2f} {2:>9} {3:>10.1f} {4:>10.1f} {5:>10.1f}'
+            .format(name, seconds, requests, requests / seconds,
+                    pages / seconds, memory))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Benchmark of pywikibot.diff on a large page."""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import codecs
+import sys
+
+from pywikibot.diff import PatchManager
+
+from tests import join_pages_path
+from tests.benchmarks import run_suite
+
+# Number of copies of the fixture page joined to a large page
+COPIES = 50
+
+
+def load_text():
+    """Return a large page with distinct lines like a list article."""
+    with codecs.open(join_pages_path('enwiki_help_editing.page'),
+                     'r', 'utf-8') as f:
+        lines = f.read().splitlines(True)
+    return ''.join('{0} {1}'.format(copy, line)
+                   for copy in range(COPIES) for line in lines)
+
+
+def change_lines(text, step):
+    """Return text with every step-th line changed."""
+    lines = text.splitlines(True)
+    for i in range(0, len(lines), step):
+        lines[i] = 'changed ' + lines[i]
+    return ''.join(lines)
+
+
+def summary(patch):
+    """Return the summary lines printed by PatchManager.print_hunks."""
+    return [patch._generate_summary(hunks) for hunks in patch._super_hunks]
+
+
+def main():
+    """Run the benchmarks."""
+    old = load_text()
+    single_change = old.replace('25 ', '25 changed ', 1)
+    many_changes = change_lines(old, 500)
+    line = max(old.splitlines(), key=len)
+    return run_suite([
+        ('PatchManager, single change',
+         lambda: PatchManager(old, single_change)),
+        ('PatchManager, many changes',
+         lambda: PatchManager(old, many_changes)),
+        ('PatchManager, many changes, colored hunks',
+         lambda: [hunk.diff_text
+                  for hunk in PatchManager(old, many_changes).hunks]),
+        ('PatchManager, many changes, summary',
+         lambda: summary(PatchManager(old, many_changes))),
+        ('PatchManager by_letter',
+         lambda: PatchManager(line, line.replace('a', 'b'), by_letter=True)),
+    ], __doc__)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
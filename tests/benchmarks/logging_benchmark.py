@@ -0,0 +1,102 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Benchmark of the overhead of logging calls."""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import logging
+import os
+import shutil
+import tempfile
+
+from pywikibot import logging as pwb_logging
+from pywikibot.tools._logging import (
+    LoggingFormatter, QueueHandler, RotatingFileHandler,
+)
+
+from tests.benchmarks import run
+
+if QueueHandler:
+    from logging.handlers import QueueListener
+
+    try:
+        from queue import Queue
+    except ImportError:
+        from Queue import Queue
+
+# An API response like the ones logged by the query generators
+PAGEDATA = {
+    'pageid': 12345, 'ns': 0, 'title': 'Benchmark',
+    'revisions': [{'revid': 67890, 'user': 'Example',
+                   'timestamp': '2017-01-01T00:00:00Z',
+                   '*': 'Lorem ipsum dolor sit amet. ' * 200}],
+}
+
+# Name of the debug layer used by the benchmarks
+LAYER = 'benchmark'
+
+
+def file_handler(directory, name):
+    """Return a file handler like the one of bot.init_handlers."""
+    handler = RotatingFileHandler(
+        filename=os.path.join(directory, name), maxBytes=0, backupCount=0)
+    handler.setLevel(pwb_logging.DEBUG)
+    handler.setFormatter(LoggingFormatter(
+        fmt='%(asctime)s %(caller_file)18s, %(caller_line)4s '
+            'in %(caller_name)18s: %(levelname)-8s %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'))
+    return handler
+
+
+def use_handler(handler):
+    """Enable debug records of the layer and send them to the handler."""
+    logger = logging.getLogger('pywiki.' + LAYER)
+    logger.handlers = [handler] if handler else []
+    logger.propagate = False
+    logger.setLevel(pwb_logging.DEBUG if handler else pwb_logging.INFO)
+
+
+def main():
+    """Run the benchmarks."""
+    directory = tempfile.mkdtemp()
+    listener = None
+    try:
+        use_handler(None)
+        run([
+            ('debug() disabled, formatted text',
+             lambda: pwb_logging.debug('Preloading %s' % PAGEDATA, LAYER)),
+            ('debug() disabled, lazy text',
+             lambda: pwb_logging.debug(lambda: 'Preloading %s' % PAGEDATA,
+                                       LAYER)),
+            ('debug() disabled, short text',
+             lambda: pwb_logging.debug('Request submitted', LAYER)),
+        ])
+
+        handler = file_handler(directory, 'direct.log')
+        use_handler(handler)
+        run([('debug() to file handler',
+              lambda: pwb_logging.debug('Request submitted', LAYER))])
+        handler.close()
+
+        if QueueHandler:
+            handler = file_handler(directory, 'queued.log')
+            log_queue = Queue()
+            listener = QueueListener(log_queue, handler)
+            listener.start()
+            use_handler(QueueHandler(log_queue))
+            run([('debug() to queue handler',
+                  lambda: pwb_logging.debug('Request submitted', LAYER))])
+    finally:
+        if listener:
+            listener.stop()
+            handler.close()
+        use_handler(None)
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
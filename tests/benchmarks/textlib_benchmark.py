@@ -0,0 +1,146 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Benchmark of textlib, Link parsing and cosmetic_changes.
+
+The fixtures are the real article enwiki_help_editing.page and a large list
+article generated from fixed data. The sites are dry, so that no request is
+made.
+"""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import codecs
+import sys
+import warnings
+
+import pywikibot
+
+from pywikibot import config, textlib
+from pywikibot.cosmetic_changes import CosmeticChangesToolkit
+from pywikibot.textlib import TimeStripper
+
+from tests import join_data_path, join_pages_path
+from tests.benchmarks import run_suite
+from tests.benchmarks.timestripper_benchmark import EnglishSite
+from tests.utils import DrySite, DrySiteNote
+
+# Number of rows of the list article
+ROWS = 500
+
+LANGUAGES = ['ar', 'de', 'es', 'fa', 'fr', 'it', 'ja', 'nl', 'pl', 'pt',
+             'ru', 'sv', 'uk', 'zh']
+
+EXCEPTIONS = ['comment', 'nowiki', 'pre', 'source', 'template', 'link']
+
+
+def dry_site():
+    """Return a dry English Wikipedia whose language links are dry too."""
+    config.site_interface = DrySite
+    site = pywikibot.Site('en', 'wikipedia')
+    site._siteinfo._cache['general'] = ({'articlepath': '/wiki/$1'}, True)
+    return site
+
+
+def help_page():
+    """Return the text of the real article."""
+    with codecs.open(join_pages_path('enwiki_help_editing.page'),
+                     'r', 'utf-8') as f:
+        return f.read()
+
+
+def list_article(rows=ROWS):
+    """Return the text of a large list article with references."""
+    lines = [
+        '{{Use dmy dates|date=August 2017}}',
+        "This is a '''list of towns''' sorted by region.<!-- keep sorted -->",
+        '',
+        '== Towns ==',
+    ]
+    for i in range(rows):
+        lines.append(
+            "* [[Town {0}]], [[Region {1}|region {1}]] "
+            "{{{{flagicon|Country {2}}}}} &ndash; population {3:,}"
+            "<ref>{{{{cite web|url=http://example.org/census/{0}"
+            "|title=Census of Town {0}|accessdate=1 May 2017}}}}</ref>"
+            .format(i, i % 40, i % 7, i * 37))
+    lines += ['', '== References ==', '{{reflist}}', '']
+    lines += ['[[Category:Lists of towns]]',
+              '[[Category:Lists of populated places|Towns]]', '']
+    lines += ['[[{0}:List of towns]]'.format(lang) for lang in LANGUAGES]
+    return '\n'.join(lines)
+
+
+def talk_page_lines():
+    """Return the lines of the talk page fixture."""
+    with codecs.open(join_data_path('talkpage.txt'), 'r', 'utf-8') as f:
+        return f.read().splitlines()
+
+
+def text_benchmarks(name, text, site, links):
+    """Return the textlib benchmarks of a text."""
+    return [
+        ('replaceExcept, ' + name,
+         lambda: textlib.replaceExcept(text, r'\bwiki\b', 'Wiki',
+                                       EXCEPTIONS, site=site)),
+        ('extract_templates_and_params, ' + name,
+         lambda: textlib.extract_templates_and_params(text)),
+        ('extract_templates_and_params_regex, ' + name,
+         lambda: textlib.extract_templates_and_params_regex(text)),
+        ('extract_templates_and_params_regex_simple, ' + name,
+         lambda: textlib.extract_templates_and_params_regex_simple(text)),
+        ('getCategoryLinks, ' + name,
+         lambda: textlib.getCategoryLinks(text, site)),
+        ('getLanguageLinks, ' + name,
+         lambda: textlib.getLanguageLinks(text, site)),
+        ('replace_links, ' + name,
+         lambda: textlib.replace_links(text, links, site)),
+    ]
+
+
+def cosmetic_benchmarks(name, text, site):
+    """Return the benchmarks of each cosmetic change and of all of them."""
+    cct = CosmeticChangesToolkit(site, namespace=0, pageTitle='Benchmark')
+    benchmarks = [
+        ('cosmetic_changes.{0}, {1}'.format(method.__name__, name),
+         lambda method=method: method(text))
+        for method in cct.common_methods]
+    benchmarks.append(('cosmetic_changes.change, ' + name,
+                       lambda: cct.change(text)))
+    return benchmarks
+
+
+def main():
+    """Run the benchmarks."""
+    warnings.simplefilter('ignore', DrySiteNote)
+    warnings.simplefilter('ignore', DeprecationWarning)
+    site = dry_site()
+    help_text = help_page()
+    list_text = list_article()
+    titles = ['Help:Editing', 'Wikipedia:Sandbox', 'Talk:Main Page',
+              ':Category:Help', 'de:Hilfe:Bearbeiten', 'Foo#Section',
+              'foo bar_baz'] * 100
+    timestripper = TimeStripper(EnglishSite())
+    lines = talk_page_lines()
+
+    benchmarks = text_benchmarks('help page', help_text, site,
+                                 ('Wikipedia', 'Wiki'))
+    benchmarks += text_benchmarks('list article', list_text, site,
+                                  ('Region 1', 'Region one'))
+    benchmarks += [
+        ('Link.parse, {0} titles'.format(len(titles)),
+         lambda: [pywikibot.Link(title, site).parse() for title in titles]),
+        ('TimeStripper, talk page',
+         lambda: [timestripper.timestripper(line) for line in lines]),
+    ]
+    benchmarks += cosmetic_benchmarks('help page', help_text, site)
+    benchmarks += cosmetic_benchmarks('list article', list_text, site)
+    return run_suite(benchmarks, __doc__.splitlines()[1])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Benchmark of TimeStripper and archivebot on talk pages."""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import codecs
+import sys
+import datetime
+
+from pywikibot.textlib import TimeStripper
+
+from scripts.archivebot import DiscussionThread
+
+from tests import join_data_path
+from tests.benchmarks import run_suite
+
+# Number of copies of the fixture page joined to a large noticeboard
+COPIES = 50
+
+
+class EnglishSite(object):
+
+    """Offline site providing what TimeStripper needs."""
+
+    code = 'en'
+    months_names = [
+        ('January', 'Jan'), ('February', 'Feb'), ('March', 'Mar'),
+        ('April', 'Apr'), ('May', 'May'), ('June', 'Jun'),
+        ('July', 'Jul'), ('August', 'Aug'), ('September', 'Sep'),
+        ('October', 'Oct'), ('November', 'Nov'), ('December', 'Dec'),
+    ]
+    siteinfo = {'timeoffset': 0, 'timezone': 'UTC'}
+
+
+def load_lines():
+    """Return the lines of a large noticeboard."""
+    with codecs.open(join_data_path('talkpage.txt'), 'r', 'utf-8') as f:
+        lines = f.read().splitlines()
+    return lines * COPIES
+
+
+def feed_lines(timestripper, lines):
+    """Feed the lines into a discussion thread like archivebot does."""
+    thread = DiscussionThread('Benchmark', datetime.datetime.utcnow(),
+                              timestripper)
+    for line in lines:
+        thread.feed_line(line)
+    return thread.timestamp
+
+
+def main():
+    """Run the benchmarks."""
+    site = EnglishSite()
+    timestripper = TimeStripper(site)
+    lines = load_lines()
+    signed = [line for line in lines if timestripper.timestripper(line)]
+    unsigned = [line for line in lines
+                if not timestripper.timestripper(line)]
+    return run_suite([
+        ('TimeStripper construction', lambda: TimeStripper(site)),
+        ('TimeStripper, signed lines',
+         lambda: [timestripper.timestripper(line) for line in signed]),
+        ('TimeStripper, unsigned lines',
+         lambda: [timestripper.timestripper(line) for line in unsigned]),
+        ('DiscussionThread.feed_line, noticeboard',
+         lambda: feed_lines(timestripper, lines)),
+    ], __doc__)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
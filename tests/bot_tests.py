@@ -8,6 +8,14 @@
 from __future__ import absolute_import, unicode_literals
 
 import sys
+import threading
+import time
+import traceback
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
 
 import pywikibot
 import pywikibot.bot
@@ -299,6 +307,88 @@ class TestDrySiteBot(TestBotTreatExit, SiteAttributeTestCase):
         self.bot.exit = self._exit(2, exception=exc)
         self.bot.run()
 
+    def _concurrent_bot(self, treat_page=None):
+        """Return a concurrent CurrentPageBot recording the pages."""
+        self._treated = []
+        lock = threading.Lock()
+
+        def record():
+            page = self.bot.current_page
+            # give the other threads the chance to change the current page
+            time.sleep(0.01)
+            self.assertIs(self.bot.current_page, page)
+            with lock:
+                self._treated.append(page.title())
+            if treat_page:
+                treat_page(page)
+
+        self.bot = pywikibot.bot.CurrentPageBot(generator=self._generator(),
+                                                always=True)
+        self.bot.concurrent = True
+        self.bot.treat_page = record
+        self.bot.exit = lambda: None
+        return self.bot
+
+    def test_CurrentPageBot_concurrent(self):
+        """Test CurrentPageBot treating pages concurrently."""
+        self._concurrent_bot().run()
+        self.assertEqual(sorted(self._treated),
+                         ['Page 1', 'Page 2', 'Page 3', 'Page 4'])
+        self.assertEqual(self.bot._treat_counter, 4)
+        self.assertIsNone(self.bot.current_page)
+
+    def test_CurrentPageBot_concurrent_ValueError(self):
+        """Test concurrent CurrentPageBot with a ValueError in treat."""
+        def treat_page(page):
+            if page.title() == 'Page 3':
+                raise ValueError('Whatever')
+
+        bot = self._concurrent_bot(treat_page)
+        try:
+            bot.run()
+        except ValueError:
+            tb = sys.exc_info()[2]
+        else:
+            self.fail('ValueError not raised')
+        # the traceback of the worker thread is kept
+        self.assertIn('treat_page',
+                      [entry[2] for entry in traceback.extract_tb(tb)])
+        self.assertIn('Page 3', self._treated)
+        self.assertLess(bot._treat_counter, len(self._treated))
+
+    def test_CurrentPageBot_concurrent_userPut(self):
+        """Test that concurrent saves with userPut are serialized per site."""
+        lock = threading.Lock()
+        saving = dict((site, 0) for site in (self.de, self.en))
+        most = dict(saving)
+
+        def save(page, *args, **kwargs):
+            with lock:
+                saving[page.site] += 1
+                most[page.site] = max(most[page.site], saving[page.site])
+            time.sleep(0.01)
+            with lock:
+                saving[page.site] -= 1
+
+        def treat_page(page):
+            self.bot.userPut(page, 'old', 'new', show_diff=False)
+
+        bot = self._concurrent_bot(treat_page)
+        with patch.object(pywikibot.Page, 'save', save):
+            bot.run()
+        self.assertEqual(bot._save_counter, 4)
+        self.assertEqual(most, {self.de: 1, self.en: 1})
+
+    def test_CurrentPageBot_concurrent_quit(self):
+        """Test concurrent CurrentPageBot when the user quits."""
+        def treat_page(page):
+            if page.title() == 'Page 1':
+                raise pywikibot.bot.QuitKeyboardInterrupt
+
+        bot = self._concurrent_bot(treat_page)
+        bot.run()
+        self.assertLess(bot._treat_counter, 4)
+
 
 # TODO: This could be written as dry tests probably by faking the important
 # properties
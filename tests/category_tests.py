@@ -209,6 +209,115 @@ class TestCategoryDryObject(TestCase):
         self.assertEqual(cat.aslink(sortKey='Foo'), '[[Category:Wikipedia categories|Foo]]')
 
 
+class TestCategoryTraversal(TestCase):
+
+    """Test the recursive traversal of a category tree without requests."""
+
+    family = 'wikipedia'
+    code = 'en'
+
+    dry = True
+
+    # members of each category; names of categories start with 'Category:'
+    TREE = {
+        'A': ['Category:B', 'Category:C', 'A1'],
+        'B': ['Category:D', 'Category:A', 'B1'],
+        'C': ['Category:D', 'C1'],
+        'D': ['D1'],
+    }
+
+    PAGEIDS = {
+        'Category:A': 1, 'Category:B': 2, 'Category:C': 3, 'Category:D': 4,
+        'A1': 11, 'B1': 12, 'C1': 13, 'D1': 14,
+    }
+
+    def setUp(self):
+        """Replace categorymembers of the site."""
+        super(TestCategoryTraversal, self).setUp()
+        self.site = self.get_site()
+        self.site.categorymembers = self.categorymembers
+        self.queried = []
+
+    def tearDown(self):
+        """Restore categorymembers of the site."""
+        del self.site.categorymembers
+        super(TestCategoryTraversal, self).tearDown()
+
+    def categorymembers(self, category, namespaces=None, total=None,
+                        content=False, member_type=None, **kwargs):
+        """Yield the members of a category of the tree."""
+        name = category.title(withNamespace=False)
+        self.queried.append(name)
+        if member_type == 'subcat':
+            titles = [title for title in self.TREE[name]
+                      if title.startswith('Category:')]
+        elif member_type:
+            titles = [title for title in self.TREE[name]
+                      if not title.startswith('Category:')]
+        else:
+            titles = self.TREE[name]
+        for title in titles[:total]:
+            if title.startswith('Category:'):
+                page = pywikibot.Category(self.site, title)
+            else:
+                page = pywikibot.Page(self.site, title)
+            page._pageid = self.PAGEIDS[title]
+            yield page
+
+    def category(self, name):
+        """Return a category of the tree."""
+        return pywikibot.Category(self.site, 'Category:' + name)
+
+    def titles(self, pages):
+        """Return the titles of the pages without namespaces."""
+        return [page.title(withNamespace=False) for page in pages]
+
+    def test_subcategories(self):
+        """Test that each subcategory is iterated once level by level."""
+        self.assertEqual(self.titles(self.category('A').subcategories()),
+                         ['B', 'C'])
+        self.assertEqual(
+            self.titles(self.category('A').subcategories(recurse=True)),
+            ['B', 'C', 'D'])
+        self.assertEqual(
+            self.titles(self.category('A').subcategories(recurse=1)),
+            ['B', 'C', 'D'])
+        self.assertEqual(
+            self.titles(self.category('B').subcategories(recurse=1)),
+            ['D', 'A', 'C'])
+        self.assertEqual(
+            self.titles(self.category('A').subcategories(recurse=True,
+                                                         total=2)),
+            ['B', 'C'])
+
+    def test_subcategories_cached(self):
+        """Test that the direct subcategories are cached when complete."""
+        cat = self.category('A')
+        list(cat.subcategories(total=1))
+        list(cat.subcategories())
+        list(cat.subcategories())
+        self.assertEqual(self.queried, ['A', 'A'])
+
+    def test_articles(self):
+        """Test that the articles of each subcategory are iterated once."""
+        self.assertEqual(self.titles(self.category('A').articles()), ['A1'])
+        self.assertEqual(
+            self.titles(self.category('A').articles(recurse=True)),
+            ['A1', 'B1', 'C1', 'D1'])
+        self.assertEqual(
+            self.titles(self.category('A').articles(recurse=1)),
+            ['A1', 'B1', 'C1'])
+        self.assertEqual(
+            self.titles(self.category('A').articles(recurse=True, total=3)),
+            ['A1', 'B1', 'C1'])
+
+    def test_members(self):
+        """Test the members of the subcategories."""
+        self.assertEqual(
+            self.titles(self.category('C').members(recurse=True)),
+            ['D', 'C1', 'D1'])
+
+
 class CategoryNewestPages(TestCase):
 
     """Test newest_pages feature on French Wikinews."""
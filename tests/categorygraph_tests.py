@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""Tests for the local category graph."""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+import shutil
+import tempfile
+
+try:
+    from unittest.mock import Mock, patch
+except ImportError:
+    from mock import Mock, patch
+
+import pywikibot
+
+from pywikibot import config
+from pywikibot.data import categorygraph
+from pywikibot.data.categorygraph import CategoryGraph
+
+from tests.aspects import unittest, TestCase
+
+
+class CategoryGraphTestCase(TestCase):
+
+    """Test case with a small stored category tree."""
+
+    family = 'wikipedia'
+    code = 'en'
+
+    dry = True
+
+    def setUp(self):
+        """Use a temporary base directory and store a small tree."""
+        super(CategoryGraphTestCase, self).setUp()
+        self._base_dir = config.base_dir
+        config.base_dir = tempfile.mkdtemp()
+        self.graph = CategoryGraph(self.site)
+        with self.graph.db:
+            self.graph._store_pages([(1, 14, 'Category:A')])
+            self.graph._set_members(1, [(2, 14, 'Category:B'),
+                                        (3, 0, 'Foo'),
+                                        (4, 6, 'File:X.png')])
+            self.graph._set_members(2, [(5, 14, 'Category:C'), (3, 0, 'Foo')])
+            self.graph._set_members(5, [(1, 14, 'Category:A')])
+
+    def tearDown(self):
+        """Remove the temporary base directory."""
+        self.graph.close()
+        shutil.rmtree(config.base_dir)
+        config.base_dir = self._base_dir
+        super(CategoryGraphTestCase, self).tearDown()
+
+    def category(self, name):
+        """Return a category of the site."""
+        return pywikibot.Category(self.site, 'Category:' + name)
+
+
+class TestCategoryGraph(CategoryGraphTestCase):
+
+    """Test the stored graph without requests."""
+
+    def test_members(self):
+        """Test the subcategories, articles and numbers of members."""
+        self.assertEqual(self.graph.subcategories(self.category('A')),
+                         [self.category('B')])
+        self.assertEqual(self.graph.articles(self.category('A')),
+                         [pywikibot.FilePage(self.site, 'File:X.png'),
+                          pywikibot.Page(self.site, 'Foo')])
+        self.assertEqual(self.graph.categoryinfo(self.category('A')),
+                         {'size': 3, 'pages': 1, 'files': 1, 'subcats': 1})
+
+    def test_parents(self):
+        """Test that categories without a page get negative IDs."""
+        with self.graph.db:
+            self.graph._set_parents(3, [(1, 'Category:A'),
+                                        (None, 'Category:Missing')])
+        page = pywikibot.Page(self.site, 'Foo')
+        self.assertEqual(self.graph.supercategories(page),
+                         [self.category('A'), self.category('Missing')])
+        self.assertLess(self.graph._page_id(self.category('Missing')), 0)
+        with self.graph.db:
+            self.graph._store_pages([(10, 14, 'Category:Missing')])
+        self.assertEqual(self.graph._page_id(self.category('Missing')), 10)
+        self.assertEqual(self.graph.supercategories(page),
+                         [self.category('A'), self.category('Missing')])
+
+    def test_walk(self):
+        """Test that each category is walked once, breadth first."""
+        self.assertEqual(list(self.graph.walk(self.category('A'))),
+                         [(self.category('A'), 0), (self.category('B'), 1),
+                          (self.category('C'), 2)])
+        self.assertEqual(list(self.graph.walk(self.category('A'), depth=1)),
+                         [(self.category('A'), 0), (self.category('B'), 1)])
+
+    def test_replaced_page(self):
+        """Test that a page stored with another ID is removed."""
+        with self.graph.db:
+            self.graph._store_pages([(6, 0, 'Foo')])
+        self.assertEqual(self.graph.db.execute(
+            'SELECT COUNT(*) FROM edges WHERE child IN (3, 6)').fetchone(),
+            (0, ))
+        # the members of the categories of the old page are outdated
+        self.assertEqual(self.graph.db.execute(
+            'SELECT members FROM pages WHERE pageid IN (1, 2)').fetchall(),
+            [(0, ), (0, )])
+
+    def test_persistent(self):
+        """Test that the graph is kept when opened again."""
+        self.graph.close()
+        self.graph = CategoryGraph(self.site)
+        self.assertEqual(self.graph.subcategories(self.category('B')),
+                         [self.category('C')])
+
+
+class TestCategoryGraphUpdate(CategoryGraphTestCase):
+
+    """Test outdating the stored graph with stubbed changes."""
+
+    start = pywikibot.Timestamp(2017, 1, 1)
+    now = pywikibot.Timestamp(2017, 1, 2)
+
+    def setUp(self):
+        """Stub the recent changes, logs and time of the site."""
+        super(TestCategoryGraphUpdate, self).setUp()
+        with self.graph.db:
+            self.graph._set_parents(3, [(1, 'Category:A'),
+                                        (2, 'Category:B')])
+            self.graph._set_state('updated', self.start.isoformat())
+        self.changes = []
+        self.logs = {'delete': [], 'move': []}
+        self.revisions = []
+        for patcher in (
+                patch.object(self.site, 'version', return_value='1.28.0'),
+                patch.object(self.site, 'server_time',
+                             side_effect=lambda: self.now),
+                patch.object(self.site, 'recentchanges',
+                             side_effect=lambda **kwargs: self.changes),
+                patch.object(self.site, 'logevents',
+                             side_effect=lambda logtype, **kwargs:
+                             self.logs[logtype]),
+                patch.object(categorygraph.api, 'PropertyGenerator',
+                             side_effect=lambda *args, **kwargs:
+                             self.revisions)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def loaded(self, pageid):
+        """Return whether the members and categories of a page are loaded."""
+        return self.graph.db.execute(
+            'SELECT members, parents FROM pages WHERE pageid = ?',
+            (pageid, )).fetchone()
+
+    def log_entry(self, action='', target=None, **data):
+        """Return a stubbed log entry."""
+        entry = Mock(data=data)
+        entry.action.return_value = action
+        if target:
+            entry.target_ns.id = int(target.namespace())
+            entry.target_title = target.title()
+        return entry
+
+    def test_update_categorize(self):
+        """Test that categorized pages and their categories are outdated."""
+        self.changes = [{'title': 'Category:B', 'revid': 100}]
+        self.revisions = [{'pageid': 3, 'title': 'Foo'}]
+        self.graph.update()
+        self.site.recentchanges.assert_called_once_with(
+            start=self.start.isoformat(), reverse=True,
+            changetype='categorize')
+        self.assertEqual(self.loaded(1), (1, 0))
+        self.assertEqual(self.loaded(2), (0, 0))
+        self.assertEqual(self.loaded(3), (0, 0))
+        self.assertEqual(self.graph._get_state('updated'),
+                         self.now.isoformat())
+
+    def test_update_deletion(self):
+        """Test that deleted pages are removed."""
+        self.logs['delete'] = [self.log_entry('delete', title='Foo'),
+                               self.log_entry('restore', title='File:X.png')]
+        self.graph.update()
+        self.assertIsNone(self.loaded(3))
+        self.assertEqual(self.graph.db.execute(
+            'SELECT COUNT(*) FROM edges WHERE child = 3').fetchone(), (0, ))
+        self.assertEqual(self.loaded(1), (0, 0))
+        self.assertEqual(self.loaded(2), (0, 0))
+        self.assertEqual(self.loaded(4), (0, 0))
+
+    def test_update_move(self):
+        """Test that moved pages keep their ID and edges."""
+        self.logs['move'] = [
+            self.log_entry(pageid=2, target=self.category('D')),
+            self.log_entry(pageid=4,
+                           target=pywikibot.Page(self.site, 'Foo')),
+            self.log_entry(actionhidden='', pageid=5)]
+        self.graph.update()
+        self.assertEqual(self.graph.db.execute(
+            'SELECT title FROM edges JOIN pages ON child = pageid '
+            'WHERE parent = 1 AND ns = 14').fetchall(), [('Category:D', )])
+        self.assertEqual(self.graph._page_id(self.category('D')), 2)
+        self.assertEqual(self.loaded(2), (0, 0))
+        # the page moved onto Foo replaced it, outdating its categories
+        self.assertIsNone(self.loaded(3))
+        self.assertEqual(self.loaded(1), (0, 0))
+        self.assertEqual(
+            self.graph._page_id(pywikibot.Page(self.site, 'Foo')), 4)
+        self.assertEqual(self.graph._page_id(self.category('C')), 5)
+
+    def test_update_expired(self):
+        """Test that the graph is outdated when the changes are too old."""
+        self.now = self.start + categorygraph.RC_MAX_AGE + datetime.timedelta(
+            seconds=1)
+        self.graph.update()
+        self.assertFalse(self.site.recentchanges.called)
+        self.assertEqual(self.graph.db.execute(
+            'SELECT MAX(members), MAX(parents) FROM pages').fetchone(),
+            (0, 0))
+        self.assertEqual(self.graph._get_state('updated'),
+                         self.now.isoformat())
+
+
+if __name__ == '__main__':  # pragma: no cover
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
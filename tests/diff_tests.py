@@ -189,6 +189,29 @@ class TestPatchManager(TestCase):
             for key in case[2].keys():  # for each hunk
                 self.assertEqual(p.hunks[key].diff_plain_text, case[2][key])
 
+    def test_common_prefix_suffix(self):
+        """Test PatchManager with long unchanged parts around the changes."""
+        lines = ['line {0}\n'.format(i) for i in range(1000)]
+        text_a = ''.join(lines)
+        text_b = ''.join(lines[:10] + ['new\n'] + lines[10:500] +
+                         lines[501:998] + ['changed\n'] + lines[999:])
+        p = PatchManager(text_a, text_b)
+        self.assertEqual([(h.a_rng, h.b_rng) for h in p.hunks],
+                         [((10, 10), (10, 11)), ((500, 501), (501, 501)),
+                          ((998, 999), (998, 999))])
+        for hunk in p.hunks:
+            hunk.reviewed = hunk.APPR
+        self.assertEqual(''.join(p.apply()), text_b)
+        self.assertIsNone(p.hunks[0]._diff_text)
+
+    @patch('pywikibot.output')
+    def test_print_hunks_summary(self, mock):
+        """Test PatchManager.print_hunks with summary."""
+        p = PatchManager('a\nb\nc\n', 'a\nx\ny\nc\n')
+        p.print_hunks(summary=True)
+        mock.assert_called_once_with('@@ -2 +2,2 @@ (1 removed, 2 added)')
+        self.assertIsNone(p.hunks[0]._diff)
+
 
 class TestCherryPick(TestCase):
 
@@ -7,11 +7,17 @@
 #
 from __future__ import absolute_import, unicode_literals
 
+import itertools
+import os
+import shutil
+import tempfile
+import time
+
 from types import FunctionType
 
 import mock
 
-from pywikibot.comms.eventstreams import EventStreams
+from pywikibot.comms.eventstreams import EventStreams, FileCheckpoint
 from pywikibot import config
 from pywikibot.family import WikimediaFamily
 
@@ -220,6 +226,130 @@ class TestEventStreamsFilterTests(TestCase):
                         result = False
                     self._test_filter(none_type, all_type, any_type, result)
 
+    def test_filter_multiple_keys(self):
+        """Test EventStreams filter with several keys at once."""
+        self.es.register_filter(foo=True, bar='baz')
+        self.assertTrue(self.es.streamfilter(self.data))
+        self.es.register_filter(foo=True, bar='foo')
+        self.assertFalse(self.es.streamfilter(self.data))
+
+    def test_filter_any_values(self):
+        """Test EventStreams filter with several values of one key."""
+        self.es.register_filter(bar='foo', ftype='any')
+        self.assertFalse(self.es.streamfilter(self.data))
+        self.es.register_filter(bar=('bar', 'baz'), ftype='any')
+        self.assertTrue(self.es.streamfilter(self.data))
+        self.es.register_filter(bar=['baz'], ftype='none')
+        self.assertFalse(self.es.streamfilter(self.data))
+        self.assertFalse(self.es.streamfilter({'bar': ['unhashable']}))
+
+
+class TestEventStreamsBatches(TestCase):
+
+    """Test reading events in a background thread."""
+
+    dry = True
+
+    def _stream(self, **kwargs):
+        """Return a stream repeating 20 events."""
+        events = [mock.Mock(event='message', id=str(i),
+                            data='{{"i": {0}}}'.format(i))
+                  for i in range(20)]
+        with mock.patch('pywikibot.comms.eventstreams.EventSource'):
+            stream = EventStreams(url='dummy url', **kwargs)
+        source = mock.patch('pywikibot.comms.eventstreams.EventSource',
+                            return_value=itertools.cycle(events))
+        source.start()
+        self.addCleanup(source.stop)
+        return stream
+
+    def test_batches(self):
+        """Test EventStreams batches."""
+        stream = self._stream()
+        stream.register_filter(lambda data: data['i'] % 2)
+        stream.set_maximum_items(8)
+        batches = [[data['i'] for data in batch]
+                   for batch in stream.batches(size=3)]
+        self.assertEqual(batches, [[1, 3, 5], [7, 9, 11], [13, 15]])
+        statistics = stream.statistics()
+        self.assertEqual(statistics['delivered'], 8)
+        self.assertGreaterEqual(statistics['received'], 16)
+
+    def test_buffered_iterator(self):
+        """Test EventStreams iterating with a buffer."""
+        stream = self._stream(buffer_size=100)
+        stream.set_maximum_items(5)
+        self.assertEqual([data['i'] for data in stream], [0, 1, 2, 3, 4])
+        self.assertNotIn('buffer_size', stream.sse_kwargs)
+
+    def test_checkpoint_backpressure(self):
+        """Test that no event is dropped when there is a checkpoint."""
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        checkpoint = FileCheckpoint(os.path.join(path, 'checkpoint'),
+                                    interval=1)
+        stream = self._stream(buffer_size=1, checkpoint=checkpoint)
+        stream.set_maximum_items(10)
+        delivered = []
+        for batch in stream.batches(size=2):
+            # let the reader fill the buffer
+            time.sleep(0.01)
+            delivered += [data['i'] for data in batch]
+        self.assertEqual(delivered, list(range(10)))
+        self.assertEqual(stream.statistics().get('dropped', 0), 0)
+        self.assertEqual(checkpoint.load(), '9')
+
+
+class TestEventStreamsCheckpoint(TestCase):
+
+    """Test checkpoints, recording and replaying events."""
+
+    dry = True
+
+    def setUp(self):
+        """Set up a temporary directory."""
+        super(TestEventStreamsCheckpoint, self).setUp()
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.log = os.path.join(self.path, 'events.log')
+        self.checkpoint = os.path.join(self.path, 'checkpoint')
+
+    def test_file_checkpoint(self):
+        """Test FileCheckpoint writing ids in intervals."""
+        checkpoint = FileCheckpoint(self.checkpoint, interval=2, delay=60)
+        self.assertIsNone(checkpoint.load())
+        checkpoint.commit('1')
+        self.assertIsNone(checkpoint.load())
+        checkpoint.commit('2')
+        self.assertEqual(checkpoint.load(), '2')
+        checkpoint.commit('3')
+        checkpoint.flush()
+        self.assertEqual(FileCheckpoint(self.checkpoint).load(), '3')
+        self.assertEqual(os.listdir(self.path), ['checkpoint'])
+
+    def test_record_and_replay(self):
+        """Test recording events and replaying them from a checkpoint."""
+        events = [mock.Mock(event='message', id=str(i),
+                            data='{{"i": {0}}}'.format(i))
+                  for i in range(10)]
+        with mock.patch('pywikibot.comms.eventstreams.EventSource',
+                        return_value=iter(events)):
+            stream = EventStreams(url='dummy url', record=self.log)
+            stream.set_maximum_items(6)
+            self.assertEqual([data['i'] for data in stream], list(range(6)))
+
+        checkpoint = FileCheckpoint(self.checkpoint, interval=1)
+        stream = EventStreams(replay=self.log, checkpoint=checkpoint)
+        stream.register_filter(lambda data: data['i'] % 2)
+        stream.set_maximum_items(2)
+        self.assertEqual([data['i'] for data in stream], [1, 3])
+        self.assertEqual(checkpoint.load(), '3')
+
+        stream = EventStreams(url='file://' + self.log,
+                              checkpoint=FileCheckpoint(self.checkpoint))
+        self.assertEqual([data['i'] for data in stream], [4, 5])
+        self.assertEqual(checkpoint.load(), '5')
+
 
 if __name__ == '__main__':  # pragma: no cover
     try:
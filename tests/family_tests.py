@@ -7,8 +7,13 @@
 #
 from __future__ import absolute_import, unicode_literals
 
+import os
+import shutil
+import tempfile
+
 import pywikibot.site
 
+from pywikibot import config
 from pywikibot.exceptions import UnknownFamily
 from pywikibot.family import Family, SingleSiteFamily
 from pywikibot.tools import StringTypes as basestring
@@ -165,6 +170,26 @@ class TestFamily(TestCase):
             'obsolete',
             {'a': 'b', 'c': None})
 
+    def test_domain_index(self):
+        """Test the hostname index used to resolve URLs."""
+        base_dir = config.base_dir
+        domain_index = Family._domain_index
+        config.base_dir = tempfile.mkdtemp()
+        Family._domain_index = None
+        try:
+            index = Family.domain_index()
+            self.assertTrue(os.path.exists(
+                config.datafilepath('families-index.json')))
+            self.assertIs(Family.domain_index(), index)
+        finally:
+            shutil.rmtree(config.base_dir)
+            config.base_dir = base_dir
+            Family._domain_index = domain_index
+        self.assertIn(('wikipedia', 'en'), index['en.wikipedia.org'])
+        self.assertEqual(index['test.wikipedia.org'], [('test', 'test')])
+        self.assertEqual(index['wikiapiary.com'], [('wikiapiary', 'wikiapiary')])
+        self.assertNotIn('unknown.wikipedia.org', index)
+
 
 class TestFamilyUrlRegex(PatchingTestCase):
 
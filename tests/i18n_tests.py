@@ -7,6 +7,11 @@
 #
 from __future__ import absolute_import, unicode_literals
 
+import json
+import os
+
+from collections import defaultdict
+
 import pywikibot
 
 from pywikibot import i18n, bot, plural
@@ -336,6 +341,65 @@ class TestTWNTranslate(TWNTestCaseBase, AutoDeprecationTestCase):
             u'Robot: Changer seulement une page.')
 
 
+class TestCompiledMessages(TWNTestCaseBase):
+
+    """Test twtranslate using compiled messages."""
+
+    net = False
+    message_package = 'tests.i18n'
+
+    def setUp(self):
+        """Compile the test translations."""
+        super(TestCompiledMessages, self).setUp()
+        self.filename = i18n.compile_messages()
+        self.orig_cache = i18n._cache
+        i18n._cache = defaultdict(dict)
+
+    def tearDown(self):
+        """Remove the compiled translations."""
+        os.remove(self.filename)
+        i18n._cache = self.orig_cache
+        super(TestCompiledMessages, self).tearDown()
+
+    def test_compiled(self):
+        """Test that the compiled messages are used."""
+        compiled = i18n._load_compiled_messages()
+        self.assertEqual(compiled['test-localized']['nl'],
+                         'test-localized NL')
+        self.assertNotIn('@metadata', compiled)
+        self.assertEqual(i18n.twtranslate('fy', 'test-semi-localized'),
+                         'test-semi-localized NL')
+        self.assertEqual(i18n.twtranslate('de', 'test-plural', {'num': 1}),
+                         'Bot: Ändere 1 Seite.')
+        self.assertFalse(any(i18n._cache.values()))
+
+    def test_resolved(self):
+        """Test that fallbacks and plurals are resolved when compiling."""
+        with open(self.filename) as f:
+            data = json.load(f)
+        self.assertEqual(data['fallbacks']['fy'], ['nl', 'en'])
+        self.assertIn('en', data['fallbacks'])
+        self.assertTrue(data['plurals'])
+        i18n._fallback_chains.clear()
+        i18n._plural_variants.clear()
+        i18n._load_compiled_messages()
+        self.assertEqual(i18n._fallback_chains['fy'], ['nl', 'en'])
+        self.assertEqual(len(i18n._plural_variants), len(data['plurals']))
+        self.assertEqual(i18n._plural_variants['Seite|Seiten'],
+                         (['Seite', 'Seiten'], {}))
+
+    def test_outdated(self):
+        """Test that compiled messages of an edited bundle are ignored."""
+        path = os.path.join(os.path.dirname(self.filename), 'test', 'nl.json')
+        mtime = os.path.getmtime(path)
+        os.utime(path, (mtime + 10, mtime + 10))
+        self.addCleanup(os.utime, path, (mtime, mtime))
+        i18n.set_messages_package(self.message_package)
+        self.assertFalse(i18n._load_compiled_messages())
+        self.assertEqual(i18n.twtranslate('nl', 'test-localized'),
+                         'test-localized NL')
+
+
 class ScriptMessagesTestCase(TWNTestCaseBase):
 
     """Real messages test."""
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Tests for the match_images script."""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+from pywikibot.tools import OrderedDict
+
+from tests.aspects import unittest, require_modules, TestCase
+
+try:
+    import numpy
+
+    from PIL import Image
+
+    from scripts import match_images
+except ImportError:
+    match_images = None
+
+ALL_BITS = 2 ** 64 - 1
+
+
+@require_modules('numpy', 'PIL')
+class TestMatchImages(TestCase):
+
+    """Test comparing images without downloading them."""
+
+    net = False
+
+    def gradient(self, step):
+        """Return a gray image which changes its brightness to the right."""
+        image = Image.new('L', (9, 8))
+        image.putdata([128 + step * x for y in range(8) for x in range(9)])
+        return image
+
+    def test_match_histograms(self):
+        """Test the ratio of matching pixels of histograms."""
+        histogram = numpy.array([2, 0, 2])
+        self.assertEqual(match_images.match_histograms(histogram, histogram),
+                         1)
+        self.assertAlmostEqual(
+            match_images.match_histograms(histogram, numpy.array([2, 2, 0])),
+            1.0 / 3)
+        self.assertEqual(
+            match_images.match_histograms(histogram, numpy.array([2, 2])), 0)
+        self.assertEqual(
+            match_images.match_histograms(numpy.zeros(3), numpy.zeros(3)), 0)
+
+    def test_image_hash(self):
+        """Test the bits of the hash of brighter and darker pixels."""
+        self.assertEqual(match_images.image_hash(self.gradient(10)),
+                         ALL_BITS)
+        self.assertEqual(match_images.image_hash(self.gradient(-10)), 0)
+        self.assertEqual(match_images.image_hash(Image.new('L', (9, 8))), 0)
+        self.assertEqual(
+            match_images.image_hash(self.gradient(10).convert('RGB')),
+            ALL_BITS)
+
+    def test_region_histograms(self):
+        """Test the histograms of the regions of an image."""
+        image = Image.new('L', (4, 4))
+        image.paste(255, (2, 0, 4, 4))
+        histograms = match_images.region_histograms(image)
+        self.assertEqual(len(histograms), len(match_images.REGIONS))
+        self.assertEqual([(h[0], h[255]) for h in histograms],
+                         [(8, 8), (4, 0), (0, 4), (4, 0), (0, 4), (2, 2)])
+        histograms = match_images.region_histograms(image, (8, 8))
+        self.assertEqual([h.sum() for h in histograms],
+                         [64, 16, 16, 16, 16, 16])
+
+    def test_find_near_duplicates(self):
+        """Test grouping the images by the distance of their hashes."""
+        index = OrderedDict([('A', 0), ('B', 1), ('C', ALL_BITS),
+                             ('D', ALL_BITS - 2), ('E', 0xff)])
+        self.assertEqual(match_images.find_near_duplicates(index),
+                         [['A', 'B'], ['C', 'D']])
+        self.assertEqual(match_images.find_near_duplicates(index, 8),
+                         [['A', 'B', 'E'], ['C', 'D']])
+        self.assertEqual(match_images.find_near_duplicates(index, 0), [])
+
+
+if __name__ == '__main__':  # pragma: no cover
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Tests for the metrics module."""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import json
+import os
+import shutil
+import tempfile
+
+from pywikibot import config, metrics
+from pywikibot.data.api import Request
+
+from tests.aspects import unittest, DefaultDrySiteTestCase, TestCase
+
+
+class TestMetricsRegistry(TestCase):
+
+    """Test the registry and the histograms."""
+
+    net = False
+
+    def setUp(self):
+        """Create a registry."""
+        super(TestMetricsRegistry, self).setUp()
+        self.registry = metrics.MetricsRegistry()
+
+    def test_counter(self):
+        """Test that counters are added per name and labels."""
+        self.registry.increment('requests', 1, {'site': 'a', 'module': 'm'})
+        self.registry.increment('requests', 2, {'module': 'm', 'site': 'a'})
+        self.registry.increment('requests', 1, {'site': 'b', 'module': 'm'})
+        self.assertEqual(self.registry.counter('requests', site='a',
+                                               module='m'), 3)
+        self.assertEqual(self.registry.counter('requests', site='b',
+                                               module='m'), 1)
+        self.assertEqual(self.registry.counter('requests', site='c'), 0)
+
+    def test_histogram(self):
+        """Test the buckets of a histogram."""
+        for value in (0.005, 0.01, 0.3, 100):
+            self.registry.observe('latency', value)
+        histogram = self.registry.histogram('latency')
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 100.315)
+        cumulative = dict(histogram.cumulative())
+        self.assertEqual(cumulative[0.01], 2)
+        self.assertEqual(cumulative[0.25], 2)
+        self.assertEqual(cumulative[0.5], 3)
+        self.assertEqual(cumulative[60], 3)
+        self.assertEqual(cumulative[None], 4)
+        self.assertIsNone(self.registry.histogram('other'))
+
+    def test_samples(self):
+        """Test that samples are sorted by name."""
+        self.registry.observe('b', 1)
+        self.registry.increment('a', 1, {'site': 'x'})
+        self.assertEqual(
+            [sample[:3] for sample in self.registry.samples()],
+            [('counter', 'a', {'site': 'x'}), ('histogram', 'b', {})])
+        self.registry.reset()
+        self.assertEqual(self.registry.samples(), [])
+
+
+class TestMetricsSinks(TestCase):
+
+    """Test writing the metrics to files."""
+
+    net = False
+
+    def setUp(self):
+        """Use a temporary base directory and create a registry."""
+        super(TestMetricsSinks, self).setUp()
+        self._base_dir = config.base_dir
+        config.base_dir = tempfile.mkdtemp()
+        self.registry = metrics.MetricsRegistry()
+        self.registry.increment('api_requests', 2, {'site': 'wikipedia:en'})
+        self.registry.observe('api_latency_seconds', 0.2, {'module': 'q"'})
+
+    def tearDown(self):
+        """Remove the temporary base directory."""
+        shutil.rmtree(config.base_dir)
+        config.base_dir = self._base_dir
+        super(TestMetricsSinks, self).tearDown()
+
+    def test_json_lines(self):
+        """Test that the JSON lines sink appends to the file."""
+        sink = metrics.JSONLinesSink('metrics.jsonl')
+        self.assertEqual(sink.filename,
+                         os.path.join(config.base_dir, 'logs',
+                                      'metrics.jsonl'))
+        sink.dump(self.registry)
+        sink.dump(self.registry)
+        with open(sink.filename) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[0]['name'], 'api_latency_seconds')
+        self.assertEqual(lines[0]['count'], 1)
+        self.assertIn([0.25, 1], lines[0]['buckets'])
+        self.assertEqual(lines[1]['value'], 2)
+        self.assertEqual(lines[1]['labels'], {'site': 'wikipedia:en'})
+
+    def test_prometheus(self):
+        """Test the Prometheus text format."""
+        text = metrics.PrometheusSink('metrics.prom').format(self.registry)
+        lines = text.splitlines()
+        self.assertIn('# TYPE pywikibot_api_latency_seconds histogram',
+                      lines)
+        self.assertIn('pywikibot_api_latency_seconds_bucket'
+                      '{le="0.25",module="q\\""} 1', lines)
+        self.assertIn('pywikibot_api_latency_seconds_bucket'
+                      '{le="+Inf",module="q\\""} 1', lines)
+        self.assertIn('pywikibot_api_latency_seconds_count{module="q\\""} 1',
+                      lines)
+        self.assertIn('# TYPE pywikibot_api_requests counter', lines)
+        self.assertIn('pywikibot_api_requests{site="wikipedia:en"} 2', lines)
+
+
+class TestMetricsEnabled(TestCase):
+
+    """Test enabling and disabling metrics."""
+
+    net = False
+
+    def tearDown(self):
+        """Disable metrics."""
+        metrics.disable()
+        super(TestMetricsEnabled, self).tearDown()
+
+    def test_disabled(self):
+        """Test that nothing is recorded while disabled."""
+        metrics.disable()
+        metrics.increment('requests')
+        metrics.observe('latency', 1)
+        self.assertIsNone(metrics.registry)
+
+    def test_enabled(self):
+        """Test that values are recorded and dumped to the sinks."""
+        dumped = []
+
+        class Sink(object):
+
+            def dump(self, registry):
+                dumped.append(registry.counter('requests'))
+
+        metrics.enable([Sink()])
+        metrics.increment('requests', 2)
+        metrics.dump()
+        self.assertEqual(dumped, [2])
+
+
+class TestRequestMetrics(DefaultDrySiteTestCase):
+
+    """Test the labels of the metrics of API requests."""
+
+    def test_labels(self):
+        """Test the module label of queries and other actions."""
+        req = Request(site=self.site, parameters={
+            'action': 'query', 'prop': 'revisions|info',
+            'generator': 'allpages'})
+        self.assertEqual(req._metrics_labels(),
+                         {'site': str(self.site),
+                          'module': 'query+allpages|info|revisions'})
+        req = Request(site=self.site, parameters={'action': 'parse'})
+        self.assertEqual(req._metrics_labels()['module'], 'parse')
+
+
+if __name__ == '__main__':  # pragma: no cover
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
@@ -0,0 +1,724 @@
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for the API of a MediaWiki wiki.
+
+L{MockAPIServer} serves the API of a synthetic wiki (L{MockWiki}) over HTTP
+on localhost, so that real sites, generators and bots can be run without the
+network, e.g. to measure the throughput of the framework. It supports
+action=query (siteinfo, userinfo, tokens, allpages, info and revisions),
+parse, edit, paraminfo and wbgetentities. Recorded responses can be served
+for any other request.
+
+The latency of the responses and maxlag or server errors can be injected::
+
+    with MockAPIServer(MockWiki(pages=500), latency=0.05) as server:
+        site = server.site()
+        for page in site.allpages():
+            ...
+"""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import bisect
+import datetime
+import json
+import random
+import threading
+import time
+
+import pywikibot
+
+from pywikibot import config
+from pywikibot.tools import PY2
+
+if not PY2:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qsl, urlparse
+else:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qsl, urlparse
+
+# The MediaWiki version of the mock wiki
+VERSION = '1.27.0'
+
+# The user of the mock wiki, which is always logged in
+USERNAME = 'MockBot'
+
+NAMESPACES = {
+    -2: 'Media', -1: 'Special', 0: '', 1: 'Talk', 2: 'User',
+    3: 'User talk', 4: 'Project', 5: 'Project talk', 6: 'File',
+    7: 'File talk', 8: 'MediaWiki', 9: 'MediaWiki talk', 10: 'Template',
+    11: 'Template talk', 12: 'Help', 13: 'Help talk', 14: 'Category',
+    15: 'Category talk',
+}
+
+# Parameters which are ignored when a request is matched with a recording
+VOLATILE_PARAMETERS = frozenset(['assert', 'continue', 'format', 'maxlag',
+                                 'token', 'utf8'])
+
+# The messages returned by allmessages
+MESSAGES = {
+    'and': '&#32;and', 'colon-separator': ':&#32;',
+    'comma-separator': ',&#32;', 'semicolon-separator': ';&#32;',
+    'word-separator': '&#32;',
+}
+
+LOREM = ('Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do '
+         'eiusmod tempor incididunt ut labore et dolore magna aliqua. ')
+
+
+def _param(name, **data):
+    """Return the paraminfo of a parameter."""
+    data['name'] = name
+    return data
+
+
+def _limit():
+    """Return the paraminfo of a limit parameter."""
+    return _param('limit', type='limit', min=1, max=500, highmax=5000,
+                  default=10)
+
+
+def _submodules(name, parent, modules, **data):
+    """Return the paraminfo of a parameter which selects submodules."""
+    paths = dict((module, parent + module) for module in modules)
+    return _param(name, type=sorted(modules), submodules=paths, **data)
+
+
+ACTIONS = ('edit', 'login', 'logout', 'paraminfo', 'parse', 'query', 'tokens',
+           'wbgetentities')
+# The tokens of the info module and the tokens action, replaced by csrf
+OLD_TOKENS = ['block', 'delete', 'edit', 'email', 'move', 'protect', 'watch']
+QUERY_MODULES = {
+    'prop': ('categories', 'categoryinfo', 'info', 'langlinks', 'pageprops',
+             'revisions', 'templates'),
+    'list': ('allpages', ),
+    'meta': ('allmessages', 'siteinfo', 'tokens', 'userinfo'),
+}
+
+MODULES = {
+    'main': ('', [
+        _submodules('action', '', ACTIONS, default='help'),
+        _submodules('format', '', ['json'], default='jsonfm'),
+        _param('maxlag', type='integer'),
+        _param('assert', type=['user', 'bot']),
+    ]),
+    'paraminfo': ('', [
+        _param('modules', type='string', multi='', limit=50),
+        _submodules('querymodules', 'query+',
+                    sum(QUERY_MODULES.values(), ()), multi='', limit=50),
+    ]),
+    'query': ('', [
+        _submodules('prop', 'query+', QUERY_MODULES['prop'], multi=''),
+        _submodules('list', 'query+', QUERY_MODULES['list'], multi=''),
+        _submodules('meta', 'query+', QUERY_MODULES['meta'], multi=''),
+        _submodules('generator', 'query+',
+                    ['allpages', 'categories', 'templates']),
+        _param('titles', type='string', multi=''),
+        _param('pageids', type='integer', multi=''),
+        _param('revids', type='integer', multi=''),
+        _param('continue', type='string'),
+    ]),
+    'query+allpages': ('ap', [
+        _param('from', type='string'),
+        _param('continue', type='string'),
+        _param('namespace', type='namespace', default=0),
+        _limit(),
+    ]),
+    'query+info': ('in', [
+        _param('prop', type=['protection', 'url'], multi=''),
+        _param('token', type=OLD_TOKENS, multi=''),
+    ]),
+    'query+revisions': ('rv', [
+        _param('prop', type=['ids', 'timestamp', 'user', 'comment',
+                             'content', 'sha1', 'size'], multi=''),
+        _limit(),
+    ]),
+    'query+allmessages': ('am', [
+        _param('messages', type='string', multi=''),
+        _param('lang', type='string'),
+    ]),
+    'query+categories': ('cl', [_limit()]),
+    'query+categoryinfo': ('ci', []),
+    'query+langlinks': ('ll', [_limit()]),
+    'query+pageprops': ('pp', []),
+    'query+templates': ('tl', [_limit()]),
+    'query+siteinfo': ('si', [
+        _param('prop', type=['general', 'namespaces', 'namespacealiases',
+                             'interwikimap', 'extensions'], multi=''),
+    ]),
+    'query+tokens': ('', [
+        _param('type', type=['csrf', 'login', 'patrol', 'watch'],
+               multi=''),
+    ]),
+    'query+userinfo': ('ui', [
+        _param('prop', type=['blockinfo', 'hasmsg', 'groups', 'rights'],
+               multi=''),
+    ]),
+    'edit': ('', [
+        _param('title', type='string'),
+        _param('text', type='text'),
+        _param('summary', type='string'),
+        _param('token', type='string', tokentype='csrf'),
+    ]),
+    'parse': ('', [
+        _param('page', type='string'),
+        _param('text', type='text'),
+    ]),
+    'tokens': ('', [
+        _param('type', type=OLD_TOKENS + ['patrol'], multi=''),
+    ]),
+    'wbgetentities': ('', [
+        _param('ids', type='string', multi=''),
+    ]),
+    'login': ('lg', [_param('name', type='string')]),
+    'logout': ('', []),
+}
+
+MUSTBEPOSTED = frozenset(['edit', 'login', 'logout'])
+
+
+class MockWiki(object):
+
+    """
+    Synthetic content of a wiki and the API responses based on it.
+
+    The main namespace contains the pages 'Page 0', 'Page 1' etc. with a
+    text of the given size. The items Q1, Q2 etc. are returned by
+    wbgetentities. Edits are stored, so that they can be read again.
+    """
+
+    def __init__(self, pages=1000, text_size=2000, entities=1000):
+        """
+        Constructor.
+
+        @param pages: the number of pages
+        @type pages: int
+        @param text_size: the approximate length of the page texts
+        @type text_size: int
+        @param entities: the number of items
+        @type entities: int
+        """
+        self.lock = threading.Lock()
+        self.entities = entities
+        self.pages = {}
+        self.revid = 0
+        self.recordings = {}
+        text = (LOREM * (text_size // len(LOREM) + 1))[:text_size]
+        for i in range(pages):
+            self._save('Page {0}'.format(i), '{0}\n{1}'.format(i, text))
+        self.titles = sorted(self.pages)
+
+    @staticmethod
+    def _timestamp(timestamp=None):
+        """Return the time in the API format."""
+        if timestamp is None:
+            timestamp = time.time()
+        return datetime.datetime.utcfromtimestamp(timestamp).strftime(
+            '%Y-%m-%dT%H:%M:%SZ')
+
+    @staticmethod
+    def _key(params):
+        """Return the key of a request for the recordings."""
+        return tuple(sorted((key, value) for key, value in params.items()
+                            if key not in VOLATILE_PARAMETERS))
+
+    def record(self, params, response):
+        """
+        Serve a fixed response for requests with these parameters.
+
+        @param params: the request parameters; their values are strings
+            with multiple values joined by '|'
+        @type params: dict
+        @param response: the API response
+        @type response: dict
+        """
+        self.recordings[self._key(params)] = response
+
+    def load_recordings(self, filename):
+        """
+        Load recorded responses from a file.
+
+        Each line of the file is a JSON object with the parameters of a
+        request as 'params' and the response as 'response'.
+        """
+        with open(filename) as f:
+            for line in f:
+                if line.strip():
+                    data = json.loads(line)
+                    self.record(data['params'], data['response'])
+
+    def _save(self, title, text, summary=''):
+        """Store a new revision and return the page."""
+        self.revid += 1
+        page = self.pages.get(title)
+        if page is None:
+            page = self.pages[title] = {
+                'pageid': len(self.pages) + 1, 'ns': self._namespace(title),
+                'title': title, 'revid': 0}
+        page.update(parentid=page['revid'], revid=self.revid, text=text,
+                    timestamp=self._timestamp(), comment=summary)
+        return page
+
+    @staticmethod
+    def _namespace(title):
+        """Return the namespace number of a title."""
+        prefix, sep, rest = title.partition(':')
+        for number, name in NAMESPACES.items():
+            if sep and number and name == prefix:
+                return number
+        return 0
+
+    @staticmethod
+    def _normalize(title):
+        """Return the normalized form of a title."""
+        title = title.replace('_', ' ').strip()
+        return title[:1].upper() + title[1:]
+
+    @staticmethod
+    def error(code, info, **data):
+        """Return an API error response."""
+        data.update(code=code, info=info)
+        return {'error': data}
+
+    def handle(self, params):
+        """
+        Return the response to an API request.
+
+        @param params: the request parameters
+        @type params: dict
+        @rtype: dict
+        """
+        response = self.recordings.get(self._key(params))
+        if response is not None:
+            return response
+        action = params.get('action', 'help')
+        handler = getattr(self, '_action_' + action, None)
+        if handler is None:
+            return self.error('unknown_action',
+                              "Unrecognized value for parameter 'action': "
+                              '{0}'.format(action))
+        with self.lock:
+            return handler(params)
+
+    def _action_paraminfo(self, params):
+        """Return the paraminfo of the modules."""
+        result = []
+        for path in params.get('modules', '').split('|'):
+            if path not in MODULES:
+                result.append({'name': path, 'missing': ''})
+                continue
+            prefix, parameters = MODULES[path]
+            data = {'name': path.rpartition('+')[2], 'path': path,
+                    'classname': 'Mock', 'prefix': prefix,
+                    'parameters': parameters}
+            if '+' in path:
+                data['group'] = next(group for group, names
+                                     in QUERY_MODULES.items()
+                                     if data['name'] in names)
+            if path in MUSTBEPOSTED:
+                data['mustbeposted'] = ''
+                data['writerights'] = ''
+            result.append(data)
+        return {'paraminfo': {'modules': result}}
+
+    def _action_query(self, params):
+        """Return the response to a query."""
+        query = {}
+        response = {'batchcomplete': '', 'query': query}
+        for meta in params.get('meta', '').split('|'):
+            if meta:
+                getattr(self, '_meta_' + meta)(params, query, response)
+
+        titles = []
+        if params.get('list') == 'allpages':
+            query['allpages'] = [
+                {'pageid': page['pageid'], 'ns': page['ns'],
+                 'title': page['title']}
+                for page in self._allpages(params, 'ap', response)]
+        generator = params.get('generator')
+        if generator == 'allpages':
+            titles = [page['title']
+                      for page in self._allpages(params, 'gap', response)]
+        elif generator:
+            # the pages have no categories or templates
+            pass
+        elif 'titles' in params:
+            titles += self._normalized_titles(params['titles'], query)
+        elif 'pageids' in params:
+            ids = set(int(pageid) for pageid in params['pageids'].split('|'))
+            titles += [title for title, page in self.pages.items()
+                       if page['pageid'] in ids]
+        elif 'revids' in params:
+            ids = set(int(revid) for revid in params['revids'].split('|'))
+            titles += [title for title, page in self.pages.items()
+                       if page['revid'] in ids]
+        if titles:
+            query['pages'] = self._pages(titles, params)
+        if not query:
+            del response['query']
+        return response
+
+    def _meta_siteinfo(self, params, query, response):
+        """Add the requested siteinfo properties."""
+        unknown = []
+        for prop in params.get('siprop', 'general').split('|'):
+            if prop == 'general':
+                query['general'] = {
+                    'mainpage': 'Main Page', 'sitename': 'Mock',
+                    'base': self.server + '/wiki/Main_Page',
+                    'generator': 'MediaWiki ' + VERSION,
+                    'case': 'first-letter', 'lang': 'en', 'fallback': [],
+                    'writeapi': '', 'timezone': 'UTC', 'timeoffset': 0,
+                    'articlepath': '/wiki/$1', 'scriptpath': '/w',
+                    'script': '/w/index.php', 'server': self.server,
+                    'servername': urlparse(self.server).hostname,
+                    'wikiid': 'mock', 'time': self._timestamp(),
+                    'maxuploadsize': 104857600,
+                    'linktrail': '/^([a-z]+)(.*)$/sD',
+                    'legaltitlechars': ' %!"$&\'()*,\\-.\\/0-9:;=?@A-Z'
+                                       '\\\\^_`a-z~\\x80-\\xFF+',
+                }
+            elif prop == 'namespaces':
+                query['namespaces'] = dict(
+                    (str(number), {'id': number, 'case': 'first-letter',
+                                   '*': name, 'canonical': name})
+                    for number, name in NAMESPACES.items())
+                query['namespaces']['0']['content'] = ''
+                del query['namespaces']['0']['canonical']
+            elif prop in ('namespacealiases', 'interwikimap', 'extensions',
+                          'magicwords', 'languages', 'skins'):
+                query[prop] = []
+            else:
+                unknown.append(prop)
+        if unknown:
+            response.setdefault('warnings', {})['siteinfo'] = {
+                '*': "Unrecognized values for parameter 'siprop': {0}"
+                     .format(', '.join(unknown))}
+
+    def _meta_allmessages(self, params, query, response):
+        """Add the requested messages."""
+        query['allmessages'] = [
+            {'name': name, '*': MESSAGES[name]} if name in MESSAGES
+            else {'name': name, 'missing': ''}
+            for name in params.get('ammessages', '').split('|')]
+
+    def _meta_userinfo(self, params, query, response):
+        """Add the info about the logged in user."""
+        query['userinfo'] = {
+            'id': 1, 'name': USERNAME, 'groups': ['*', 'user', 'bot'],
+            'rights': ['read', 'edit', 'writeapi', 'apihighlimits', 'bot',
+                       'createpage', 'minoredit', 'noratelimit']}
+
+    def _meta_tokens(self, params, query, response):
+        """Add the requested tokens."""
+        query['tokens'] = dict(
+            (token_type + 'token', 'mock+\\')
+            for token_type in params.get('type', 'csrf').split('|'))
+
+    def _allpages(self, params, prefix, response):
+        """Return the pages of an allpages list and add the continuation."""
+        limit = params.get(prefix + 'limit', '10')
+        limit = 500 if limit == 'max' else int(limit)
+        start = params.get(prefix + 'continue', params.get(prefix + 'from'))
+        index = bisect.bisect_left(self.titles, start) if start else 0
+        titles = self.titles[index:index + limit]
+        if index + limit < len(self.titles):
+            response['continue'] = {
+                prefix + 'continue': self.titles[index + limit],
+                'continue': 'gapcontinue||' if prefix == 'gap' else '-||'}
+            del response['batchcomplete']
+        return [self.pages[title] for title in titles]
+
+    def _normalized_titles(self, titles, query):
+        """Return the normalized titles and add the normalizations."""
+        result = []
+        for title in titles.split('|'):
+            normalized = self._normalize(title)
+            if normalized != title:
+                query.setdefault('normalized', []).append(
+                    {'from': title, 'to': normalized})
+            result.append(normalized)
+        return result
+
+    def _pages(self, titles, params):
+        """Return the requested properties of the pages."""
+        props = params.get('prop', '').split('|')
+        rvprop = params.get('rvprop', 'ids|timestamp|user|comment').split('|')
+        result = {}
+        missing = 0
+        for title in titles:
+            page = self.pages.get(title)
+            if page is None:
+                missing -= 1
+                result[str(missing)] = {'ns': self._namespace(title),
+                                        'title': title, 'missing': ''}
+                continue
+            data = {'pageid': page['pageid'], 'ns': page['ns'],
+                    'title': title}
+            if 'info' in props:
+                data.update(contentmodel='wikitext', pagelanguage='en',
+                            touched=page['timestamp'],
+                            lastrevid=page['revid'],
+                            length=len(page['text']))
+                if 'protection' in params.get('inprop', ''):
+                    data['protection'] = []
+            if 'revisions' in props:
+                revision = {'revid': page['revid'],
+                            'parentid': page['parentid'],
+                            'user': USERNAME, 'timestamp': page['timestamp'],
+                            'comment': page['comment']}
+                if 'content' in rvprop:
+                    revision.update({'contentformat': 'text/x-wiki',
+                                     'contentmodel': 'wikitext',
+                                     '*': page['text']})
+                data['revisions'] = [revision]
+            result[str(page['pageid'])] = data
+        return result
+
+    def _action_parse(self, params):
+        """Return the HTML of a page or text."""
+        if 'page' in params:
+            title = self._normalize(params['page'])
+            page = self.pages.get(title)
+            if page is None:
+                return self.error('missingtitle',
+                                  "The page you specified doesn't exist.")
+            text = page['text']
+        else:
+            title = params.get('title', 'API')
+            text = params.get('text', '')
+        html = ''.join('<p>{0}\n</p>'.format(paragraph)
+                       for paragraph in text.split('\n\n'))
+        return {'parse': {'title': title, 'pageid': 0, 'displaytitle': title,
+                          'text': {'*': html}, 'langlinks': [],
+                          'categories': [], 'links': [], 'templates': [],
+                          'images': [], 'externallinks': [],
+                          'sections': []}}
+
+    def _action_edit(self, params):
+        """Edit a page."""
+        if params.get('token') != 'mock+\\':
+            return self.error('badtoken', 'Invalid CSRF token.')
+        title = self._normalize(params['title'])
+        page = self.pages.get(title)
+        if page is None and 'nocreate' in params:
+            return self.error('missingtitle',
+                              "The page you specified doesn't exist.")
+        if page is not None and 'createonly' in params:
+            return self.error('articleexists',
+                              'The article you tried to create has been '
+                              'created already.')
+        text = params.get('text')
+        if text is None:
+            text = ((params.get('prependtext', '') +
+                     (page['text'] if page else '') +
+                     params.get('appendtext', '')))
+        result = {'result': 'Success', 'title': title,
+                  'contentmodel': 'wikitext'}
+        if page is not None and page['text'] == text:
+            result.update(pageid=page['pageid'], nochange='')
+            return {'edit': result}
+        if page is None:
+            result['new'] = ''
+            self.titles.insert(bisect.bisect_left(self.titles, title), title)
+        else:
+            result['oldrevid'] = page['revid']
+        page = self._save(title, text, params.get('summary', ''))
+        result.update(pageid=page['pageid'], newrevid=page['revid'],
+                      newtimestamp=page['timestamp'])
+        return {'edit': result}
+
+    def _action_wbgetentities(self, params):
+        """Return synthetic items."""
+        entities = {}
+        for entity_id in params.get('ids', '').split('|'):
+            number = entity_id[1:]
+            if (entity_id[:1] != 'Q' or not number.isdigit() or
+                    not 0 < int(number) <= self.entities):
+                entities[entity_id] = {'id': entity_id, 'missing': ''}
+                continue
+            entities[entity_id] = {
+                'id': entity_id, 'type': 'item', 'ns': 0,
+                'title': entity_id, 'pageid': int(number),
+                'lastrevid': int(number), 'modified': self._timestamp(0),
+                'labels': {'en': {'language': 'en',
+                                  'value': 'Item ' + number}},
+                'descriptions': {}, 'aliases': {}, 'claims': {},
+                'sitelinks': {}}
+        return {'entities': entities, 'success': 1}
+
+    def _action_login(self, params):
+        """Refuse to log in; the mock user is always logged in."""
+        return self.error('mock-login', 'The mock user is always logged in.')
+
+    def _action_logout(self, params):
+        """Do nothing."""
+        return {}
+
+
+class _MockHTTPServer(ThreadingMixIn, HTTPServer):
+
+    """HTTP server handling each request in a thread."""
+
+    daemon_threads = True
+
+
+class _MockRequestHandler(BaseHTTPRequestHandler):
+
+    """Handler of the HTTP requests to the mock server."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        """Answer a GET request."""
+        self.server.mock.respond(self, urlparse(self.path).query)
+
+    def do_POST(self):
+        """Answer a POST request."""
+        length = int(self.headers.get('content-length', 0))
+        body = self.rfile.read(length).decode('utf-8')
+        self.server.mock.respond(self, body)
+
+    def log_message(self, *args):
+        """Do not log the requests to stderr."""
+        pass
+
+
+class MockAPIServer(object):
+
+    """
+    HTTP server for the API of a mock wiki on localhost.
+
+    The server runs in a thread and handles the requests concurrently.
+    """
+
+    def __init__(self, wiki=None, latency=0, maxlag=0, lag=5,
+                 error_rate=0, errors=('http', 'api'), seed=0):
+        """
+        Constructor.
+
+        @param wiki: the wiki to serve, by default a new L{MockWiki}
+        @type wiki: L{MockWiki}
+        @param latency: seconds to wait before each response
+        @type latency: float
+        @param maxlag: the fraction of the requests with a maxlag parameter
+            which are answered with a maxlag error
+        @type maxlag: float
+        @param lag: the lag in seconds reported by the maxlag errors
+        @type lag: int
+        @param error_rate: the fraction of the requests which are answered
+            with an error
+        @type error_rate: float
+        @param errors: the kinds of injected errors: 'http' for a HTTP 503
+            response and 'api' for a database error of the API
+        @type errors: iterable of str
+        @param seed: the seed of the random injection of errors
+        @type seed: int
+        """
+        self.wiki = wiki or MockWiki()
+        self.latency = latency
+        self.maxlag = maxlag
+        self.lag = lag
+        self.error_rate = error_rate
+        self.errors = tuple(errors)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.actions = {}
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        """Start the server."""
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Stop the server."""
+        self.stop()
+
+    def start(self):
+        """Start serving on a free port of localhost."""
+        self._server = _MockHTTPServer(('127.0.0.1', 0), _MockRequestHandler)
+        self._server.mock = self
+        self.wiki.server = 'http://127.0.0.1:{0}'.format(
+            self._server.server_address[1])
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='MockAPIServer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving."""
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    @property
+    def url(self):
+        """Return the URL of api.php."""
+        return self.wiki.server + '/w/api.php'
+
+    def site(self, name='mock'):
+        """
+        Return a site using this server.
+
+        The family is registered in config.family_files and the mock user
+        in config.usernames.
+
+        @param name: the name of the family and the code of the site
+        @type name: str
+        @rtype: L{pywikibot.site.APISite}
+        """
+        config.family_files[name] = self.url
+        config.usernames[name] = {name: USERNAME}
+        return pywikibot.Site(name, name)
+
+    def _inject(self, params):
+        """Return an injected error response or None."""
+        if self.maxlag and 'maxlag' in params and \
+                self.random.random() < self.maxlag:
+            return 200, self.wiki.error(
+                'maxlag', 'Waiting for mockdb: {0} seconds lagged'
+                          .format(self.lag),
+                host='mockdb', lag=self.lag)
+        if self.error_rate and self.random.random() < self.error_rate:
+            if self.random.choice(self.errors) == 'http':
+                return 503, None
+            return 200, self.wiki.error('internal_api_error_DBQueryError',
+                                        'Database query error')
+        return None
+
+    def respond(self, handler, query):
+        """Answer a request with the response of the wiki."""
+        if self.latency:
+            time.sleep(self.latency)
+        params = dict(parse_qsl(query, keep_blank_values=True))
+        with self.lock:
+            self.requests += 1
+            action = params.get('action', 'help')
+            self.actions[action] = self.actions.get(action, 0) + 1
+            injected = self._inject(params)
+        if injected:
+            status, response = injected
+        else:
+            status, response = 200, self.wiki.handle(params)
+        if response is None:
+            body = b'Service Unavailable'
+            content_type = 'text/plain'
+        else:
+            body = json.dumps(response).encode('utf-8')
+            content_type = 'application/json; charset=utf-8'
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
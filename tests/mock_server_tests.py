@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Tests for the mock API server."""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import json
+
+from pywikibot.tools import PY2
+
+from tests.aspects import unittest, TestCase
+from tests.mock_server import MockAPIServer, MockWiki
+
+if not PY2:
+    from urllib.error import HTTPError
+    from urllib.request import urlopen
+else:
+    from urllib2 import HTTPError, urlopen
+
+
+class TestMockWiki(TestCase):
+
+    """Test the responses of the mock wiki."""
+
+    net = False
+
+    def setUp(self):
+        """Create a small wiki."""
+        super(TestMockWiki, self).setUp()
+        self.wiki = MockWiki(pages=5, text_size=10)
+
+    def test_allpages(self):
+        """Test the continuation of allpages."""
+        response = self.wiki.handle({'action': 'query', 'list': 'allpages',
+                                     'aplimit': '3'})
+        self.assertEqual([page['title']
+                          for page in response['query']['allpages']],
+                         ['Page 0', 'Page 1', 'Page 2'])
+        self.assertEqual(response['continue']['apcontinue'], 'Page 3')
+
+    def test_revisions(self):
+        """Test the content of normalized and missing titles."""
+        response = self.wiki.handle({
+            'action': 'query', 'titles': 'page_1|Missing',
+            'prop': 'revisions', 'rvprop': 'content'})
+        self.assertEqual(response['query']['normalized'],
+                         [{'from': 'page_1', 'to': 'Page 1'}])
+        pages = sorted(response['query']['pages'].values(),
+                       key=lambda page: page['title'])
+        self.assertIn('missing', pages[0])
+        self.assertEqual(pages[1]['revisions'][0]['*'], '1\nLorem ipsu')
+
+    def test_edit(self):
+        """Test that edits are stored."""
+        response = self.wiki.handle({'action': 'edit', 'title': 'Page 1',
+                                     'text': 'new', 'token': 'mock+\\'})
+        self.assertEqual(response['edit']['result'], 'Success')
+        self.assertEqual(self.wiki.pages['Page 1']['text'], 'new')
+        response = self.wiki.handle({'action': 'edit', 'title': 'Page 1',
+                                     'text': 'new', 'token': 'mock+\\'})
+        self.assertIn('nochange', response['edit'])
+        response = self.wiki.handle({'action': 'edit', 'title': 'Page 1',
+                                     'text': 'new', 'token': 'bad'})
+        self.assertEqual(response['error']['code'], 'badtoken')
+
+    def test_recording(self):
+        """Test that recorded responses are served."""
+        self.wiki.record({'action': 'help', 'format': 'json'}, {'help': 1})
+        self.assertEqual(self.wiki.handle({'action': 'help'}), {'help': 1})
+        self.assertEqual(self.wiki.handle({'action': 'unknown'})['error']
+                         ['code'], 'unknown_action')
+
+
+class TestMockAPIServer(TestCase):
+
+    """Test the HTTP server and the injected errors."""
+
+    net = False
+
+    def test_serve(self):
+        """Test that the server answers and counts requests."""
+        with MockAPIServer(MockWiki(pages=2)) as server:
+            response = urlopen(server.url + '?action=query&list=allpages')
+            data = json.loads(response.read().decode('utf-8'))
+            self.assertEqual(len(data['query']['allpages']), 2)
+            self.assertEqual(server.requests, 1)
+            self.assertEqual(server.actions, {'query': 1})
+
+    def test_errors(self):
+        """Test the injection of HTTP and maxlag errors."""
+        with MockAPIServer(MockWiki(pages=1), maxlag=1, lag=7, error_rate=1,
+                           errors=['http']) as server:
+            response = urlopen(server.url + '?action=query&maxlag=5')
+            data = json.loads(response.read().decode('utf-8'))
+            self.assertEqual(data['error']['code'], 'maxlag')
+            self.assertEqual(data['error']['lag'], 7)
+            with self.assertRaises(HTTPError) as cm:
+                urlopen(server.url + '?action=query')
+            self.assertEqual(cm.exception.code, 503)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
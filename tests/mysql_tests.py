@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""Tests for the connection handling of the mysql module."""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import sys
+
+try:
+    from unittest.mock import Mock, patch
+except ImportError:
+    from mock import Mock, patch
+
+from tests.aspects import unittest, TestCase
+
+
+class DriverError(Exception):
+
+    """Error of the mocked database driver."""
+
+
+def mock_driver():
+    """Return a mocked oursql module."""
+    driver = Mock(Error=DriverError)
+    driver.__name__ = 'oursql'
+    return driver
+
+
+try:
+    from pywikibot.data import mysql
+except ImportError:
+    # the driver is mocked by the tests anyway
+    with patch.dict(sys.modules, {'oursql': mock_driver()}):
+        from pywikibot.data import mysql
+
+
+class TestMySQLQuery(TestCase):
+
+    """Test that connections are reused and results are streamed."""
+
+    net = False
+
+    rows = [(0, 'A'), (0, 'B'), (0, 'C'), (0, 'D'), (0, 'E')]
+
+    def setUp(self):
+        """Mock the database driver and empty the connection pool."""
+        super(TestMySQLQuery, self).setUp()
+        self.connections = []
+        driver = mock_driver()
+        driver.connect.side_effect = self.connect
+        for patcher in (patch.object(mysql, 'mysqldb', driver),
+                        patch.dict(mysql._connections, clear=True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def connect(self, *args, **kwargs):
+        """Return a new connection whose cursors return the rows."""
+        def cursor():
+            rows = list(self.rows)
+
+            def fetchmany(size):
+                batch = rows[:size]
+                del rows[:size]
+                return batch
+
+            return Mock(fetchmany=Mock(side_effect=fetchmany))
+
+        conn = Mock(cursor=Mock(side_effect=cursor))
+        self.connections.append(conn)
+        return conn
+
+    def query(self):
+        """Return the generator of a query."""
+        return mysql.mysql_query('SELECT page_namespace, page_title FROM page',
+                                 dbname='enwiki', fetch_size=2)
+
+    def test_reuse(self):
+        """Test that a connection is reused after a complete iteration."""
+        self.assertEqual(list(self.query()), self.rows)
+        self.assertEqual(list(self.query()), self.rows)
+        self.assertEqual(len(self.connections), 1)
+        conn = self.connections[0]
+        conn.ping.assert_called_once_with()
+        # the transaction is ended before the connection is reused
+        self.assertEqual(conn.rollback.call_count, 2)
+        self.assertFalse(conn.close.called)
+        self.assertEqual(mysql._connections['enwiki'], [conn])
+
+    def test_abandoned(self):
+        """Test that the connection of an abandoned query is closed."""
+        gen = self.query()
+        self.assertEqual(next(gen), self.rows[0])
+        gen.close()
+        conn = self.connections[0]
+        conn.close.assert_called_once_with()
+        self.assertEqual(mysql._connections['enwiki'], [])
+        self.assertEqual(list(self.query()), self.rows)
+        self.assertEqual(len(self.connections), 2)
+
+    def test_pool_size(self):
+        """Test that connections exceeding the pool size are closed."""
+        with patch.object(mysql.config, 'db_pool_size', 1):
+            queries = [self.query(), self.query()]
+            for query in queries:
+                next(query)
+            for query in queries:
+                list(query)
+        first, second = self.connections
+        self.assertFalse(first.close.called)
+        second.close.assert_called_once_with()
+        self.assertEqual(mysql._connections['enwiki'], [first])
+
+    def test_rollback_failed(self):
+        """Test that a connection is closed when the rollback fails."""
+        gen = self.query()
+        next(gen)
+        self.connections[0].rollback.side_effect = DriverError
+        list(gen)
+        self.connections[0].close.assert_called_once_with()
+        self.assertEqual(mysql._connections['enwiki'], [])
+
+    def test_ping_failed(self):
+        """Test that a pooled connection is dropped when ping fails."""
+        list(self.query())
+        conn = self.connections[0]
+        conn.ping.side_effect = DriverError
+        self.assertEqual(list(self.query()), self.rows)
+        conn.close.assert_called_once_with()
+        self.assertEqual(len(self.connections), 2)
+        self.assertEqual(mysql._connections['enwiki'], [self.connections[1]])
+
+
+if __name__ == '__main__':  # pragma: no cover
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
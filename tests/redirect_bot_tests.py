@@ -15,10 +15,11 @@ except ImportError:
 import pywikibot
 
 from pywikibot import site, Page, i18n
+from pywikibot.data.redirectmap import RedirectMap
 
-from scripts.redirect import RedirectRobot
+from scripts.redirect import RedirectGenerator, RedirectRobot
 
-from tests.aspects import DefaultSiteTestCase
+from tests.aspects import DefaultSiteTestCase, TestCase
 
 
 # To make `self.site.logged_in(sysop=True)` always return False
@@ -57,3 +58,34 @@ class TestGetSDTemplateNoSysop(DefaultSiteTestCase):
                 bot = RedirectRobot('broken', **options)
         w.assert_called_with('No speedy deletion template "n" available.')
         self.assertEqual(bot.sdtemplate, None)
+
+
+class TestRedirectsViaAPI(TestCase):
+
+    """Test the redirects resolved by the redirect map."""
+
+    family = 'wikipedia'
+    code = 'en'
+
+    dry = True
+
+    def test_missing_targets(self):
+        """Test that only single redirects to missing pages are broken."""
+        redirect_map = RedirectMap(self.site)
+        redirect_map.add('Pears', 'Apple')
+        redirect_map.add('Pyrus', 'Pears')
+        redirect_map.add('Pear tree', 'Pear')
+        redirect_map.pages['Apple'] = False
+        redirect_map.pages['Pear'] = True
+        with patch.object(pywikibot, 'Site', return_value=self.site):
+            gen = RedirectGenerator('both', fullscan=True)
+        pages = [Page(self.site, title)
+                 for title in ('Pears', 'Pyrus', 'Pear tree')]
+        with patch.object(gen, 'get_redirect_pages_via_api',
+                          return_value=pages), \
+                patch.object(self.site, '_redirect_map', redirect_map,
+                             create=True):
+            self.assertEqual(list(gen.get_redirects_via_api(maxlen=2)),
+                             [('Pears', 0, 'Apple', None),
+                              ('Pyrus', 2, 'Pears', 'Apple'),
+                              ('Pear tree', 1, 'Pear', 'Pear')])
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""Tests for the local redirect map."""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import pywikibot
+
+from pywikibot.data.redirectmap import (
+    EXISTS, INTERWIKI, LOOP, MISSING, RedirectMap,
+)
+
+from tests import join_xml_data_path
+from tests.aspects import unittest, TestCase
+
+
+class TestRedirectMap(TestCase):
+
+    """Test resolving redirects without requests."""
+
+    family = 'wikipedia'
+    code = 'en'
+
+    dry = True
+
+    def setUp(self):
+        """Create an empty map."""
+        super(TestRedirectMap, self).setUp()
+        self.map = RedirectMap(self.site)
+
+    def resolved(self, *titles):
+        """Return the chains and statuses of titles."""
+        return [(chain.chain, chain.fragment, chain.status)
+                for chain in self.map.resolve(titles)]
+
+    def test_store_query(self):
+        """Test that redirect chains of a query result are stored."""
+        self.map._store_query({
+            'normalized': [{'from': 'pears', 'to': 'Pears'}],
+            'redirects': [
+                {'from': 'Pears', 'to': 'Pyrus'},
+                {'from': 'Pyrus', 'to': 'Pear', 'tofragment': 'Trees'},
+                {'from': 'Birne', 'to': 'Birne', 'tointerwiki': 'de'},
+                {'from': 'Loop A', 'to': 'Loop B'},
+                {'from': 'Loop B', 'to': 'Loop A'},
+            ],
+            'pages': {
+                '1': {'pageid': 1, 'ns': 0, 'title': 'Pear'},
+                '-1': {'ns': 0, 'title': 'Apple', 'missing': ''},
+                '2': {'pageid': 2, 'ns': 0, 'title': 'Loop A',
+                      'redirect': ''},
+            },
+        }, ['pears', 'Birne', 'Loop A', 'Apple', 'Lost'])
+        self.assertEqual(len(self.map), 5)
+        self.assertEqual(
+            self.resolved('pears', 'Pear', 'Apple', 'Birne', 'Loop A',
+                          'Lost'),
+            [(['Pears', 'Pyrus', 'Pear'], 'Trees', EXISTS),
+             (['Pear'], '', EXISTS),
+             (['Apple'], '', MISSING),
+             (['Birne', 'de:Birne'], '', INTERWIKI),
+             (['Loop A', 'Loop B', 'Loop A'], '', LOOP),
+             (['Lost'], '', MISSING)])
+
+    def test_resolve_pages(self):
+        """Test that pages are resolved like their titles."""
+        self.map.add('Pyrus', 'Pear')
+        self.map.pages['Pear'] = True
+        chain = self.map.resolve([pywikibot.Page(self.site, 'Pyrus')])[0]
+        self.assertEqual(chain.title, 'Pyrus')
+        self.assertEqual(chain.target, 'Pear')
+        self.assertEqual(chain.hops, 1)
+
+    def test_load_dump(self):
+        """Test that a dump is resolved completely."""
+        self.map.load_dump(join_xml_data_path('dummy-redirects.xml'),
+                           namespaces=[0])
+        self.assertTrue(self.map.complete)
+        self.assertEqual(
+            self.resolved('Pears', 'Pear tree', 'Apple', 'Loop B',
+                          'Talk:Pyrus', 'Peach'),
+            [(['Pears', 'Pyrus', 'Pear'], '', EXISTS),
+             (['Pear tree', 'Pear'], 'Trees', EXISTS),
+             (['Apple', 'Malus'], '', MISSING),
+             (['Loop B', 'Loop A', 'Loop B'], '', LOOP),
+             (['Talk:Pyrus'], '', EXISTS),
+             (['Peach'], '', MISSING)])
+
+
+if __name__ == '__main__':  # pragma: no cover
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
@@ -42,7 +42,7 @@ script_deps = {
     # Note: package 'lunatic-python' provides module 'lua'
     'flickrripper': ['flickrapi'],
     'imageharvest': ['bs4'],
-    'match_images': ['PIL.ImageTk'],
+    'match_images': ['PIL.ImageTk', 'numpy'],
     'states_redirect': ['pycountry'],
     'patrol': ['mwparserfromhell'],
 }
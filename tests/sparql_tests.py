@@ -7,6 +7,9 @@
 #
 from __future__ import absolute_import, unicode_literals
 
+import datetime
+import os
+import pickle
 import sys
 
 import pywikibot.data.sparql as sparql
@@ -168,6 +171,65 @@ class TestSparql(WikidataTestCase):
         self.assertFalse(res)
 
 
+class TestSparqlPaging(TestCase):
+
+    """Test paged and cached SPARQL queries without a repository."""
+
+    net = False
+
+    def setUp(self):
+        """Create a query object for the Wikidata endpoint."""
+        super(TestSparqlPaging, self).setUp()
+        self.query = sparql.SparqlQuery(
+            endpoint='https://query.wikidata.org/sparql',
+            entity_url='http://www.wikidata.org/entity/')
+
+    @patch.object(sparql.http, 'fetch')
+    def test_iter_select_pages(self, mock_method):
+        """Test that the pages are requested until one is not full."""
+        mock_method.side_effect = [
+            Container(SQL_RESPONSE_CONTAINER % ('%s, %s' % (ITEM_Q498787,
+                                                            ITEM_Q677525))),
+            Container(SQL_RESPONSE_CONTAINER % ITEM_Q677525),
+        ]
+        res = list(self.query.iter_items('SELECT * WHERE { ?x ?y ?z }', 'cat',
+                                         page_size=2))
+        self.assertEqual(res, ['Q498787', 'Q677525', 'Q677525'])
+        self.assertEqual(mock_method.call_count, 2)
+        self.assertTrue(mock_method.call_args_list[0][0][0].endswith(
+            'LIMIT%202%20OFFSET%200'))
+        self.assertTrue(mock_method.call_args_list[1][0][0].endswith(
+            'LIMIT%202%20OFFSET%202'))
+
+    @patch.object(sparql.http, 'fetch')
+    def test_cache(self, mock_method):
+        """Test that cached results are used until they expire."""
+        mock_method.return_value = Container(
+            SQL_RESPONSE_CONTAINER % ITEM_Q498787)
+        query = 'SELECT * WHERE {{ ?x ?y ?z }} # {0}'.format(id(self))
+        self.query.expiry = datetime.timedelta(1)
+        path = self.query._cachefile_path(
+            '%s?query=%s' % (self.query.endpoint, sparql.quote(query)),
+            sparql.DEFAULT_HEADERS)
+        try:
+            first = self.query.select(query)
+            self.assertIsNotNone(self.query.get_last_response())
+            self.assertEqual(self.query.select(query), first)
+            self.assertEqual(mock_method.call_count, 1)
+            self.assertIsNone(self.query.get_last_response())
+            # an entry written two days ago has expired
+            with open(path, 'rb') as f:
+                url, data, cachetime = pickle.load(f)
+            with open(path, 'wb') as f:
+                pickle.dump([url, data,
+                             cachetime - datetime.timedelta(2)], f)
+            self.assertEqual(self.query.select(query), first)
+            self.assertEqual(mock_method.call_count, 2)
+            self.assertIsNotNone(self.query.get_last_response())
+        finally:
+            os.remove(path)
+
+
 class Shared(object):
     """Shared test placeholder."""
 
@@ -1,14 +1,25 @@
 # -*- coding: utf-8 -*-
 """Tests for threading tools."""
 #
-# (C) Pywikibot team, 2014
+# (C) Pywikibot team, 2014-2017
 #
 # Distributed under the terms of the MIT license.
 #
 from __future__ import absolute_import, unicode_literals
 
+import itertools
+import threading
+import weakref
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
 from tests.aspects import unittest, TestCase
 
+from pywikibot import tools
+from pywikibot.tools import PY2
 from pywikibot.tools import ThreadedGenerator, intersect_generators
 
 
@@ -43,7 +54,7 @@ class GeneratorIntersectTestCase(TestCase):
 
     """Base class for intersect_generators test cases."""
 
-    def assertEqualItertools(self, gens):
+    def assertEqualItertools(self, gens, compact=False):
         """Assert intersect_generators result is same as set intersection."""
         # If they are a generator, we need to convert to a list
         # first otherwise the generator is empty the second time.
@@ -51,7 +62,7 @@ class GeneratorIntersectTestCase(TestCase):
 
         set_result = set(datasets[0]).intersection(*datasets[1:])
 
-        result = list(intersect_generators(datasets))
+        result = list(intersect_generators(datasets, compact=compact))
 
         self.assertCountEqual(set(result), result)
 
@@ -72,6 +83,99 @@ class BasicGeneratorIntersectTestCase(GeneratorIntersectTestCase):
         """Test basic interset with duplicates."""
         self.assertEqualItertools(['aabc', 'dddb', 'baa'])
 
+    def test_intersect_compact(self):
+        """Test interset keeping hashes of the items."""
+        self.assertEqualItertools(['aabc', 'dddb', 'baa'], compact=True)
+        self.assertEqualItertools([range(0, 3000, 2), range(0, 3000, 3)],
+                                  compact=True)
+
+    def test_intersect_endless(self):
+        """Test that an endless generator is stopped."""
+        self.assertEqual(
+            sorted(intersect_generators([[3, 1], itertools.count()])),
+            [1, 3])
+
+    def test_intersect_exception(self):
+        """Test that an exception of a generator is raised."""
+        def failing():
+            yield 1
+            raise ValueError('failed')
+
+        with self.assertRaises(ValueError):
+            list(intersect_generators([failing(), itertools.count()]))
+
+    def test_intersect_yielded_released(self):
+        """Test that the yielded items are not kept."""
+        class Item(object):
+
+            """Item which may be referenced weakly."""
+
+            def __init__(self, value):
+                """Constructor."""
+                self.value = value
+
+            def __eq__(self, other):
+                """Compare the values."""
+                return self.value == other.value
+
+            def __ne__(self, other):
+                """Compare the values."""
+                return not self == other
+
+            def __hash__(self):
+                """Return the hash of the value."""
+                return hash(self.value)
+
+        refs = []
+        for item in intersect_generators([(Item(i) for i in range(100)),
+                                          (Item(i) for i in range(100))]):
+            refs.append(weakref.ref(item))
+        del item
+        self.assertEqual(len(refs), 100)
+        # the feeding threads may still hold their last items
+        self.assertEqual([ref for ref in refs[:90] if ref() is not None],
+                         [])
+
+    def test_intersect_small_queue(self):
+        """Test that threads waiting for a full queue are stopped."""
+        gens = [itertools.count() for i in range(4)]
+        result = intersect_generators(gens, qsize=1)
+        self.assertEqual(next(result), 0)
+        result.close()
+
+    def test_intersect_interrupted(self):
+        """Test that Ctrl-C while waiting ends the intersection."""
+        started = threading.Event()
+        base = tools.Queue.Queue
+
+        class InterruptedQueue(base):
+
+            """Queue whose first get is interrupted."""
+
+            def get(self, block=True, timeout=None):
+                """Raise KeyboardInterrupt on the first call."""
+                if started.is_set():
+                    return base.get(self, block, timeout)
+                # the wait must be interruptible on Python 2
+                assert block and (timeout is not None or not PY2)
+                started.set()
+                raise KeyboardInterrupt
+
+        stopped = []
+        feed_queue = tools._feed_queue
+
+        def feed(index, source, queue, event):
+            stopped.append(event)
+            feed_queue(index, source, queue, event)
+
+        with patch.object(tools.Queue, 'Queue', InterruptedQueue), \
+                patch.object(tools, '_feed_queue', feed):
+            self.assertEqual(
+                list(intersect_generators([itertools.count(),
+                                           itertools.count()])), [])
+        self.assertTrue(started.is_set())
+        self.assertTrue(all(event.is_set() for event in stopped))
+
 
 if __name__ == '__main__':  # pragma: no cover
     try:
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Tests for the throttle module."""
+#
+# (C) Pywikibot team, 2017
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import absolute_import, unicode_literals
+
+import shutil
+import tempfile
+
+from pywikibot import config
+from pywikibot.throttle import (
+    load_timeline, replay, SimulatedThrottle, Throttle,
+)
+
+from tests.aspects import unittest, TestCase
+
+
+class TestThrottleAccounting(TestCase):
+
+    """Test the accounting of the time slept by the throttle."""
+
+    net = False
+
+    def test_read_write(self):
+        """Test that reads and writes are accounted separately."""
+        throttle = SimulatedThrottle('site', mindelay=2, writedelay=5)
+        throttle()
+        throttle()
+        throttle(write=True)
+        self.assertEqual(throttle.clock, 5)
+        self.assertEqual(throttle.slept['read'], 4)
+        self.assertEqual(throttle.slept['write'], 1)
+        self.assertEqual(throttle.waits['read'], 2)
+        self.assertEqual(throttle.slept['multiplicity'], 0)
+
+    def test_multiplicity(self):
+        """Test that the delay due to other processes is split off."""
+        throttle = SimulatedThrottle('site', processes=3, mindelay=2)
+        throttle()
+        throttle.clock += 1
+        throttle()
+        self.assertEqual(throttle.clock, 12)
+        self.assertEqual(throttle.slept['read'], 3)
+        self.assertEqual(throttle.slept['multiplicity'], 8)
+        self.assertEqual(throttle.waittime(), 6)
+
+    def test_lag(self):
+        """Test that lag waits are accounted."""
+        throttle = SimulatedThrottle('site', mindelay=0)
+        throttle.lag(30)
+        self.assertEqual(throttle.slept['lag'], 15)
+        self.assertEqual(throttle.clock, 15)
+
+    def test_report(self):
+        """Test the report of the waits."""
+        throttle = SimulatedThrottle('wikipedia:en', processes=2, mindelay=1)
+        self.assertIsNone(throttle.report())
+        throttle()
+        self.assertEqual(throttle.report(),
+                         'Throttle on wikipedia:en slept 2.0 seconds: '
+                         '1.0 s read, 1.0 s multiplicity (2 processes)')
+
+
+class TestThrottleTimeline(TestCase):
+
+    """Test recording and replaying a request timeline."""
+
+    net = False
+
+    def setUp(self):
+        """Use a temporary base directory."""
+        super(TestThrottleTimeline, self).setUp()
+        self._base_dir = config.base_dir
+        config.base_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the temporary base directory."""
+        shutil.rmtree(config.base_dir)
+        config.base_dir = self._base_dir
+        super(TestThrottleTimeline, self).tearDown()
+
+    def test_record(self):
+        """Test that throttled requests are appended to the timeline."""
+        throttle = Throttle('wikipedia:en', mindelay=0, multiplydelay=False)
+        throttle()
+        throttle = Throttle('wikipedia:de', mindelay=0, writedelay=0,
+                            multiplydelay=False)
+        self.assertIsNone(config.throttle_timeline)
+        config.throttle_timeline = 'timeline.jsonl'
+        try:
+            throttle(requestsize=10)
+            throttle(write=True)
+        finally:
+            config.throttle_timeline = None
+        events = load_timeline('timeline.jsonl')
+        self.assertEqual([(event['site'], event['kind'], event.get('size'))
+                          for event in events],
+                         [('wikipedia:de', 'read', 10),
+                          ('wikipedia:de', 'write', 1)])
+        self.assertEqual(load_timeline('timeline.jsonl', 'wikipedia:en'), [])
+
+    def test_replay(self):
+        """Test that the time between the waits is kept."""
+        events = [
+            {'site': 'a', 'kind': 'read', 'time': 100, 'wait': 0, 'size': 1},
+            {'site': 'a', 'kind': 'read', 'time': 103, 'wait': 0, 'size': 1},
+            {'site': 'a', 'kind': 'lag', 'time': 104, 'wait': 5, 'lag': 10},
+            {'site': 'a', 'kind': 'write', 'time': 110, 'wait': 0},
+        ]
+        throttle = replay(events, mindelay=0, writedelay=0)
+        self.assertEqual(throttle.clock, 10)
+        self.assertEqual(throttle.slept['lag'], 5)
+        throttle = replay(events, mindelay=4, writedelay=20)
+        # 4 + (3 busy + 1) + (1 busy + 5 lag) + (1 busy + 5)
+        self.assertEqual(throttle.clock, 20)
+        self.assertEqual(throttle.slept['read'], 5)
+        self.assertEqual(throttle.slept['write'], 5)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    try:
+        unittest.main()
+    except SystemExit:
+        pass
@@ -428,6 +428,58 @@ class TestTimeStripperDoNotArchiveUntil(TestTimeStripperCase):
         self.assertEqual(ts.timestripper(txt_match), res)
 
 
+class OfflineSite(object):
+
+    """Site providing what TimeStripper needs without network access."""
+
+    code = 'en'
+    months_names = [
+        ('January', 'Jan'), ('February', 'Feb'), ('March', 'Mar'),
+        ('April', 'Apr'), ('May', 'May'), ('June', 'Jun'),
+        ('July', 'Jul'), ('August', 'Aug'), ('September', 'Sep'),
+        ('October', 'Oct'), ('November', 'Nov'), ('December', 'Dec'),
+    ]
+    siteinfo = {'timeoffset': 0, 'timezone': 'UTC'}
+
+
+class TestTimeStripperScanner(TestCase):
+
+    """Test skipping lines without timestamp candidates."""
+
+    net = False
+
+    tzone = tzoneFixedOffset(0, 'UTC')
+
+    def setUp(self):
+        """Set up test cases."""
+        super(TestTimeStripperScanner, self).setUp()
+        self.ts = TimeStripper(OfflineSite())
+
+    def test_patterns_shared(self):
+        """Test that patterns are compiled once per month names."""
+        other = TimeStripper(OfflineSite())
+        self.assertIs(other.pmonthR, self.ts.pmonthR)
+        self.assertIs(other._candidate_pat, self.ts._candidate_pat)
+
+    def test_no_candidate(self):
+        """Test lines without time or time zone."""
+        ts = self.ts.timestripper
+        self.assertIsNone(ts('No signature in 2015 at all.'))
+        self.assertIsNone(ts('Meeting at 06:57 on 6 June 2015.'))
+        self.assertIsNone(ts('(UTC) 06:57, 6 June 2015'))
+
+    def test_candidate(self):
+        """Test lines with timestamps."""
+        ts = self.ts.timestripper
+        res = datetime.datetime(2015, 6, 6, 6, 57, tzinfo=self.tzone)
+        self.assertEqual(ts('[[User:Foo|Foo]] 06:57, 6 June 2015 (UTC)'),
+                         res)
+        self.assertEqual(ts('<!-- 06:57, 6 June 2015 (UTC) -->'), res)
+        self.assertEqual(ts('\u06f0\u06f6:\u06f5\u06f7, 6 June 2015 (UTC)'),
+                         res)
+        self.assertIsNone(ts('06:57, 6 Juin 2015 (UTC)'))
+
+
 if __name__ == '__main__':  # pragma: no cover
     try:
         unittest.main()
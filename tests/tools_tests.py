@@ -13,6 +13,7 @@ import inspect
 import os.path
 import subprocess
 import tempfile
+import time
 import warnings
 
 try:
@@ -633,6 +634,42 @@ class TestFilterUnique(TestCase):
         self.assertRaises(StopIteration, next, deduper)
 
 
+class TestCompactSet(TestCase):
+
+    """Test the set of hashes."""
+
+    net = False
+
+    def test_filter_unique(self):
+        """Test filter_unique with a compact set."""
+        deduped = tools.CompactSet()
+        deduper = tools.filter_unique(TestFilterUnique.strs,
+                                      container=deduped)
+        self.assertEqual(list(deduper), ['1', '3', '2', '4'])
+        self.assertEqual(len(deduped), 4)
+        self.assertIn('2', deduped)
+        self.assertNotIn('5', deduped)
+
+    def test_grow(self):
+        """Test that all hashes are kept when the array grows."""
+        titles = ['Page {0}'.format(i) for i in range(1000)]
+        deduped = tools.CompactSet(titles)
+        deduped.add(titles[0])
+        self.assertEqual(len(deduped), 1000)
+        self.assertTrue(all(title in deduped for title in titles))
+        self.assertFalse(any('Other {0}'.format(i) in deduped
+                             for i in range(1000)))
+        self.assertLessEqual(len(deduped._slots), 4096)
+
+    def test_small_ints(self):
+        """Test that the hash 0 is distinct from the other hashes."""
+        deduped = tools.CompactSet([0])
+        self.assertIn(0, deduped)
+        self.assertNotIn(1, deduped)
+        deduped.add(1)
+        self.assertEqual(len(deduped), 2)
+
+
 class MetaTestArgSpec(MetaTestCaseClass):
 
     """Metaclass to create dynamically the tests. Set the net flag to false."""
@@ -821,6 +858,94 @@ class TestFileShaCalculator(TestCase):
         ))
 
 
+class TestChunkReader(TestCase):
+
+    """Test reading chunks of a file ahead."""
+
+    net = False
+
+    filename = join_xml_data_path('article-pear-0.10.xml')
+
+    def test_chunks(self):
+        """Test that the chunks are the file content."""
+        with open(self.filename, 'rb') as f:
+            content = f.read()
+        chunks = []
+        with tools.ChunkReader(self.filename, 1000) as reader:
+            offset = 0
+            while offset < reader.size:
+                chunk = reader.read(offset)
+                self.assertLessEqual(len(chunk), 1000)
+                chunks.append(chunk)
+                offset += len(chunk)
+        self.assertEqual(b''.join(chunks), content)
+
+    def test_out_of_order(self):
+        """Test reading a chunk which was not read ahead."""
+        with open(self.filename, 'rb') as f:
+            content = f.read()
+        with tools.ChunkReader(self.filename, 100) as reader:
+            self.assertEqual(reader.read(0), content[:100])
+            self.assertEqual(reader.read(300), content[300:400])
+            self.assertEqual(reader.read(0), content[:100])
+
+    def test_hash(self):
+        """Test the hash computed from the chunks."""
+        sha1 = tools.compute_file_hash(self.filename)
+        with tools.ChunkReader(self.filename, 1000, sha='sha1') as reader:
+            self.assertIsNone(reader.hexdigest())
+            offset = 0
+            while offset < reader.size:
+                offset += len(reader.read(offset))
+            self.assertEqual(reader.hexdigest(), sha1)
+
+    def test_hash_skipped_chunks(self):
+        """Test the hash when reading starts after the first chunk."""
+        sha1 = tools.compute_file_hash(self.filename)
+        with tools.ChunkReader(self.filename, 1000, sha='sha1') as reader:
+            offset = 2500
+            reader.read(1500)
+            while offset < reader.size:
+                offset += len(reader.read(offset))
+            self.assertEqual(reader.hexdigest(), sha1)
+
+
+class TestConcurrentMap(TestCase):
+
+    """Test calling a function for items in parallel threads."""
+
+    net = False
+
+    def test_order(self):
+        """Test that the results keep the order of the items."""
+        def func(item):
+            time.sleep(0.01 * (5 - item))
+            return item * 2
+
+        self.assertEqual(list(tools.concurrent_map(func, range(5), 3)),
+                         [0, 2, 4, 6, 8])
+        self.assertEqual(list(tools.concurrent_map(func, range(5), 1)),
+                         [0, 2, 4, 6, 8])
+
+    def test_lookahead(self):
+        """Test that the calls do not run far ahead of the results."""
+        called = []
+        gen = tools.concurrent_map(called.append, range(10), 3)
+        next(gen)
+        self.assertEqual(len(called), 3)
+
+    def test_exception(self):
+        """Test that an exception is raised in place of its result."""
+        def func(item):
+            if item == 2:
+                raise ValueError(item)
+            return item
+
+        gen = tools.concurrent_map(func, range(5), 2)
+        self.assertEqual([next(gen), next(gen)], [0, 1])
+        self.assertRaises(ValueError, next, gen)
+
+
 class Foo(object):
 
     """Test class to verify classproperty decorator."""
@@ -326,6 +326,19 @@ class TestTerminalOutput(UITestCase):
         self.assertEqual(newstdout.getvalue(), '')
         self.assertEqual(newstderr.getvalue(), '')
 
+    def test_lazy_text(self):
+        calls = []
+
+        def text():
+            calls.append(True)
+            return 'lazy'
+
+        pywikibot.debug(text, 'test')
+        self.assertEqual(calls, [])
+        pywikibot.output(text)
+        self.assertEqual(calls, [True])
+        self.assertEqual(newstderr.getvalue(), 'lazy\n')
+
     def test_exception(self):
         class TestException(Exception):
 
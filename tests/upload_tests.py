@@ -11,8 +11,16 @@ These tests write to the wiki.
 #
 from __future__ import absolute_import, unicode_literals
 
+import os
+import shutil
+import tempfile
+
 import pywikibot
 
+from pywikibot import config
+from pywikibot.data.fileindex import FileHashIndex
+from pywikibot.data.uploadjournal import UploadJournal
+
 from tests import join_images_path
 from tests.aspects import unittest, TestCase
 
@@ -151,6 +159,115 @@ class TestUpload(TestCase):
         self._verify_stash()
 
 
+class FakeFamily(object):
+
+    """Family providing only the name."""
+
+    name = 'wikipedia'
+
+
+class FakeSite(object):
+
+    """Site providing only the family and code."""
+
+    family = FakeFamily()
+    code = 'test'
+
+
+class TestUploadJournal(TestCase):
+
+    """Test the journal of chunked uploads."""
+
+    net = False
+
+    def setUp(self):
+        """Use a temporary base directory."""
+        super(TestUploadJournal, self).setUp()
+        self._base_dir = config.base_dir
+        config.base_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(config.base_dir, 'upload.bin')
+        with open(self.filename, 'wb') as f:
+            f.write(b'x' * 100)
+
+    def tearDown(self):
+        """Remove the temporary base directory."""
+        shutil.rmtree(config.base_dir)
+        config.base_dir = self._base_dir
+        super(TestUploadJournal, self).tearDown()
+
+    def test_resume(self):
+        """Test storing and loading the stashed offset."""
+        journal = UploadJournal(FakeSite(), 'Upload.bin', self.filename)
+        self.assertIsNone(journal.load())
+        journal.update('abc.def', 40)
+        journal.update('abc.def', 80)
+        journal = UploadJournal(FakeSite(), 'Upload.bin', self.filename)
+        self.assertEqual(journal.load(), ('abc.def', 80))
+        other = UploadJournal(FakeSite(), 'Other.bin', self.filename)
+        self.assertIsNone(other.load())
+        journal.remove()
+        self.assertIsNone(journal.load())
+        journal.remove()
+
+    def test_changed_file(self):
+        """Test that a changed local file is not resumed."""
+        journal = UploadJournal(FakeSite(), 'Upload.bin', self.filename)
+        journal.update('abc.def', 40)
+        with open(self.filename, 'ab') as f:
+            f.write(b'y')
+        journal = UploadJournal(FakeSite(), 'Upload.bin', self.filename)
+        self.assertIsNone(journal.load())
+
+
+class TestFileHashIndex(TestCase):
+
+    """Test the local index of file hashes."""
+
+    net = False
+
+    def setUp(self):
+        """Use a temporary base directory."""
+        super(TestFileHashIndex, self).setUp()
+        self._base_dir = config.base_dir
+        config.base_dir = tempfile.mkdtemp()
+        self.index = FileHashIndex(FakeSite())
+
+    def tearDown(self):
+        """Remove the temporary base directory."""
+        self.index.close()
+        shutil.rmtree(config.base_dir)
+        config.base_dir = self._base_dir
+        super(TestFileHashIndex, self).tearDown()
+
+    def test_lookup(self):
+        """Test looking up added files."""
+        self.assertFalse(self.index.complete)
+        self.index.add('File:A.png', 'AB01')
+        self.index.add('File:B.png', 'ab01')
+        self.index.add('File:C.png', 'cd02')
+        result = self.index.lookup(['ab01', 'EF03'])
+        self.assertEqual(list(result.keys()), ['ab01'])
+        self.assertEqual(sorted(result['ab01']), ['File:A.png', 'File:B.png'])
+        self.index.add('File:A.png', 'cd02')
+        self.assertEqual(self.index.lookup(['ab01']), {'ab01': ['File:B.png']})
+
+    def test_lookup_many(self):
+        """Test looking up more hashes than sqlite variables."""
+        hashes = ['{0:040x}'.format(i) for i in range(1200)]
+        for i in range(0, 1200, 7):
+            self.index.add('File:{0}.png'.format(i), hashes[i])
+        result = self.index.lookup(hashes)
+        self.assertEqual(len(result), len(range(0, 1200, 7)))
+        self.assertEqual(result[hashes[1197]], ['File:1197.png'])
+
+    def test_persistent(self):
+        """Test that the index is kept when opened again."""
+        self.index.add('File:A.png', 'ab01')
+        self.index.close()
+        self.index = FileHashIndex(FakeSite())
+        self.assertEqual(self.index.lookup(['ab01']), {'ab01': ['File:A.png']})
+
+
 if __name__ == '__main__':  # pragma: no cover
     try:
         unittest.main()
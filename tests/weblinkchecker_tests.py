@@ -8,6 +8,12 @@
 from __future__ import absolute_import, unicode_literals
 
 import datetime
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import warnings
 
 from requests import ConnectionError as RequestsConnectionError
 
@@ -17,6 +23,8 @@ if not PY2:
 else:
     from urlparse import urlparse
 
+from pywikibot import config
+
 from scripts import weblinkchecker
 
 from tests.aspects import unittest, require_modules, TestCase
@@ -93,6 +101,239 @@ class TestMementoDefault(MementoTestCase):
             self._get_archive_url, 'invalid')
 
 
+class FakeHistory(object):
+
+    """History recording the link states."""
+
+    def __init__(self):
+        """Constructor."""
+        self.alive = []
+        self.dead = []
+
+    def setLinkAlive(self, url):
+        """Record a link as alive."""
+        self.alive.append(url)
+        return False
+
+    def setLinkDead(self, url, error, page, weblink_dead_days):
+        """Record a link as dead."""
+        self.dead.append((url, error, page))
+
+
+class FakePage(object):
+
+    """Page with a title only."""
+
+    site = None
+
+    def __init__(self, title):
+        """Constructor."""
+        self._title = title
+
+    def title(self):
+        """Return the title."""
+        return self._title
+
+
+class FakeResponse(object):
+
+    """Response with a status only."""
+
+    def __init__(self, status):
+        """Constructor."""
+        self.status = status
+
+
+class TestLinkCheckPool(TestCase):
+
+    """Test the LinkCheckPool without network access."""
+
+    net = False
+
+    statuses = {
+        ('http://example.com/ok', 'HEAD'): 200,
+        ('http://example.com/nohead', 'HEAD'): 405,
+        ('http://example.com/nohead', 'GET'): 206,
+        ('http://example.org/dead', 'HEAD'): 404,
+        ('http://example.org/dead', 'GET'): 404,
+    }
+
+    def setUp(self):
+        """Patch fetching URLs."""
+        super(TestLinkCheckPool, self).setUp()
+        self.requests = []
+        self.running = {}
+        self.max_running = {}
+        lock = threading.Lock()
+
+        def fetch(thread, url, method, headers):
+            host = urlparse(url).netloc
+            with lock:
+                self.requests.append((url, method, headers.get('Range')))
+                self.running[host] = self.running.get(host, 0) + 1
+                self.max_running[host] = max(self.max_running.get(host, 0),
+                                             self.running[host])
+            try:
+                return FakeResponse(self.statuses.get((url, method), 200))
+            finally:
+                with lock:
+                    self.running[host] -= 1
+
+        self._fetch = weblinkchecker.LinkCheckWorker.fetch
+        weblinkchecker.LinkCheckWorker.fetch = fetch
+        self._delay = config.weblink_host_delay
+        config.weblink_host_delay = 0
+
+    def tearDown(self):
+        """Restore fetching URLs."""
+        weblinkchecker.LinkCheckWorker.fetch = self._fetch
+        config.weblink_host_delay = self._delay
+        super(TestLinkCheckPool, self).tearDown()
+
+    def _check(self, links):
+        """Check the links of the pages and return the history."""
+        history = FakeHistory()
+        pool = weblinkchecker.LinkCheckPool(history, [], workers=4)
+        self.assertEqual(pool.threads, [])
+        pool.start()
+        for page, url in links:
+            pool.add(page, url)
+        pool.finish()
+        for thread in pool.threads:
+            thread.join(10)
+        self.assertEqual(pool.alive_threads(), 0)
+        return history
+
+    def test_results(self):
+        """Test checking alive and dead links."""
+        page = FakePage('Page')
+        history = self._check([(page, 'http://example.com/ok'),
+                               (page, 'http://example.com/nohead'),
+                               (page, 'http://example.org/dead')])
+        self.assertCountEqual(history.alive, ['http://example.com/ok',
+                                              'http://example.com/nohead'])
+        self.assertEqual(history.dead,
+                         [('http://example.org/dead', '404', page)])
+        self.assertIn(('http://example.com/nohead', 'GET', 'bytes=0-0'),
+                      self.requests)
+
+    def test_deprecated_thread(self):
+        """Test that LinkCheckThread still checks one URL."""
+        history = FakeHistory()
+        page = FakePage('Page')
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            thread = weblinkchecker.LinkCheckThread(
+                page, 'http://example.org/dead', history, [], 7)
+        self.assertIn(DeprecationWarning,
+                      [warning.category for warning in caught])
+        thread.start()
+        thread.join(10)
+        self.assertEqual(history.dead,
+                         [('http://example.org/dead', '404', page)])
+        self.assertEqual(history.alive, [])
+
+    def test_duplicates(self):
+        """Test that each link is only checked once."""
+        pages = [FakePage('Page {0}'.format(i)) for i in range(5)]
+        history = self._check([(page, 'http://example.org/dead')
+                               for page in pages])
+        self.assertEqual(len(self.requests), 2)
+        self.assertCountEqual([page for _, _, page in history.dead], pages)
+
+    def test_per_host(self):
+        """Test the limit of simultaneous checks of one host."""
+        page = FakePage('Page')
+        history = self._check([(page, 'http://example.com/{0}'.format(i))
+                               for i in range(10)])
+        self.assertEqual(len(history.alive), 10)
+        self.assertLessEqual(self.max_running['example.com'],
+                             config.max_external_links_per_host)
+
+
+class FakeFamily(object):
+
+    """Family with a name only."""
+
+    name = 'wikipedia'
+
+
+class FakeSite(object):
+
+    """Site with a family and code only."""
+
+    family = FakeFamily()
+    code = 'test'
+
+
+class TestHistory(TestCase):
+
+    """Test the dead link history without network access."""
+
+    net = False
+
+    def setUp(self):
+        """Use a temporary base directory."""
+        super(TestHistory, self).setUp()
+        self._base_dir = config.base_dir
+        config.base_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Restore the base directory."""
+        shutil.rmtree(config.base_dir)
+        config.base_dir = self._base_dir
+        super(TestHistory, self).tearDown()
+
+    def test_dead_and_alive(self):
+        """Test storing links found dead and alive."""
+        history = weblinkchecker.History(None, site=FakeSite())
+        history.setLinkDead('http://example.org/', '404', FakePage('Foo'), 7)
+        history.setLinkDead('http://example.com/', '410', FakePage('Bar'), 7)
+        # found dead again within an hour, not stored
+        history.setLinkDead('http://example.org/', '404', FakePage('Baz'), 7)
+        history.save()
+
+        history = weblinkchecker.History(None, site=FakeSite())
+        entries = history.entries('http://example.org/')
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0][0], 'Foo')
+        self.assertEqual(entries[0][2], '404')
+        self.assertCountEqual(history.pages(), ['Foo', 'Bar'])
+        self.assertTrue(history.setLinkAlive('http://example.org/'))
+        self.assertFalse(history.setLinkAlive('http://example.org/'))
+        self.assertEqual(history.entries('http://example.org/'), [])
+        self.assertEqual(history.pages(), ['Bar'])
+        history.save()
+
+    def test_closed(self):
+        """Test that results of threads after saving are ignored."""
+        history = weblinkchecker.History(None, site=FakeSite())
+        history.setLinkDead('http://example.org/', '404', FakePage('Foo'), 7)
+        history.save()
+        history.setLinkDead('http://example.com/', '410', FakePage('Bar'), 7)
+        self.assertFalse(history.setLinkAlive('http://example.org/'))
+        self.assertEqual(history.entries('http://example.org/'), [])
+        history.save()
+
+        history = weblinkchecker.History(None, site=FakeSite())
+        self.assertEqual(history.pages(), ['Foo'])
+        history.save()
+
+    def test_import(self):
+        """Test importing the pickled history once."""
+        filename = config.datafilepath('deadlinks',
+                                       'deadlinks-wikipedia-test.dat')
+        with open(filename, 'wb') as f:
+            pickle.dump({'http://example.org/': [('Foo', 1.0, '404'),
+                                                 ('Bar', 2.0, '404')]}, f)
+        for i in range(2):
+            history = weblinkchecker.History(None, site=FakeSite())
+            self.assertEqual(history.entries('http://example.org/'),
+                             [('Foo', 1.0, '404'), ('Bar', 2.0, '404')])
+            history.save()
+        self.assertTrue(os.path.exists(filename))
+
+
 if __name__ == '__main__':  # pragma: no cover
     try:
         unittest.main()